@@ -1,646 +1,1473 @@
-import streamlit as st
-import plotly.graph_objects as go
-import numpy as np
-import pandas as pd
-import warnings
-warnings.filterwarnings('ignore')
-
-# 多语言文本字典
-lang_dict = {
-    'zh': {
-        'title': 'IV 理论模拟器：纯理论 IV 模型',
-        'exclusion_condition': '排他性条件: 假设工具变量 Z 仅通过内生变量 X 影响被解释变量 Y，不存在直接影响。',
-        'original_model': '原始模型',
-        'first_stage': '第一阶段',
-        'second_stage': '第二阶段',
-        'mu1_unbiased': '$\\mu_1$ 是无偏估计',
-        'param_control': '模型参数控制',
-        'gamma_label': 'γ (IV 强度)',
-        'gamma_help': '控制工具变量 Z 对 X 的影响强度',
-        'delta_label': 'δ (误差传导)',
-        'delta_help': '控制误差项 U 对 X 的影响',
-        'phi_label': 'φ (排他性违反)',
-        'phi_help': '控制 Z 对 Y 的直接影响',
-        'exclusion_violation': '排他性违反：φ = {:.2f}，Z 直接影响 Y，IV 一致性崩塌！',
-        'weak_iv': '弱工具变量风险：γ = {:.2f}，IV 强度不足，估计量方差将很大！',
-        'endogeneity_bias': '内生性偏差较大：δ = {:.2f}，误差项对 X 影响显著，OLS 将严重有偏！',
-        'model_preview': '📋 理论模型预览',
-        'param_detail': '📚 参数详解',
-        'variable_def': '变量定义',
-        'param_meaning': '参数含义',
-        'error_term': '误差项',
-        'instrument': '工具变量',
-        'endogenous': '内生变量',
-        'explained': '被解释变量',
-        'iv_strength': '工具变量强度',
-        'error_transmission': '误差传导系数',
-        'exclusion_violation_degree': '排他性违反程度',
-        'true_effect': '真实因果效应',
-        'regression_comparison': '📊 实时回归结果对比',
-        'ols_regression': 'OLS 回归',
-        'tsls_regression': '2SLS 回归',
-        'true_value': '真实值',
-        'model': '模型',
-        'iv_diagnosis': '🔍 工具变量诊断',
-        'first_stage_f': '第一阶段 F 统计量',
-        'iv_weak': 'IV 较弱 (F < 10)',
-        'iv_strong': 'IV 强度足够',
-        'correlation': 'Corr(X, Z)',
-        'covariance': 'Cov(X, Z)',
-        'visualization': '📈 数据可视化',
-        'scatter_plot': 'X vs Y 散点图与回归线',
-        'data_point': '数据点',
-        'insight': '💡 关键洞察',
-        'ols_bias': 'OLS 偏差',
-        'tsls_bias': '2SLS 偏差',
-        'improvement': '改善程度',
-        'explanation': '解释',
-        'hte_section': '🎯 异质性处理效应与四类个体',
-        'scenario_choice': '选择实验场景',
-        'scenario_basic': '基础模型',
-        'scenario_one_option': '场景一：无违抗者 (Defiers = 0%)',
-        'scenario_two_option': '场景二：引入违抗者 (Defiers > 0%)',
-        'scenario_hte': '异质性处理效应模型',
-        'compliers_label': '依从者 (Compliers) %',
-        'always_takers_label': '始终接受者 (Always-takers) %',
-        'never_takers_label': '从不接受者 (Never-takers) %',
-        'defiers_label': '违抗者 (Defiers) %',
-        'compliers': '依从者 (Compliers)',
-        'always_takers': '始终接受者 (Always-takers)',
-        'never_takers': '从不接受者 (Never-takers)',
-        'defiers': '违抗者 (Defiers)',
-        'treatment_effect_compliers': '依从者真实处理效应 (β_C)',
-        'treatment_effect_always': '始终接受者真实处理效应 (β_A)',
-        'treatment_effect_never': '从不接受者真实处理效应 (β_N)',
-        'treatment_effect_defiers': '违抗者真实处理效应 (β_D)',
-        'scenario_one': '场景一：无违抗者 (Defiers = 0%)',
-        'scenario_one_desc': '验证 LATE (Local Average Treatment Effect) 定理 - IV 估计应完美恢复 Compliers 的处理效应',
-        'scenario_two': '场景二：引入违抗者 (Defiers > 0%)',
-        'scenario_two_desc': '展示单调性假设违反的后果 - 违抗者的存在如何扭曲 IV 估计量',
-        'individual_type': '个体类型',
-        'proportion': '比例',
-        'true_effect_col': '真实处理效应',
-        'late_theorem': '🔬 LATE 定理验证',
-        'late_explanation': 'LATE (Local Average Treatment Effect) 承诺在以下假设下，2SLS 估计的是 Compliers 的平均处理效应：',
-        'late_assumption_1': '1. 排他性：Z 只通过 D 影响 Y',
-        'late_assumption_2': '2. 相关性：Z 与 D 相关',
-        'late_assumption_3': '3. 单调性：不存在违抗者 (Defiers)',
-        'late_result_scenario1': '场景一结果：Z→D→Y 的单向因果链，无 Defiers，满足所有 LATE 假设',
-        'late_result_scenario2': '场景二结果：Defiers 的存在违反单调性假设，导致 IV 估计不再等于任何组的单一处理效应',
-        'monotonicity_violation': '⚠️ 单调性假设违反：当 Z=1 时部分个体不接受处理，当 Z=0 时又接受处理',
-        'hte_results': '异质性处理效应结果对比',
-        'scenario_label': '实验场景',
-        'prop_setting_title': '**四类个体比例设置**',
-        'prop_setting_note': '*注：比例总和将自动调整为100%*',
-        'adjusted_prop': '**调整后的比例**',
-        'total': '**总计**',
-        'defier_warn_scen1': '⚠️ 场景一应使用 0% Defiers 来验证 LATE 定理',
-        'defier_info_scen2': 'ℹ️ 场景二建议设置 Defiers > 0 来观察其影响',
-        'effect_preset_title': '**处理效应预设值**',
-        'effect_preset_info': '根据潜在结果框架：\n- 依从者 β_comp = 5.0\n- 始终接受者 β_always = 2.0\n- 从不接受者 β_never = 2.0\n- 违抗者 β_defiers = 2.0',
-        'hte_model_title': '#### 潜在结果框架中的 LATE 模型与异质性处理效应',
-        'four_types_title': '**潜在结果框架中的四类个体与异质性处理效应**',
-        'model_params': '#### 模型参数',
-        'defier_detect_warn': '⚠️ 检测到 Defiers。这会违反单调性假设！',
-        'weighted_contrib': '加权贡献',
-        'pop_ate': '人口平均处理效应 (Population ATE)',
-        'ols_est': 'OLS 估计',
-        'tsls_est': '2SLS 估计 (LATE)',
-        'theoretical_late': '理论 LATE 值',
-        'tsls_dev': '2SLS 偏差',
-        'key_results': '**关键结果**',
-        'explain_title': '**解释**',
-        'scen1_success': '✓ **场景一验证成功**：无违抗者存在\n- 2SLS 完美恢复了依从者的真实处理效应 ({:.4f})\n- IV 估计值 ({:.4f}) ≈ 理论 LATE 值 ({:.4f})\n- 所有 LATE 假设得到满足，LATE 定理完全适用',
-        'scen2_error': '⚠️ **场景二结果展示**：违抗者的破坏性影响\n- Defiers (占 {:.0%}) 的存在违反了单调性假设\n- 2SLS 估计值 ({:.4f}) 不再对应任何单一群体的处理效应\n- 违抗者对工具变量效应的中断导致 IV 估计被扭曲\n- 这证明单调性假设对于 LATE 定理的有效性是必要的',
-        'dist_title': '按个体类型和处理状态分组的结果变量(Y)分布',
-        'dist_xaxis': '类型和处理状态'
-    },
-    'en': {
-        'title': 'IV Theory Simulator: Pure Theoretical IV Model',
-        'exclusion_condition': 'Exclusion restriction: Instrument Z affects dependent variable Y only through endogenous variable X, with no direct effect.',
-        'original_model': 'Original model',
-        'first_stage': 'First stage',
-        'second_stage': 'Second stage',
-        'mu1_unbiased': '$\\mu_1$ is unbiased estimator',
-        'param_control': 'Model Parameter Control',
-        'gamma_label': 'γ (IV Strength)',
-        'gamma_help': 'Control the effect of instrument Z on X',
-        'delta_label': 'δ (Error Transmission)',
-        'delta_help': 'Control the effect of error term U on X',
-        'phi_label': 'φ (Exclusion Restriction Violation)',
-        'phi_help': 'Control direct effect of Z on Y',
-        'exclusion_violation': 'Exclusion Restriction Violated: φ = {:.2f}, Z directly affects Y, IV consistency collapsed!',
-        'weak_iv': 'Weak Instrument Risk: γ = {:.2f}, insufficient IV strength, estimator variance will be large!',
-        'endogeneity_bias': 'Large Endogeneity Bias: δ = {:.2f}, error term has significant effect on X, OLS will be severely biased!',
-        'model_preview': '📋 Theoretical Model Preview',
-        'param_detail': '📚 Parameter Details',
-        'variable_def': 'Variable Definitions',
-        'param_meaning': 'Parameter Meanings',
-        'error_term': 'Error term',
-        'instrument': 'Instrument variable',
-        'endogenous': 'Endogenous variable',
-        'explained': 'Dependent variable',
-        'iv_strength': 'Instrument strength',
-        'error_transmission': 'Error transmission coefficient',
-        'exclusion_violation_degree': 'Exclusion violation degree',
-        'true_effect': 'True causal effect',
-        'regression_comparison': '📊 Real-time Regression Comparison',
-        'ols_regression': 'OLS Regression',
-        'tsls_regression': '2SLS Regression',
-        'true_value': 'True value',
-        'model': 'Model',
-        'iv_diagnosis': '🔍 Instrument Variable Diagnosis',
-        'first_stage_f': 'First-Stage F-Statistic',
-        'iv_weak': 'Weak IV (F < 10)',
-        'iv_strong': 'IV Strength Sufficient',
-        'correlation': 'Corr(X, Z)',
-        'covariance': 'Cov(X, Z)',
-        'visualization': '📈 Data Visualization',
-        'scatter_plot': 'Scatter Plot: X vs Y with Regression Lines',
-        'data_point': 'Data Points',
-        'insight': '💡 Key Insights',
-        'ols_bias': 'OLS Bias',
-        'tsls_bias': '2SLS Bias',
-        'improvement': 'Improvement',
-        'explanation': 'Explanation',
-        'hte_section': '🎯 Heterogeneous Treatment Effects (HTE)',
-        'scenario_choice': 'Choose Experiment Scenario',
-        'scenario_basic': 'Basic Model',
-        'scenario_one_option': 'Scenario I: No Defiers (Defiers = 0%)',
-        'scenario_two_option': 'Scenario II: With Defiers (Defiers > 0%)',
-        'scenario_hte': 'Heterogeneous Treatment Effects Model',
-        'compliers_label': 'Compliers %',
-        'always_takers_label': 'Always-takers %',
-        'never_takers_label': 'Never-takers %',
-        'defiers_label': 'Defiers %',
-        'compliers': 'Compliers',
-        'always_takers': 'Always-takers',
-        'never_takers': 'Never-takers',
-        'defiers': 'Defiers',
-        'treatment_effect_compliers': 'Compliers True Treatment Effect (β_C)',
-        'treatment_effect_always': 'Always-takers True Treatment Effect (β_A)',
-        'treatment_effect_never': 'Never-takers True Treatment Effect (β_N)',
-        'treatment_effect_defiers': 'Defiers True Treatment Effect (β_D)',
-        'scenario_one': 'Scenario I: No Defiers (Defiers = 0%)',
-        'scenario_one_desc': 'Verify LATE Theorem - IV estimate should perfectly recover Compliers effect',
-        'scenario_two': 'Scenario II: With Defiers (Defiers > 0%)',
-        'scenario_two_desc': 'Demonstrate consequences of monotonicity violation',
-        'individual_type': 'Individual Type',
-        'proportion': 'Proportion',
-        'true_effect_col': 'True Effect',
-        'late_theorem': '🔬 LATE Theorem Verification',
-        'late_explanation': 'LATE guarantees that under the following assumptions, 2SLS estimates the average treatment effect for Compliers:',
-        'late_assumption_1': '1. Exclusion: Z affects Y only through D',
-        'late_assumption_2': '2. Relevance: Z is correlated with D',
-        'late_assumption_3': '3. Monotonicity: No Defiers exist',
-        'late_result_scenario1': 'Scenario I Result: Unidirectional causal chain Z→D→Y, no Defiers, all LATE assumptions satisfied',
-        'late_result_scenario2': "Scenario II Result: Defiers violate monotonicity, IV estimate no longer equals any single group's treatment effect", 
-        'monotonicity_violation': '⚠️ Monotonicity Assumption Violated: When Z=1 some individuals reject treatment, when Z=0 some still accept',
-        'hte_results': 'Heterogeneous Treatment Effects Results',
-        'scenario_label': 'Experiment Scenario',
-        'prop_setting_title': '**Individual Type Proportions**',
-        'prop_setting_note': '*Note: The sum will be automatically adjusted to 100%*',
-        'adjusted_prop': '**Adjusted Proportions**',
-        'total': '**Total**',
-        'defier_warn_scen1': '⚠️ Scenario I should use 0% Defiers to verify LATE',
-        'defier_info_scen2': 'ℹ️ Scenario II recommends Defiers > 0 to observe impact',
-        'effect_preset_title': '**Treatment Effect Preset Values**',
-        'effect_preset_info': 'Based on Potential Outcomes Framework:\n- Compliers (β_comp) = 5.0\n- Always-takers (β_always) = 2.0\n- Never-takers (β_never) = 2.0\n- Defiers (β_defiers) = 2.0',
-        'hte_model_title': '#### LATE Model with Heterogeneous Treatment Effects',
-        'four_types_title': '**Four Types with Heterogeneous Effects in Potential Outcomes Framework**',
-        'model_params': '#### Model Parameters',
-        'defier_detect_warn': '⚠️ Defiers detected. This violates the monotonicity assumption!',
-        'weighted_contrib': 'Weighted Contribution',
-        'pop_ate': 'Population Average Treatment Effect (ATE)',
-        'ols_est': 'OLS Estimate',
-        'tsls_est': '2SLS Estimate (LATE)',
-        'theoretical_late': 'Theoretical LATE Value',
-        'tsls_dev': '2SLS Deviation',
-        'key_results': '**Key Results**',
-        'explain_title': '**Explanation**',
-        'scen1_success': '✓ **Scenario I Verification Success**: No Defiers present\n- 2SLS perfectly recovers Compliers\' true treatment effect ({:.4f})\n- IV estimate ({:.4f}) ≈ Theoretical LATE value ({:.4f})\n- All LATE assumptions are satisfied, LATE theorem fully applicable',
-        'scen2_error': '⚠️ **Scenario II Results**: Destructive Impact of Defiers\n- Defiers (comprising {:.0%}) violate the monotonicity assumption\n- 2SLS estimate ({:.4f}) no longer corresponds to any single group\'s effect\n- Defiers\' disruption of the instrument effect causes IV estimates to be distorted\n- This proves monotonicity assumption is necessary for LATE theorem validity',
-        'dist_title': 'Outcome Distribution by Type and Treatment Status',
-        'dist_xaxis': 'Type and Treatment Status'
-    }
-}
-
-# 侧边栏语言选择
-language = st.sidebar.selectbox('Language / 语言', ['English', '中文'], key='language_select')
-lang = 'en' if language == 'English' else 'zh'
-text = lang_dict[lang]
-
-# 设置页面标题
-st.title(text['title'])
-
-# 在侧边栏添加滑块控制参数
-st.sidebar.header(text['param_control'])
-gamma = st.sidebar.slider(text['gamma_label'], min_value=0.1, max_value=2.0, value=1.0, step=0.1, help=text['gamma_help'])
-delta = st.sidebar.slider(text['delta_label'], min_value=0.0, max_value=2.0, value=0.5, step=0.1, help=text['delta_help'])
-phi = st.sidebar.slider(text['phi_label'], min_value=0.0, max_value=2.0, value=0.0, step=0.1, help=text['phi_help'])
-
-# ======================== 异质性处理效应部分 (HTE Section) ========================
-st.sidebar.markdown("---")
-st.sidebar.header(text['hte_section'])
-
-# 动态生成单选框选项，确保纯净的对应语言
-scenario_options = [text['scenario_basic'], text['scenario_one_option'], text['scenario_two_option']]
-scenario_choice_str = st.sidebar.radio(text['scenario_choice'], scenario_options)
-
-# 判断是否使用基础模型
-use_hte = scenario_choice_str != text['scenario_basic']
-
-if use_hte:
-    st.sidebar.markdown(text['prop_setting_title'])
-    st.sidebar.markdown(text['prop_setting_note'])
-    col_prop = st.sidebar.columns([1, 1])
-    
-    with col_prop[0]:
-        prop_compliers_temp = st.number_input(text['compliers_label'], min_value=0.0, max_value=100.0, value=40.0, step=1.0, key='prop_compliers')
-        prop_always_temp = st.number_input(text['always_takers_label'], min_value=0.0, max_value=100.0, value=30.0, step=1.0, key='prop_always')
-    with col_prop[1]:
-        prop_never_temp = st.number_input(text['never_takers_label'], min_value=0.0, max_value=100.0, value=30.0, step=1.0, key='prop_never')
-        prop_defiers_temp = st.number_input(text['defiers_label'], min_value=0.0, max_value=100.0, value=0.0, step=1.0, key='prop_defiers')
-        
-    total = prop_compliers_temp + prop_always_temp + prop_never_temp + prop_defiers_temp
-    if total > 0:
-        prop_compliers = prop_compliers_temp / total
-        prop_always = prop_always_temp / total
-        prop_never = prop_never_temp / total
-        prop_defiers = prop_defiers_temp / total
-    else:
-        prop_compliers, prop_always, prop_never, prop_defiers = 0.4, 0.3, 0.3, 0.0
-        
-    st.sidebar.info(f"""
-{text['adjusted_prop']}:
-- {text['compliers']}: {prop_compliers:.1%}
-- {text['always_takers']}: {prop_always:.1%}
-- {text['never_takers']}: {prop_never:.1%}
-- {text['defiers']}: {prop_defiers:.1%}
-- {text['total']}: {prop_compliers + prop_always + prop_never + prop_defiers:.1%}
-    """)
-    
-    # 警告提示
-    if scenario_choice_str == text['scenario_one_option'] and prop_defiers > 0.01:
-        st.sidebar.warning(text['defier_warn_scen1'])
-    elif scenario_choice_str == text['scenario_two_option'] and prop_defiers < 0.01:
-        st.sidebar.info(text['defier_info_scen2'])
-    
-    # 异质性处理效应大小设置
-    st.sidebar.markdown(text['effect_preset_title'])
-    st.sidebar.info(text['effect_preset_info'])
-    
-    # 固定处理效应值
-    beta_compliers, beta_always, beta_never, beta_defiers = 5.0, 2.0, 2.0, 2.0
-
-# 模型预览区
-st.markdown(f"### {text['model_preview']}")
-st.markdown("---")
-
-if use_hte:
-    st.markdown(text['hte_model_title'])
-    st.markdown("""
-**Structural Form:**
-$$Y_i = \\beta_0 + \\beta_1 X_{1i} + \\boldsymbol{\\beta} \\mathbf{X} + \\epsilon_i$$
-
-**First Stage:**
-$$X_{1i} = \\gamma_0 + \\gamma_1 Z + \\boldsymbol{\\gamma} \\mathbf{X} + v_i$$
-
-**Second Stage (2SLS):**
-$$Y_i = \\mu_0 + \\mu_1 \\hat{X}_{1i} + \\boldsymbol{\\mu} \\mathbf{X} + e_i$$
-    """)
-    
-    st.markdown("---")
-    st.markdown(text['four_types_title'])
-    
-    table_md = """
-| 个体类型 | Z→D 关系 | 数学表达 | 真实处理效应 | 说明 |
-|---------|---------|--------|-----------|------|
-| **Compliers** | 完全遵照 | $D_i = Z$ | $\\beta_{1,comp} = 5.0$ | 受工具变量影响，Z=1时接受处理 |
-| **Always-takers** | 始终接受 | $D_i = 1$ | $\\beta_{1,always} = 2.0$ | 无论Z如何都接受处理 |
-| **Never-takers** | 始终不接受 | $D_i = 0$ | $\\beta_{1,never} = 2.0$ | 无论Z如何都不接受处理 |
-| **Defiers** | 违抗指导 | $D_i = 1 - Z$ | $\\beta_{1,defiers} = 2.0$ | 违背工具变量指导的个体 |
-    """ if lang == 'zh' else """
-| Type | Z→D Relation | Math | True Effect | Description |
-|---------|---------|--------|-----------|------|
-| **Compliers** | Follows | $D_i = Z$ | $\\beta_{1,comp} = 5.0$ | Affected by IV, accepts when Z=1 |
-| **Always-takers** | Always accepts | $D_i = 1$ | $\\beta_{1,always} = 2.0$ | Accepts regardless of Z |
-| **Never-takers** | Never accepts | $D_i = 0$ | $\\beta_{1,never} = 2.0$ | Rejects regardless of Z |
-| **Defiers** | Defies | $D_i = 1 - Z$ | $\\beta_{1,defiers} = 2.0$ | Does opposite of IV assignment |
-    """
-    st.markdown(table_md)
-    
-    st.markdown("---")
-    st.markdown(f"**{text['late_theorem']}**:\n\n$$\\hat{{\\mu}}_1^{{2SLS}} \\xrightarrow{{p}} E[\\beta_{{1,i}} \\mid \\text{{Complier}}] = \\beta_{{1,comp}} = 5.0$$")
-    
-    st.markdown("---")
-    st.markdown(text['model_params'])
-    
-    col1, col2 = st.columns([1, 1])
-    with col1:
-        st.markdown(text['prop_setting_title'])
-        rows_data = [
-            {text['individual_type']: 'Compliers', text['proportion']: f'{prop_compliers:.1%}'},
-            {text['individual_type']: 'Always-takers', text['proportion']: f'{prop_always:.1%}'},
-            {text['individual_type']: 'Never-takers', text['proportion']: f'{prop_never:.1%}'},
-            {text['individual_type']: 'Defiers', text['proportion']: f'{prop_defiers:.1%}'}
-        ]
-        st.dataframe(pd.DataFrame(rows_data), use_container_width=True)
-        if prop_defiers > 0.01 and scenario_choice_str == text['scenario_one_option']:
-            st.warning(text['defier_detect_warn'])
-            
-    with col2:
-        st.markdown(text['effect_preset_title'])
-        effect_data = [
-            {text['individual_type']: 'Compliers', 'βᵢ': f'{beta_compliers:.1f}'},
-            {text['individual_type']: 'Always-takers', 'βᵢ': f'{beta_always:.1f}'},
-            {text['individual_type']: 'Never-takers', 'βᵢ': f'{beta_never:.1f}'},
-            {text['individual_type']: 'Defiers', 'βᵢ': f'{beta_defiers:.1f}'}
-        ]
-        st.dataframe(pd.DataFrame(effect_data), use_container_width=True)
-
-else:
-    st.markdown(f"**{text['original_model']}:**")
-    st.latex(r"Y_i = \beta_0 + \beta_1 X_{1i} + \mathbf{\beta} \mathbf{X} + \varepsilon_i")
-    st.markdown(f"**{text['first_stage']}:**")
-    st.latex(r"X_{1i} = \pi_1 Z_i + \mathbf{\pi} \mathbf{X} + v_i")
-    st.markdown(f"**{text['second_stage']}:**")
-    st.latex(r"Y_i = \mu_0 + \mu_1 \widehat{X_{1i}} + \mathbf{\mu} \mathbf{X} + e_i")
-    st.markdown(text['mu1_unbiased'])
-    st.markdown("---")
-    st.markdown(f"### {text['param_detail']}")
-    
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown(f"#### {text['variable_def']}")
-        st.markdown(f"- **U**: {text['error_term']}，$U \\sim N(0, 1)$\n- **Z**: {text['instrument']}，$Z \\sim N(0, 1)$\n- **X**: {text['endogenous']}\n- **Y**: {text['explained']}")
-    with col2:
-        st.markdown(f"#### {text['param_meaning']}")
-        st.markdown(f"- **γ (gamma)** = {gamma:.2f}: {text['iv_strength']}\n- **δ (delta)** = {delta:.2f}: {text['error_transmission']}\n- **β (beta)** = 1.0: {text['true_effect']}\n\n{text['exclusion_condition']}")
-
-# ======================== 数据生成与回归分析部分 ========================
-np.random.seed(42)
-n = 1000
-
-if use_hte:
-    Z = np.random.binomial(1, 0.5, n)
-    type_probs = [prop_compliers, prop_always, prop_never, prop_defiers]
-    individual_types = np.random.choice(['Compliers', 'Always-takers', 'Never-takers', 'Defiers'], size=n, p=type_probs)
-    
-    D = np.zeros(n)
-    for i in range(n):
-        if individual_types[i] == 'Compliers': D[i] = Z[i]
-        elif individual_types[i] == 'Always-takers': D[i] = 1
-        elif individual_types[i] == 'Never-takers': D[i] = 0
-        elif individual_types[i] == 'Defiers': D[i] = 1 - Z[i]
-    
-    U = np.random.normal(0, 1, n)
-    betas = np.zeros(n)
-    for i in range(n):
-        if individual_types[i] == 'Compliers': betas[i] = beta_compliers
-        elif individual_types[i] == 'Always-takers': betas[i] = beta_always
-        elif individual_types[i] == 'Never-takers': betas[i] = beta_never
-        elif individual_types[i] == 'Defiers': betas[i] = beta_defiers
-    
-    Y = betas * D + U
-    X = D
-else:
-    U = np.random.normal(0, 1, n)
-    Z = np.random.normal(0, 1, n)
-    e1 = np.random.normal(0, 1, n)
-    X = gamma * Z + delta * U + e1
-    
-    alpha = 1.0
-    beta_true = 1.0
-    e2 = np.random.normal(0, 1, n)
-    Y = beta_true * X + alpha * U + phi * Z + e2
-
-# ======================== 回归分析部分 ========================
-if use_hte:
-    D_ols = np.column_stack([np.ones(n), D])
-    beta_ols = np.linalg.lstsq(D_ols, Y, rcond=None)[0]
-    beta_ols_coef = beta_ols[1]
-    Y_pred_ols = D_ols @ beta_ols
-    
-    Z_first = np.column_stack([np.ones(n), Z])
-    pi_hat = np.linalg.lstsq(Z_first, D, rcond=None)[0]
-    D_pred = Z_first @ pi_hat
-    
-    D_second = np.column_stack([np.ones(n), D_pred])
-    beta_2sls = np.linalg.lstsq(D_second, Y, rcond=None)[0]
-    beta_2sls_coef = beta_2sls[1]
-    Y_pred_2sls = D_second @ beta_2sls
-    
-    ssr_ols = np.sum((Y - Y_pred_ols)**2)
-    tss = np.sum((Y - np.mean(Y))**2)
-    r2_ols = 1 - (ssr_ols / tss) if tss > 0 else 0
-    
-    ssr_2sls = np.sum((Y - Y_pred_2sls)**2)
-    r2_2sls = 1 - (ssr_2sls / tss) if tss > 0 else 0
-    
-    try:
-        u_first = np.linalg.lstsq(Z_first, D, rcond=None)[0]
-        D_pred_first = Z_first @ u_first
-        ssr_first = np.sum((D - D_pred_first)**2)
-        msr_z = np.sum((D_pred_first - np.mean(D))**2)
-        f_stat = (msr_z / 1) / (ssr_first / (n - 2)) if ssr_first / (n - 2) > 1e-10 else np.inf
-    except:
-        f_stat = np.nan
-    
-    compliers_ate = beta_compliers if prop_compliers > 0 else 0
-    
-    if prop_defiers == 0:
-        late_theoretical = compliers_ate
-    else:
-        y_given_z1, y_given_z0 = np.mean(Y[Z == 1]), np.mean(Y[Z == 0])
-        d_given_z1, d_given_z0 = np.mean(D[Z == 1]), np.mean(D[Z == 0])
-        late_theoretical = (y_given_z1 - y_given_z0) / (d_given_z1 - d_given_z0) if abs(d_given_z1 - d_given_z0) > 1e-6 else 0
-    
-    st.markdown("---")
-    st.subheader(text['hte_results'])
-    
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown(f"### {text['ols_regression']}")
-        st.metric("β̂_OLS", f"{beta_ols_coef:.4f}", delta=f"{beta_ols_coef - compliers_ate:.4f}")
-        st.metric("R²", f"{r2_ols:.4f}")
-        st.markdown(f"**{text['model']}**: Y = {beta_ols[0]:.4f} + {beta_ols_coef:.4f}·D")
-    with col2:
-        st.markdown(f"### {text['tsls_regression']}")
-        st.metric("β̂_2SLS (LATE)", f"{beta_2sls_coef:.4f}", delta=f"{beta_2sls_coef - late_theoretical:.4f}")
-        st.metric("R²", f"{r2_2sls:.4f}")
-        st.markdown(f"**{text['model']}**: Y = {beta_2sls[0]:.4f} + {beta_2sls_coef:.4f}·D_pred")
-    
-    st.markdown("---")
-    st.subheader(text['iv_diagnosis'])
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric(text['first_stage_f'], f"{f_stat:.2f}")
-        if f_stat < 10: st.warning(f"⚠️ {text['iv_weak']}")
-        else: st.success(f"✓ {text['iv_strong']}")
-    with col2:
-        st.metric(text['correlation'], f"{np.corrcoef(D, Z)[0, 1]:.4f}")
-    with col3:
-        st.metric(text['covariance'], f"{np.cov(D, Z)[0, 1]:.4f}")
-    
-    st.markdown("---")
-    st.subheader(text['late_theorem'])
-    st.markdown(f"{text['late_explanation']}\n\n{text['late_assumption_1']}\n{text['late_assumption_2']}\n{text['late_assumption_3']}\n\n**Analysis**:\n\n{text['late_result_scenario1'] if prop_defiers == 0 else text['late_result_scenario2']}")
-    
-    if prop_defiers > 0:
-        st.warning(text['monotonicity_violation'])
-    
-    st.markdown("---")
-    st.subheader(text['hte_results'])
-    
-    hte_comparison_data = [
-        {text['individual_type']: 'Compliers', text['proportion']: f'{prop_compliers:.0%}', text['true_effect_col']: f'{beta_compliers:.4f}', text['weighted_contrib']: f'{beta_compliers * prop_compliers:.4f}'},
-        {text['individual_type']: 'Always-takers', text['proportion']: f'{prop_always:.0%}', text['true_effect_col']: f'{beta_always:.4f}', text['weighted_contrib']: f'{beta_always * prop_always:.4f}'},
-        {text['individual_type']: 'Never-takers', text['proportion']: f'{prop_never:.0%}', text['true_effect_col']: f'{beta_never:.4f}', text['weighted_contrib']: f'{beta_never * prop_never:.4f}'}
-    ]
-    if prop_defiers > 0:
-        hte_comparison_data.append({text['individual_type']: 'Defiers', text['proportion']: f'{prop_defiers:.0%}', text['true_effect_col']: f'{beta_defiers:.4f}', text['weighted_contrib']: f'{beta_defiers * prop_defiers:.4f}'})
-    
-    st.dataframe(pd.DataFrame(hte_comparison_data), use_container_width=True)
-    
-    pop_ate = (beta_compliers * prop_compliers + beta_always * prop_always + beta_never * prop_never + beta_defiers * prop_defiers)
-    
-    st.markdown(f"""
-{text['key_results']}:
-- **{text['pop_ate']}**: {pop_ate:.4f}
-- **{text['ols_est']}**: {beta_ols_coef:.4f}
-- **{text['tsls_est']}**: {beta_2sls_coef:.4f}
-- **{text['theoretical_late']}**: {late_theoretical:.4f}
-- **{text['tsls_dev']}**: {abs(beta_2sls_coef - late_theoretical):.4f}
-
-{text['explain_title']}:
-    """)
-    if prop_defiers == 0:
-        st.success(text['scen1_success'].format(beta_compliers, beta_2sls_coef, late_theoretical))
-    else:
-        st.error(text['scen2_error'].format(prop_defiers, beta_2sls_coef))
-    
-    st.markdown("---")
-    st.subheader(text['visualization'])
-    
-    fig_box = go.Figure()
-    colors = {'Compliers': 'blue', 'Always-takers': 'green', 'Never-takers': 'orange', 'Defiers': 'red'}
-    
-    for dtype in ['Compliers', 'Always-takers', 'Never-takers', 'Defiers']:
-        if dtype == 'Defiers' and prop_defiers == 0: continue
-        mask = individual_types == dtype
-        if np.any(mask):
-            mask_d0 = mask & (D == 0)
-            if np.any(mask_d0):
-                fig_box.add_trace(go.Box(y=Y[mask_d0], name=f'{dtype} (D=0)', marker_color=colors[dtype], opacity=0.7))
-            mask_d1 = mask & (D == 1)
-            if np.any(mask_d1):
-                fig_box.add_trace(go.Box(y=Y[mask_d1], name=f'{dtype} (D=1)', marker_color=colors[dtype], opacity=1.0))
-    
-    fig_box.update_layout(title=text['dist_title'], yaxis_title="Y", xaxis_title=text['dist_xaxis'], boxmode='group', height=500)
-    st.plotly_chart(fig_box, use_container_width=True)
-    
-else:
-    X_ols = np.column_stack([np.ones(n), X])
-    beta_ols = np.linalg.lstsq(X_ols, Y, rcond=None)[0]
-    beta_ols_coef = beta_ols[1]
-    Y_pred_ols = X_ols @ beta_ols
-
-    X_first = np.column_stack([np.ones(n), Z])
-    gamma_hat = np.linalg.lstsq(X_first, X, rcond=None)[0]
-    X_pred = X_first @ gamma_hat
-
-    X_second = np.column_stack([np.ones(n), X_pred])
-    beta_2sls = np.linalg.lstsq(X_second, Y, rcond=None)[0]
-    beta_2sls_coef = beta_2sls[1]
-    Y_pred_2sls = X_second @ beta_2sls
-
-    ssr_ols = np.sum((Y - Y_pred_ols)**2)
-    tss = np.sum((Y - np.mean(Y))**2)
-    r2_ols = 1 - (ssr_ols / tss)
-
-    ssr_2sls = np.sum((Y - Y_pred_2sls)**2)
-    r2_2sls = 1 - (ssr_2sls / tss)
-
-    try:
-        Z_with_const = np.column_stack([np.ones(n), Z])
-        u_first = np.linalg.lstsq(Z_with_const, X, rcond=None)[0]
-        X_pred_first = Z_with_const @ u_first
-        ssr_first = np.sum((X - X_pred_first)**2)
-        msr_z = np.sum((X_pred_first - np.mean(X))**2)
-        f_stat = (msr_z / 1) / (ssr_first / (n - 2)) if ssr_first / (n - 2) > 1e-10 else np.inf
-    except:
-        f_stat = np.nan
-
-    beta_true = 1.0
-
-    st.markdown("---")
-    st.subheader(text['regression_comparison'])
-
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown(f"### {text['ols_regression']}")
-        st.metric("β̂_OLS", f"{beta_ols_coef:.4f}", delta=f"{beta_ols_coef - beta_true:.4f} ({text['true_value']}: 1.0)")
-        st.metric("R²", f"{r2_ols:.4f}")
-        st.markdown(f"**{text['model']}**: Y = {beta_ols[0]:.4f} + {beta_ols_coef:.4f}·X")
-
-    with col2:
-        st.markdown(f"### {text['tsls_regression']}")
-        st.metric("β̂_2SLS", f"{beta_2sls_coef:.4f}", delta=f"{beta_2sls_coef - beta_true:.4f} ({text['true_value']}: 1.0)")
-        st.metric("R²", f"{r2_2sls:.4f}")
-        st.markdown(f"**{text['model']}**: Y = {beta_2sls[0]:.4f} + {beta_2sls_coef:.4f}·X_pred")
-
-    st.markdown("---")
-    st.subheader(text['iv_diagnosis'])
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric(text['first_stage_f'], f"{f_stat:.2f}")
-        if f_stat < 10: st.warning(f"⚠️ {text['iv_weak']}")
-        else: st.success(f"✓ {text['iv_strong']}")
-    with col2:
-        st.metric(text['correlation'], f"{np.corrcoef(X, Z)[0, 1]:.4f}")
-    with col3:
-        st.metric(text['covariance'], f"{np.cov(X, Z)[0, 1]:.4f}")
-
-    st.markdown("---")
-    st.subheader(text['visualization'])
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=X, y=Y, mode='markers', name=text['data_point'], marker=dict(color='rgba(0, 100, 200, 0.5)', size=4)))
-
-    X_sort_idx = np.argsort(X)
-    X_sort = X[X_sort_idx]
-    
-    fig.add_trace(go.Scatter(x=X_sort, y=Y_pred_ols[X_sort_idx], mode='lines', name=f'OLS (β̂={beta_ols_coef:.4f})', line=dict(color='red', width=2)))
-    fig.add_trace(go.Scatter(x=X_sort, y=Y_pred_2sls[X_sort_idx], mode='lines', name=f'2SLS (β̂={beta_2sls_coef:.4f})', line=dict(color='green', width=2)))
-
-    fig.update_layout(title=text['scatter_plot'], xaxis_title='X', yaxis_title='Y', hovermode='closest', height=500)
-    st.plotly_chart(fig, use_container_width=True)
-
-    st.markdown("---")
-    st.subheader(text['insight'])
-
-    bias_ols = beta_ols_coef - beta_true
-    bias_2sls = beta_2sls_coef - beta_true
-
-    st.markdown(f"""
-
-**{text['explanation']}**:
-    """)
-
-    if lang == 'en':
-            st.markdown("""
-            - When φ > 0, Z directly affects Y, violating the exclusion restriction and causing OLS bias.
-            - 2SLS eliminates this bias using the instrumental variable method.
-            - The stronger the IV (γ), the more precise the 2SLS estimate.
-            - Error transmission (δ) affects the correlation between X and U, impacting the degree of OLS bias.
-            """
-            )
-    elif lang == 'zh':
-        st.markdown("""
-        - 当 φ > 0 时，Z 会直接影响 Y，违反排他性条件，导致 OLS 回归产生偏差。
-        - 2SLS 利用工具变量方法消除该偏差。
-        - 工具变量越强（γ 越大），2SLS 估计越精确。
-        - 误差传导（δ）影响 X 与 U 的相关性，进而影响 OLS 偏差程度。
-        """
-        )
\ No newline at end of file
+import time
+run_start = time.perf_counter()
+
+import streamlit as st
+import numpy as np
+import os
+import warnings
+from iv_engine import TYPE_LABELS, BETA_TRUE, estimates_from_moments, ProgressiveStream
+from iv_engine import population_basic, population_hte, wald_decomposition, concentration, validate
+from iv_engine import MAX_REPS, MAX_ELEMENTS, max_reps_for, summarize, histogram
+from iv_engine import default_cache, basic_key, hte_key, mc_basic_key, mc_hte_key, run_basic, run_hte, run_monte_carlo_basic, run_monte_carlo_hte, run_parameter_sweep, SWEEP_METRICS, SWEEP_REP_COST
+from iv_engine import HEAD_MAX, SE_TYPES, BOOTSTRAP_METHODS, run_inference, run_bootstrap, normal_ci, percentile_ci
+from iv_engine import stock_yogo
+from iv_engine import RunProfiler, ProfileHistory, stage, grouped_box_stats
+from iv_engine import SCENARIO_PRESETS, compare_scenarios, compare_from_store
+from iv_engine import infer_data_format, data_columns, data_rows, run_file_iv
+from iv_engine import BETA_DISTRIBUTIONS, INSTRUMENTS, po_model, run_po
+from iv_engine import STORE_ENV, STORE_N_VALUES, open_store
+from iv_engine import JOB_POLL_SECONDS, default_jobs
+warnings.filterwarnings('ignore')
+
+# 超过这些规模的模拟（n，或蒙特卡洛的 R × n）交给后台工作进程，脚本不等待其完成
+BACKGROUND_MIN_N = 10 ** 6
+BACKGROUND_MIN_ELEMENTS = 5 * 10 ** 7
+
+# 预计算结果库（python -m iv_engine build-store result_store 生成）：默认位于脚本旁的 result_store 目录，
+# 可用环境变量 IV_RESULT_STORE 指定；不存在时为 None，全部在线计算
+result_store = open_store(os.environ.get(STORE_ENV) or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'result_store'))
+
+# 多语言文本字典
+lang_dict = {
+    'zh': {
+        'title': 'IV 理论模拟器：纯理论 IV 模型',
+        'exclusion_condition': '排他性条件: 假设工具变量 Z 仅通过内生变量 X 影响被解释变量 Y，不存在直接影响。',
+        'original_model': '原始模型',
+        'first_stage': '第一阶段',
+        'second_stage': '第二阶段',
+        'mu1_unbiased': '$\\mu_1$ 是无偏估计',
+        'param_control': '模型参数控制',
+        'gamma_label': 'γ (IV 强度)',
+        'gamma_help': '控制工具变量 Z 对 X 的影响强度',
+        'delta_label': 'δ (误差传导)',
+        'delta_help': '控制误差项 U 对 X 的影响',
+        'phi_label': 'φ (排他性违反)',
+        'phi_help': '控制 Z 对 Y 的直接影响',
+        'exclusion_violation': '排他性违反：φ = {:.2f}，Z 直接影响 Y，IV 一致性崩塌！',
+        'weak_iv': '弱工具变量风险：γ = {:.2f}，IV 强度不足，估计量方差将很大！',
+        'endogeneity_bias': '内生性偏差较大：δ = {:.2f}，误差项对 X 影响显著，OLS 将严重有偏！',
+        'model_preview': '📋 理论模型预览',
+        'param_detail': '📚 参数详解',
+        'variable_def': '变量定义',
+        'param_meaning': '参数含义',
+        'error_term': '误差项',
+        'instrument': '工具变量',
+        'endogenous': '内生变量',
+        'explained': '被解释变量',
+        'iv_strength': '工具变量强度',
+        'error_transmission': '误差传导系数',
+        'exclusion_violation_degree': '排他性违反程度',
+        'true_effect': '真实因果效应',
+        'regression_comparison': '📊 实时回归结果对比',
+        'ols_regression': 'OLS 回归',
+        'tsls_regression': '2SLS 回归',
+        'true_value': '真实值',
+        'model': '模型',
+        'iv_diagnosis': '🔍 工具变量诊断',
+        'first_stage_f': '第一阶段 F 统计量',
+        'iv_weak': 'IV 较弱（F < {:.2f}，Stock–Yogo 10% 最大检验水平临界值）',
+        'iv_strong': 'IV 强度足够',
+        'correlation': 'Corr(X, Z)',
+        'covariance': 'Cov(X, Z)',
+        'visualization': '📈 数据可视化',
+        'scatter_plot': 'X vs Y 散点图与回归线',
+        'data_point': '数据点',
+        'insight': '💡 关键洞察',
+        'ols_bias': 'OLS 偏差',
+        'tsls_bias': '2SLS 偏差',
+        'improvement': '改善程度',
+        'explanation': '解释',
+        'hte_section': '🎯 异质性处理效应与四类个体',
+        'scenario_choice': '选择实验场景',
+        'scenario_basic': '基础模型',
+        'scenario_one_option': '场景一：无违抗者 (Defiers = 0%)',
+        'scenario_two_option': '场景二：引入违抗者 (Defiers > 0%)',
+        'scenario_hte': '异质性处理效应模型',
+        'compliers_label': '依从者 (Compliers) %',
+        'always_takers_label': '始终接受者 (Always-takers) %',
+        'never_takers_label': '从不接受者 (Never-takers) %',
+        'defiers_label': '违抗者 (Defiers) %',
+        'compliers': '依从者 (Compliers)',
+        'always_takers': '始终接受者 (Always-takers)',
+        'never_takers': '从不接受者 (Never-takers)',
+        'defiers': '违抗者 (Defiers)',
+        'treatment_effect_compliers': '依从者真实处理效应 (β_C)',
+        'treatment_effect_always': '始终接受者真实处理效应 (β_A)',
+        'treatment_effect_never': '从不接受者真实处理效应 (β_N)',
+        'treatment_effect_defiers': '违抗者真实处理效应 (β_D)',
+        'scenario_one': '场景一：无违抗者 (Defiers = 0%)',
+        'scenario_one_desc': '验证 LATE (Local Average Treatment Effect) 定理 - IV 估计应完美恢复 Compliers 的处理效应',
+        'scenario_two': '场景二：引入违抗者 (Defiers > 0%)',
+        'scenario_two_desc': '展示单调性假设违反的后果 - 违抗者的存在如何扭曲 IV 估计量',
+        'individual_type': '个体类型',
+        'proportion': '比例',
+        'true_effect_col': '真实处理效应',
+        'late_theorem': '🔬 LATE 定理验证',
+        'late_explanation': 'LATE (Local Average Treatment Effect) 承诺在以下假设下，2SLS 估计的是 Compliers 的平均处理效应：',
+        'late_assumption_1': '1. 排他性：Z 只通过 D 影响 Y',
+        'late_assumption_2': '2. 相关性：Z 与 D 相关',
+        'late_assumption_3': '3. 单调性：不存在违抗者 (Defiers)',
+        'late_result_scenario1': '场景一结果：Z→D→Y 的单向因果链，无 Defiers，满足所有 LATE 假设',
+        'late_result_scenario2': '场景二结果：Defiers 的存在违反单调性假设，导致 IV 估计不再等于任何组的单一处理效应',
+        'monotonicity_violation': '⚠️ 单调性假设违反：当 Z=1 时部分个体不接受处理，当 Z=0 时又接受处理',
+        'hte_results': '异质性处理效应结果对比',
+        'scenario_label': '实验场景',
+        'prop_setting_title': '**四类个体比例设置**',
+        'prop_setting_note': '*注：比例总和将自动调整为100%*',
+        'adjusted_prop': '**调整后的比例**',
+        'total': '**总计**',
+        'defier_warn_scen1': '⚠️ 场景一应使用 0% Defiers 来验证 LATE 定理',
+        'defier_info_scen2': 'ℹ️ 场景二建议设置 Defiers > 0 来观察其影响',
+        'effect_preset_title': '**处理效应预设值**',
+        'effect_preset_info': '根据潜在结果框架：\n- 依从者 β_comp = 5.0\n- 始终接受者 β_always = 2.0\n- 从不接受者 β_never = 2.0\n- 违抗者 β_defiers = 2.0',
+        'hte_model_title': '#### 潜在结果框架中的 LATE 模型与异质性处理效应',
+        'four_types_title': '**潜在结果框架中的四类个体与异质性处理效应**',
+        'model_params': '#### 模型参数',
+        'defier_detect_warn': '⚠️ 检测到 Defiers。这会违反单调性假设！',
+        'weighted_contrib': '加权贡献',
+        'pop_ate': '人口平均处理效应 (Population ATE)',
+        'ols_est': 'OLS 估计',
+        'tsls_est': '2SLS 估计 (LATE)',
+        'theoretical_late': '理论 LATE 值',
+        'tsls_dev': '2SLS 偏差',
+        'key_results': '**关键结果**',
+        'explain_title': '**解释**',
+        'scen1_success': '✓ **场景一验证成功**：无违抗者存在\n- 2SLS 完美恢复了依从者的真实处理效应 ({:.4f})\n- IV 估计值 ({:.4f}) ≈ 理论 LATE 值 ({:.4f})\n- 所有 LATE 假设得到满足，LATE 定理完全适用',
+        'scen2_error': '⚠️ **场景二结果展示**：违抗者的破坏性影响\n- Defiers (占 {:.0%}) 的存在违反了单调性假设\n- 2SLS 估计值 ({:.4f}) 不再对应任何单一群体的处理效应\n- 违抗者对工具变量效应的中断导致 IV 估计被扭曲\n- 这证明单调性假设对于 LATE 定理的有效性是必要的',
+        'dist_title': '按个体类型和处理状态分组的结果变量(Y)分布',
+        'dist_xaxis': '类型和处理状态',
+        'sample_section': '🎛 样本设置',
+        'n_label': '样本量 n',
+        'n_help': '增大 n 时在已有样本后追加新观测，只计算新增部分',
+        'seed_label': '随机种子',
+        'seed_help': '相同种子与参数下结果完全可复现',
+        'background_enable': '大规模模拟在后台运行',
+        'background_help': 'n ≥ 1,000,000（或蒙特卡洛 R × n ≥ 5×10⁷）时在后台工作进程中计算，页面保持可操作；修改参数会取消旧任务，相同的请求在所有会话间只计算一次。',
+        'job_queued': '⏳ 任务排队中…',
+        'job_running': '⚙️ 后台计算中…',
+        'job_partial': '已处理 {:,} 个观测：β̂_OLS = {:.4f}，β̂_2SLS = {:.4f}',
+        'job_count': '已完成 {:,} 次重复',
+        'job_stats': '后台任务：已提交 {}，去重 {}，缓存直接返回 {}，已取消 {}，失败 {}；排队 {}，运行 {}（{} 个工作进程）',
+        'progress_text': '正在生成数据：{:,} / {:,} 个观测 — β̂_OLS = {:.4f}，β̂_2SLS = {:.4f}',
+        'plot_subsample': '图形基于前 {:,} 个观测（共 {:,} 个）；回归结果使用全部观测',
+        'reps_capped': '受计算规模限制（R × n ≤ {:,}），重复次数降为 {:,}',
+        'mc_section': '🎲 蒙特卡洛模拟',
+        'mc_enable': '启用蒙特卡洛模式',
+        'mc_reps': '重复次数 R',
+        'mc_reps_help': '对当前模型独立重复抽样 R 次（每次样本量为侧边栏的 n），观察估计量的抽样分布',
+        'mc_title': '🎲 抽样分布（蒙特卡洛）',
+        'mc_caption': '基于 {:,} 次独立重复，每次 n = {:,}',
+        'mc_estimator': '估计量',
+        'mc_mean': '均值',
+        'mc_median': '中位数',
+        'mc_std': '标准差',
+        'mc_bias': '偏差',
+        'mc_rmse': 'RMSE',
+        'mc_count': '频数',
+        'mc_weak_share': 'F < 10 的重复占比：{:.1%}',
+        'mc_clipped': '显示区间外的重复占比：{:.1%}',
+        'mc_reference': '参考值',
+        'debug_panel': '🛠 调试面板',
+        'cache_hits': '缓存命中',
+        'cache_misses': '缓存未命中',
+        'cache_entries': '缓存条目',
+        'cache_memory': '缓存内存',
+        'cache_evictions': '淘汰次数',
+        'cache_shared': '过期 {} 次；并发的相同请求合并 {} 次；磁盘命中 {} 次',
+        'cache_backend': '磁盘缓存 {}：{} 个条目，{:.1f} / {:.0f} MB，命中率 {:.1%}，淘汰 {} 次',
+        'cache_clear': '清空缓存',
+        'run_time': '本次运行耗时',
+        'store_status': '预计算结果库：命中 {} 次，未命中 {} 次（{} 个样本量，{} 个 HTE 预设）',
+        'store_missing': '未找到预计算结果库，全部在线计算（python -m iv_engine build-store result_store 可生成）',
+        'profile_enable': '⏱ 性能分析',
+        'profile_help': '记录每次运行中各阶段（随机数、数据生成、交叉乘积、OLS、2SLS、F、推断、图表、表格）的耗时与峰值内存。开启后内存跟踪会略微拖慢运行。',
+        'profile_stage': '阶段',
+        'profile_calls': '次数',
+        'profile_time': '耗时 (ms)',
+        'profile_peak': '峰值内存 (MB)',
+        'profile_total': '总耗时 (ms)',
+        'profile_run': '运行',
+        'profile_last': '本次运行：{:.0f} ms。嵌套阶段的耗时同时计入外层阶段；缓存命中时不出现数据生成阶段。',
+        'profile_history': '最近 {} 次运行',
+        'profile_download': '导出 Chrome trace (JSON)',
+        'tab_results': '📊 估计结果',
+        'tab_figures': '📈 图表',
+        'tab_model': '📋 模型说明',
+        'tab_mc': '🎲 蒙特卡洛',
+        'tab_sweep': '📐 参数扫描',
+        'tab_compare': '🆚 场景比较',
+        'tab_data': '📂 真实数据',
+        'tab_po': '🧬 潜在结果',
+        'data_intro': '把同样的 OLS 与 2SLS 比较和弱工具变量诊断用于真实数据集。文件按列分块读取（Parquet 以内存映射方式打开），只累加交叉乘积，不会把完整的设计矩阵载入内存。',
+        'data_source': '数据来源',
+        'data_upload': '上传文件',
+        'data_path': '服务器上的文件路径',
+        'data_file_label': 'CSV 或 Parquet 文件',
+        'data_not_found': '找不到文件：{}',
+        'data_w': '外生协变量 W（可选）',
+        'data_robust': '计算异方差稳健诊断（Kleibergen–Paap、有效 F、Hansen J，需要再读一遍数据）',
+        'data_run': '运行估计',
+        'data_progress': '已读取 {:,} 行',
+        'data_regressor': '回归元',
+        'data_first_stage': '第一阶段偏 F（{}）',
+        'data_caption': '使用 {:,} 行完整观测（读取 {:,} 行，删除含缺失值的 {:,} 行）。2SLS 标准误为同方差标准误，残差用真实 X 计算。',
+        'data_overid': '过度识别检验',
+        'data_p_value': 'p 值',
+        'compare_section': '🆚 场景比较',
+        'compare_save_name': '预设名称',
+        'compare_save': '保存当前参数为预设',
+        'compare_saved': '已保存预设“{}”，可在“场景比较”标签页中选择。',
+        'compare_select': '参与比较的场景',
+        'compare_scenario': '场景',
+        'compare_empty': '请至少选择一个场景。',
+        'compare_chart_title': '各场景的估计值与总体真值（n = {:,}，seed = {}）',
+        'compare_caption': '所有场景使用相同的 n 与随机种子，在线程池中并发计算；已计算过的场景直接取自缓存。基础模型的 LATE 与 ATE 均为 β = 1。自定义预设只保存在当前会话中。',
+        'po_intro': '一般化的潜在结果模型：个体处理效应 β_i 连续分布，工具变量 Z 可以是连续或多值的，个体按未观测的处理阻力 V 选择是否接受处理（V 越小越容易被处理）。ATE、ATT、ATU、LATE 与 2SLS 都是边际处理效应 MTE(v) = E[β | V = v] 的不同加权平均。使用侧边栏的样本量与随机种子。',
+        'po_instrument': '工具变量',
+        'po_continuous': '连续 Z ~ N(0, 1)',
+        'po_discrete': '多值 Z ∈ {0, …, K-1}',
+        'po_levels': '取值个数 K',
+        'po_pi0': '选择方程截距 π₀',
+        'po_pi1': '工具变量系数 π₁',
+        'po_beta_dist': 'β_i 的分布',
+        'po_normal': '正态',
+        'po_lognormal': '对数正态',
+        'po_two_point': '两点分布',
+        'po_beta_mean': 'β_i 的均值',
+        'po_beta_sd': 'β_i 的标准差',
+        'po_rho_gain': '收益上的选择 ρ_gain',
+        'po_rho_u': '水平上的选择 ρ_U',
+        'po_progress': '已模拟 {:,} / {:,} 个观测',
+        'po_mte_title': '边际处理效应曲线与权重（n = {:,}）',
+        'po_mte_names': ('总体 MTE(v)', '样本分组均值', '权重 ω(v)'),
+        'po_weights': '显示权重',
+        'po_parameter': '参数',
+        'po_population': '总体值',
+        'po_simulated': '样本估计（全部 n 个观测）',
+        'po_low': 'V < 1/3 的贡献',
+        'po_mid': '1/3 ≤ V < 2/3 的贡献',
+        'po_high': 'V ≥ 2/3 的贡献',
+        'po_decomposition': '加权分解',
+        'po_caption': '总体值由闭式 MTE 与权重数值积分得到，各区间贡献之和等于参数值。LATE 为 P(Z) 在 {} 与 {} 两点之间的个体（倾向得分 {:.3f} 至 {:.3f}）。OLS 的偏差来自水平上的选择（ρ_U）与处理者/未处理者的差异；2SLS 的目标是 IV 权重下的加权平均，一般不等于 ATE。',
+        'tab_disabled': '在侧边栏中启用后显示（参数扫描仅适用于基础模型）',
+        'population_title': '📐 解析结果（总体概率极限，无需模拟）',
+        'expected_f': '预期 F 统计量',
+        'expected_f_help': 'E[F] ≈ 1 + μ²，集中参数 μ² = n·R²/(1−R²)，R² 为总体第一阶段 R²',
+        'wald_decomp_title': 'Wald 比率分解（总体）',
+        'wald_weight': '权重',
+        'wald_decomp_caption': '第一阶段 P(Complier) − P(Defier) = {:.4f}；简约式 = {:.4f}；Wald 比率（2SLS 概率极限）= {:.4f}；LATE = {:.4f}；Defiers 造成的偏差 = {:.4f}',
+        'mc_plim': '解析概率极限',
+        'inference_title': '🎯 统计推断',
+        'se_type': '标准误类型',
+        'estimate': '估计值',
+        'std_error': '标准误',
+        'ci_95': '95% 置信区间',
+        'inference_caption': 'OLS 与 2SLS 行为估计值 ± 1.96 × 所选标准误（HC0–HC3 为异方差稳健标准误，2SLS 残差用真实 X 计算）。Anderson–Rubin 置信集反演 AR 检验得到，在弱工具变量下仍有正确的覆盖率。',
+        'weak_iv_title': '弱工具变量诊断',
+        'weak_statistic': '统计量',
+        'weak_value': '值',
+        'weak_critical': '5% 临界值',
+        'weak_verdict': '结论',
+        'weak_pass': '✓ 强',
+        'weak_fail': '⚠️ 弱',
+        'weak_stat_cd': 'Cragg–Donald F（对照 Stock–Yogo 10% 最大检验水平）',
+        'weak_stat_cd_bias': 'Cragg–Donald F（对照 Stock–Yogo 10% 最大相对偏差）',
+        'weak_stat_kp': 'Kleibergen–Paap rk Wald F（稳健）',
+        'weak_stat_eff': 'Montiel Olea–Pflueger 有效 F（τ = 10%）',
+        'weak_caption': '单工具变量时 Cragg–Donald F 即第一阶段 F。临界值从内置表格查得（有效 F 按有效自由度 K_eff = {:.2f} 插值）。单工具变量时恰好识别，没有 Sargan/Hansen 过度识别检验；Stock–Yogo 偏差临界值要求至少 3 个工具变量。',
+        'ar_unbounded': 'Anderson–Rubin 置信集无界：工具变量太弱，数据无法确定 β，2SLS 点估计主要是噪声。',
+        'boot_enable': '自助法置信区间',
+        'boot_method': '自助法类型',
+        'boot_pairs': '配对自助法',
+        'boot_wild': '野自助法（Rademacher）',
+        'boot_reps': '自助法重复次数 B',
+        'boot_too_large': '自助法需要把全部样本保存在内存中，仅在 n ≤ {:,} 时可用。',
+        'boot_caption': 'B = {:,} 次重抽样的百分位数置信区间与自助法标准误。野自助法固定 X，不反映弱工具变量下 2SLS 的非正态性。',
+        'mc_z': 'z（中位数 − plim）',
+        'mc_validation_caption': '用解析概率极限校验模拟结果：z = (中位数 − plim) / 中位数标准误。OLS 的 |z| 应较小；2SLS 在弱工具变量下 |z| 较大反映的是有限样本偏差。',
+        'sweep_section': '📐 参数扫描',
+        'sweep_enable': '启用 (γ, δ, φ) 全网格扫描',
+        'sweep_reps': '每个网格点的重复次数',
+        'sweep_reps_help': '在 20×21×21 个网格点上各做 R 次蒙特卡洛重复（所有网格点共用同一组随机数）',
+        'sweep_title': '📐 偏差与 RMSE 曲面（基础模型参数扫描）',
+        'sweep_caption': '{:,} 个网格点 × 每点 {:,} 次重复，n = {:,}；下图固定 φ = {:.1f}（当前滑块值）',
+        'sweep_metric': '指标',
+        'sweep_surface': '三维曲面',
+        'bias_ols': 'OLS 偏差',
+        'bias_2sls': '2SLS 偏差（均值）',
+        'median_bias_2sls': '2SLS 偏差（中位数）',
+        'rmse_ols': 'OLS RMSE',
+        'rmse_2sls': '2SLS RMSE',
+        'weak_rate': '弱工具变量比例 (F < 10)'
+    },
+    'en': {
+        'title': 'IV Theory Simulator: Pure Theoretical IV Model',
+        'exclusion_condition': 'Exclusion restriction: Instrument Z affects dependent variable Y only through endogenous variable X, with no direct effect.',
+        'original_model': 'Original model',
+        'first_stage': 'First stage',
+        'second_stage': 'Second stage',
+        'mu1_unbiased': '$\\mu_1$ is unbiased estimator',
+        'param_control': 'Model Parameter Control',
+        'gamma_label': 'γ (IV Strength)',
+        'gamma_help': 'Control the effect of instrument Z on X',
+        'delta_label': 'δ (Error Transmission)',
+        'delta_help': 'Control the effect of error term U on X',
+        'phi_label': 'φ (Exclusion Restriction Violation)',
+        'phi_help': 'Control direct effect of Z on Y',
+        'exclusion_violation': 'Exclusion Restriction Violated: φ = {:.2f}, Z directly affects Y, IV consistency collapsed!',
+        'weak_iv': 'Weak Instrument Risk: γ = {:.2f}, insufficient IV strength, estimator variance will be large!',
+        'endogeneity_bias': 'Large Endogeneity Bias: δ = {:.2f}, error term has significant effect on X, OLS will be severely biased!',
+        'model_preview': '📋 Theoretical Model Preview',
+        'param_detail': '📚 Parameter Details',
+        'variable_def': 'Variable Definitions',
+        'param_meaning': 'Parameter Meanings',
+        'error_term': 'Error term',
+        'instrument': 'Instrument variable',
+        'endogenous': 'Endogenous variable',
+        'explained': 'Dependent variable',
+        'iv_strength': 'Instrument strength',
+        'error_transmission': 'Error transmission coefficient',
+        'exclusion_violation_degree': 'Exclusion violation degree',
+        'true_effect': 'True causal effect',
+        'regression_comparison': '📊 Real-time Regression Comparison',
+        'ols_regression': 'OLS Regression',
+        'tsls_regression': '2SLS Regression',
+        'true_value': 'True value',
+        'model': 'Model',
+        'iv_diagnosis': '🔍 Instrument Variable Diagnosis',
+        'first_stage_f': 'First-Stage F-Statistic',
+        'iv_weak': 'Weak IV (F < {:.2f}, Stock–Yogo 10% maximal size critical value)',
+        'iv_strong': 'IV Strength Sufficient',
+        'correlation': 'Corr(X, Z)',
+        'covariance': 'Cov(X, Z)',
+        'visualization': '📈 Data Visualization',
+        'scatter_plot': 'Scatter Plot: X vs Y with Regression Lines',
+        'data_point': 'Data Points',
+        'insight': '💡 Key Insights',
+        'ols_bias': 'OLS Bias',
+        'tsls_bias': '2SLS Bias',
+        'improvement': 'Improvement',
+        'explanation': 'Explanation',
+        'hte_section': '🎯 Heterogeneous Treatment Effects (HTE)',
+        'scenario_choice': 'Choose Experiment Scenario',
+        'scenario_basic': 'Basic Model',
+        'scenario_one_option': 'Scenario I: No Defiers (Defiers = 0%)',
+        'scenario_two_option': 'Scenario II: With Defiers (Defiers > 0%)',
+        'scenario_hte': 'Heterogeneous Treatment Effects Model',
+        'compliers_label': 'Compliers %',
+        'always_takers_label': 'Always-takers %',
+        'never_takers_label': 'Never-takers %',
+        'defiers_label': 'Defiers %',
+        'compliers': 'Compliers',
+        'always_takers': 'Always-takers',
+        'never_takers': 'Never-takers',
+        'defiers': 'Defiers',
+        'treatment_effect_compliers': 'Compliers True Treatment Effect (β_C)',
+        'treatment_effect_always': 'Always-takers True Treatment Effect (β_A)',
+        'treatment_effect_never': 'Never-takers True Treatment Effect (β_N)',
+        'treatment_effect_defiers': 'Defiers True Treatment Effect (β_D)',
+        'scenario_one': 'Scenario I: No Defiers (Defiers = 0%)',
+        'scenario_one_desc': 'Verify LATE Theorem - IV estimate should perfectly recover Compliers effect',
+        'scenario_two': 'Scenario II: With Defiers (Defiers > 0%)',
+        'scenario_two_desc': 'Demonstrate consequences of monotonicity violation',
+        'individual_type': 'Individual Type',
+        'proportion': 'Proportion',
+        'true_effect_col': 'True Effect',
+        'late_theorem': '🔬 LATE Theorem Verification',
+        'late_explanation': 'LATE guarantees that under the following assumptions, 2SLS estimates the average treatment effect for Compliers:',
+        'late_assumption_1': '1. Exclusion: Z affects Y only through D',
+        'late_assumption_2': '2. Relevance: Z is correlated with D',
+        'late_assumption_3': '3. Monotonicity: No Defiers exist',
+        'late_result_scenario1': 'Scenario I Result: Unidirectional causal chain Z→D→Y, no Defiers, all LATE assumptions satisfied',
+        'late_result_scenario2': "Scenario II Result: Defiers violate monotonicity, IV estimate no longer equals any single group's treatment effect", 
+        'monotonicity_violation': '⚠️ Monotonicity Assumption Violated: When Z=1 some individuals reject treatment, when Z=0 some still accept',
+        'hte_results': 'Heterogeneous Treatment Effects Results',
+        'scenario_label': 'Experiment Scenario',
+        'prop_setting_title': '**Individual Type Proportions**',
+        'prop_setting_note': '*Note: The sum will be automatically adjusted to 100%*',
+        'adjusted_prop': '**Adjusted Proportions**',
+        'total': '**Total**',
+        'defier_warn_scen1': '⚠️ Scenario I should use 0% Defiers to verify LATE',
+        'defier_info_scen2': 'ℹ️ Scenario II recommends Defiers > 0 to observe impact',
+        'effect_preset_title': '**Treatment Effect Preset Values**',
+        'effect_preset_info': 'Based on Potential Outcomes Framework:\n- Compliers (β_comp) = 5.0\n- Always-takers (β_always) = 2.0\n- Never-takers (β_never) = 2.0\n- Defiers (β_defiers) = 2.0',
+        'hte_model_title': '#### LATE Model with Heterogeneous Treatment Effects',
+        'four_types_title': '**Four Types with Heterogeneous Effects in Potential Outcomes Framework**',
+        'model_params': '#### Model Parameters',
+        'defier_detect_warn': '⚠️ Defiers detected. This violates the monotonicity assumption!',
+        'weighted_contrib': 'Weighted Contribution',
+        'pop_ate': 'Population Average Treatment Effect (ATE)',
+        'ols_est': 'OLS Estimate',
+        'tsls_est': '2SLS Estimate (LATE)',
+        'theoretical_late': 'Theoretical LATE Value',
+        'tsls_dev': '2SLS Deviation',
+        'key_results': '**Key Results**',
+        'explain_title': '**Explanation**',
+        'scen1_success': '✓ **Scenario I Verification Success**: No Defiers present\n- 2SLS perfectly recovers Compliers\' true treatment effect ({:.4f})\n- IV estimate ({:.4f}) ≈ Theoretical LATE value ({:.4f})\n- All LATE assumptions are satisfied, LATE theorem fully applicable',
+        'scen2_error': '⚠️ **Scenario II Results**: Destructive Impact of Defiers\n- Defiers (comprising {:.0%}) violate the monotonicity assumption\n- 2SLS estimate ({:.4f}) no longer corresponds to any single group\'s effect\n- Defiers\' disruption of the instrument effect causes IV estimates to be distorted\n- This proves monotonicity assumption is necessary for LATE theorem validity',
+        'dist_title': 'Outcome Distribution by Type and Treatment Status',
+        'dist_xaxis': 'Type and Treatment Status',
+        'sample_section': '🎛 Sample Settings',
+        'n_label': 'Sample size n',
+        'n_help': 'Increasing n appends new observations to the existing sample and only computes the new part',
+        'seed_label': 'Random seed',
+        'seed_help': 'Results are fully reproducible for the same seed and parameters',
+        'background_enable': 'Run large simulations in the background',
+        'background_help': 'For n ≥ 1,000,000 (or Monte Carlo R × n ≥ 5×10⁷) the work runs in background worker processes and the page stays responsive. Changing parameters cancels the old job, and identical requests are computed once across all sessions.',
+        'job_queued': '⏳ Job queued…',
+        'job_running': '⚙️ Computing in the background…',
+        'job_partial': '{:,} observations so far: β̂_OLS = {:.4f}, β̂_2SLS = {:.4f}',
+        'job_count': '{:,} replications done',
+        'job_stats': 'Background jobs: {} submitted, {} deduplicated, {} served from cache, {} cancelled, {} failed; {} queued, {} running ({} workers)',
+        'progress_text': 'Generating data: {:,} / {:,} observations — β̂_OLS = {:.4f}, β̂_2SLS = {:.4f}',
+        'plot_subsample': 'Plots use the first {:,} of {:,} observations; regression results use all observations',
+        'reps_capped': 'Replications reduced to {1:,} to stay within the compute budget (R × n ≤ {0:,})',
+        'mc_section': '🎲 Monte Carlo Simulation',
+        'mc_enable': 'Enable Monte Carlo mode',
+        'mc_reps': 'Replications R',
+        'mc_reps_help': 'Redraw the current model R independent times (each with the sidebar sample size n) to see the sampling distribution of the estimators',
+        'mc_title': '🎲 Sampling Distribution (Monte Carlo)',
+        'mc_caption': 'Based on {:,} independent replications, n = {:,} each',
+        'mc_estimator': 'Estimator',
+        'mc_mean': 'Mean',
+        'mc_median': 'Median',
+        'mc_std': 'Std. Dev.',
+        'mc_bias': 'Bias',
+        'mc_rmse': 'RMSE',
+        'mc_count': 'Count',
+        'mc_weak_share': 'Share of replications with F < 10: {:.1%}',
+        'mc_clipped': 'Share of replications outside the plotted range: {:.1%}',
+        'mc_reference': 'Reference',
+        'debug_panel': '🛠 Debug Panel',
+        'cache_hits': 'Cache hits',
+        'cache_misses': 'Cache misses',
+        'cache_entries': 'Cache entries',
+        'cache_memory': 'Cache memory',
+        'cache_evictions': 'Evictions',
+        'cache_shared': '{} expired; {} concurrent identical requests coalesced; {} disk hits',
+        'cache_backend': 'Disk cache {}: {} entries, {:.1f} / {:.0f} MB, hit rate {:.1%}, {} evictions',
+        'cache_clear': 'Clear cache',
+        'run_time': 'Script run time',
+        'store_status': 'Precomputed store: {} hits, {} misses ({} sample sizes, {} HTE presets)',
+        'store_missing': 'No precomputed store found; everything is computed live (build one with python -m iv_engine build-store result_store)',
+        'profile_enable': '⏱ Profiling',
+        'profile_help': 'Record wall time and peak memory of each stage (RNG, data generation, cross-products, OLS, 2SLS, F, inference, figures, tables) on every rerun. Memory tracking slows the run down slightly while enabled.',
+        'profile_stage': 'Stage',
+        'profile_calls': 'Calls',
+        'profile_time': 'Time (ms)',
+        'profile_peak': 'Peak memory (MB)',
+        'profile_total': 'Total (ms)',
+        'profile_run': 'Run',
+        'profile_last': 'This run: {:.0f} ms. Nested stages are also counted in their enclosing stage; data generation is absent on a cache hit.',
+        'profile_history': 'Last {} runs',
+        'profile_download': 'Export Chrome trace (JSON)',
+        'tab_results': '📊 Estimates',
+        'tab_figures': '📈 Figures',
+        'tab_model': '📋 Model',
+        'tab_mc': '🎲 Monte Carlo',
+        'tab_sweep': '📐 Parameter Sweep',
+        'tab_compare': '🆚 Compare Scenarios',
+        'tab_data': '📂 Real Data',
+        'tab_po': '🧬 Potential Outcomes',
+        'data_intro': 'Apply the same OLS vs 2SLS comparison and weak-instrument diagnostics to a real dataset. The file is read in column chunks (Parquet is memory-mapped) and only cross-products are accumulated, so the full design matrix is never loaded.',
+        'data_source': 'Data source',
+        'data_upload': 'Upload a file',
+        'data_path': 'File path on the server',
+        'data_file_label': 'CSV or Parquet file',
+        'data_not_found': 'File not found: {}',
+        'data_w': 'Exogenous covariates W (optional)',
+        'data_robust': 'Heteroskedasticity-robust diagnostics (Kleibergen–Paap, effective F, Hansen J; reads the data a second time)',
+        'data_run': 'Run estimation',
+        'data_progress': '{:,} rows read',
+        'data_regressor': 'Regressor',
+        'data_first_stage': 'First-stage partial F ({})',
+        'data_caption': '{:,} complete rows used ({:,} read, {:,} with missing values dropped). 2SLS standard errors are homoskedastic, with residuals computed from the actual X.',
+        'data_overid': 'Overidentification test',
+        'data_p_value': 'p-value',
+        'compare_section': '🆚 Scenario Comparison',
+        'compare_save_name': 'Preset name',
+        'compare_save': 'Save current parameters as preset',
+        'compare_saved': 'Saved preset "{}"; select it in the Compare Scenarios tab.',
+        'compare_select': 'Scenarios to compare',
+        'compare_scenario': 'Scenario',
+        'compare_empty': 'Select at least one scenario.',
+        'compare_chart_title': 'Estimates and population values by scenario (n = {:,}, seed = {})',
+        'compare_caption': 'All scenarios use the same n and seed and are computed concurrently in a thread pool; scenarios computed before are taken from the cache. For the basic model both LATE and ATE equal β = 1. Saved presets live in the current session only.',
+        'po_intro': 'A generalized potential-outcomes model: individual effects β_i are continuously distributed, the instrument Z can be continuous or multi-valued, and people select into treatment by an unobserved resistance V (lower V means more likely to be treated). ATE, ATT, ATU, LATE and 2SLS are all different weighted averages of the marginal treatment effect MTE(v) = E[β | V = v]. Uses the sample size and seed from the sidebar.',
+        'po_instrument': 'Instrument',
+        'po_continuous': 'Continuous Z ~ N(0, 1)',
+        'po_discrete': 'Multi-valued Z ∈ {0, …, K-1}',
+        'po_levels': 'Number of values K',
+        'po_pi0': 'Selection intercept π₀',
+        'po_pi1': 'Instrument coefficient π₁',
+        'po_beta_dist': 'Distribution of β_i',
+        'po_normal': 'Normal',
+        'po_lognormal': 'Lognormal',
+        'po_two_point': 'Two-point',
+        'po_beta_mean': 'Mean of β_i',
+        'po_beta_sd': 'Std. dev. of β_i',
+        'po_rho_gain': 'Selection on gains ρ_gain',
+        'po_rho_u': 'Selection on levels ρ_U',
+        'po_progress': 'Simulated {:,} / {:,} observations',
+        'po_mte_title': 'Marginal treatment effect and weights (n = {:,})',
+        'po_mte_names': ('Population MTE(v)', 'Sample bin means', 'Weight ω(v)'),
+        'po_weights': 'Weights to show',
+        'po_parameter': 'Parameter',
+        'po_population': 'Population',
+        'po_simulated': 'Sample estimate (all n draws)',
+        'po_low': 'Contribution V < 1/3',
+        'po_mid': 'Contribution 1/3 ≤ V < 2/3',
+        'po_high': 'Contribution V ≥ 2/3',
+        'po_decomposition': 'Weighted decomposition',
+        'po_caption': 'Population values integrate the closed-form MTE against each weight; the contributions add up to the parameter. LATE covers people who switch between Z = {} and Z = {} (propensity {:.3f} to {:.3f}). OLS is biased by selection on levels (ρ_U) and by treated/untreated differences; 2SLS targets the IV-weighted average, which generally differs from the ATE.',
+        'tab_disabled': 'Enable this in the sidebar to show it (the parameter sweep is available for the basic model only).',
+        'population_title': '📐 Analytic Results (population probability limits, no simulation)',
+        'expected_f': 'Expected F-statistic',
+        'expected_f_help': 'E[F] ≈ 1 + μ², with concentration parameter μ² = n·R²/(1−R²) and R² the population first-stage R²',
+        'wald_decomp_title': 'Wald Ratio Decomposition (population)',
+        'wald_weight': 'Weight',
+        'wald_decomp_caption': 'First stage P(Complier) − P(Defier) = {:.4f}; reduced form = {:.4f}; Wald ratio (2SLS probability limit) = {:.4f}; LATE = {:.4f}; bias due to Defiers = {:.4f}',
+        'mc_plim': 'Analytic plim',
+        'inference_title': '🎯 Inference',
+        'se_type': 'Standard error type',
+        'estimate': 'Estimate',
+        'std_error': 'Std. Error',
+        'ci_95': '95% CI',
+        'inference_caption': 'OLS and 2SLS rows show estimate ± 1.96 × the selected standard error (HC0–HC3 are heteroskedasticity-robust; 2SLS residuals use the actual X). The Anderson–Rubin set inverts the AR test and keeps correct coverage with weak instruments.',
+        'weak_iv_title': 'Weak-instrument diagnostics',
+        'weak_statistic': 'Statistic',
+        'weak_value': 'Value',
+        'weak_critical': '5% critical value',
+        'weak_verdict': 'Verdict',
+        'weak_pass': '✓ strong',
+        'weak_fail': '⚠️ weak',
+        'weak_stat_cd': 'Cragg–Donald F (vs. Stock–Yogo 10% maximal size)',
+        'weak_stat_cd_bias': 'Cragg–Donald F (vs. Stock–Yogo 10% maximal relative bias)',
+        'weak_stat_kp': 'Kleibergen–Paap rk Wald F (robust)',
+        'weak_stat_eff': 'Montiel Olea–Pflueger effective F (τ = 10%)',
+        'weak_caption': 'With one instrument the Cragg–Donald F equals the first-stage F. Critical values are looked up from bundled tables (the effective-F value is interpolated at the effective degrees of freedom K_eff = {:.2f}). With a single instrument the model is just identified, so there is no Sargan/Hansen overidentification test; Stock–Yogo bias critical values need at least 3 instruments.',
+        'ar_unbounded': 'The Anderson–Rubin confidence set is unbounded: the instrument is too weak for the data to pin down β, and the 2SLS point estimate is mostly noise.',
+        'boot_enable': 'Bootstrap confidence intervals',
+        'boot_method': 'Bootstrap type',
+        'boot_pairs': 'Pairs bootstrap',
+        'boot_wild': 'Wild bootstrap (Rademacher)',
+        'boot_reps': 'Bootstrap replications B',
+        'boot_too_large': 'The bootstrap keeps the whole sample in memory and is available for n ≤ {:,} only.',
+        'boot_caption': 'Percentile intervals and bootstrap standard errors from B = {:,} resamples. The wild bootstrap holds X fixed and does not reflect the non-normality of 2SLS under weak instruments.',
+        'mc_z': 'z (median − plim)',
+        'mc_validation_caption': 'The simulation is checked against the analytic probability limits: z = (median − plim) / standard error of the median. |z| should be small for OLS; a large |z| for 2SLS under a weak instrument reflects finite-sample bias.',
+        'sweep_section': '📐 Parameter Sweep',
+        'sweep_enable': 'Run full (γ, δ, φ) grid sweep',
+        'sweep_reps': 'Replications per grid point',
+        'sweep_reps_help': 'R Monte Carlo replications at each of the 20×21×21 grid points (all grid points share the same random draws)',
+        'sweep_title': '📐 Bias and RMSE Surfaces (Basic Model Parameter Sweep)',
+        'sweep_caption': '{:,} grid points × {:,} replications each, n = {:,}; plots fix φ = {:.1f} (current slider value)',
+        'sweep_metric': 'Metric',
+        'sweep_surface': '3D surface',
+        'bias_ols': 'OLS bias',
+        'bias_2sls': '2SLS bias (mean)',
+        'median_bias_2sls': '2SLS bias (median)',
+        'rmse_ols': 'OLS RMSE',
+        'rmse_2sls': '2SLS RMSE',
+        'weak_rate': 'Weak-IV rate (F < 10)'
+    }
+}
+
+# 性能分析：侧边栏开关打开时记录本次运行各阶段的耗时与峰值内存（开关在脚本末尾渲染，状态取自会话）
+# st.stop()、st.rerun() 与异常都会提前结束脚本，分析器在 finally 中停止，否则 tracemalloc 会一直开启
+profiler = RunProfiler().start() if st.session_state.get('profile_enable') else None
+try:
+    # ======================== 惰性渲染辅助函数 ========================
+    # plotly / pandas 只在图表或表格真正显示时才导入，减少冷启动与每次重跑的开销
+    @stage('tables')
+    def show_table(rows):
+        import pandas as pd
+        st.dataframe(pd.DataFrame(rows), width='stretch')
+
+
+    # plotly 图表在 st.plotly_chart 中序列化为 JSON，计入 figures 阶段
+    @stage('figures')
+    def show_chart(fig):
+        st.plotly_chart(fig, width='stretch')
+
+
+    # 置信集（可能是多个区间或包含无穷端点）的显示格式
+    def format_intervals(intervals):
+        if not intervals:
+            return '∅'
+        return ' ∪ '.join(f"({lo:.4f}, {hi:.4f})" if np.isinf(lo) or np.isinf(hi) else f"[{lo:.4f}, {hi:.4f}]" for lo, hi in intervals).replace('inf', '∞')
+
+
+    # 标签页与展开面板使用 on_change="rerun"：只有当前打开的部分执行其中的内容。
+    # 旧版 Streamlit 不支持该参数时退化为普通容器（全部渲染）。
+    def lazy_tabs(labels, key):
+        try:
+            return st.tabs(labels, key=key, on_change='rerun')
+        except TypeError:
+            return st.tabs(labels)
+
+
+    def lazy_expander(container, label, key):
+        try:
+            return container.expander(label, key=key, on_change='rerun')
+        except TypeError:
+            return container.expander(label)
+
+
+    # 未启用状态跟踪时 .open 为 None，视为打开
+    def is_open(container):
+        return getattr(container, 'open', None) is not False
+
+
+    # ======================== 后台任务 ========================
+    # 耗时的模拟提交到进程内共享的任务队列（iv_engine.jobs）：已在缓存中的结果直接返回；否则显示进度并返回 None，
+    # 进度条所在的片段定时刷新，任务结束后重跑整个脚本取回结果。slot 记录本会话在该位置的上一个任务，
+    # 参数改变后提交新任务并注销旧任务（其他会话仍在等待的相同任务不受影响）。
+    job_queue = default_jobs()
+    session_id = st.session_state.setdefault('session_id', os.urandom(8).hex())
+
+
+    def job_status(job_id):
+        job = job_queue.get(job_id)
+        if job is None or job.done():
+            st.rerun()
+        progress = job.progress()
+        label = text['job_running'] if progress.status == 'running' else text['job_queued']
+        if progress.partial is not None:
+            label += ' ' + text['job_partial'].format(progress.n_done, progress.partial.ols.slope, progress.partial.tsls.slope)
+        elif progress.n_done is not None:
+            label += ' ' + text['job_count'].format(progress.n_done)
+        st.progress(progress.fraction, text=label)
+
+
+    # 旧版 Streamlit 没有 st.fragment 时退化为等待后重跑整个脚本
+    if hasattr(st, 'fragment'):
+        job_status = st.fragment(run_every=JOB_POLL_SECONDS)(job_status)
+    else:
+        _job_status = job_status
+
+        def job_status(job_id):
+            _job_status(job_id)
+            time.sleep(JOB_POLL_SECONDS)
+            st.rerun()
+
+
+    def background_result(slot, kind, *args):
+        job = job_queue.submit(kind, *args, owner=session_id)
+        previous = st.session_state.get(slot)
+        if previous is not None and previous != job.id:
+            job_queue.cancel(previous, owner=session_id)
+        st.session_state[slot] = job.id
+        if job.status in ('done', 'failed'):
+            return job.result()
+        job_status(job.id)
+        return None
+
+
+    # 侧边栏语言选择
+    language = st.sidebar.selectbox('Language / 语言', ['English', '中文'], key='language_select')
+    lang = 'en' if language == 'English' else 'zh'
+    text = lang_dict[lang]
+
+    # 设置页面标题
+    st.title(text['title'])
+
+    # 在侧边栏添加滑块控制参数
+    st.sidebar.header(text['param_control'])
+    gamma = st.sidebar.slider(text['gamma_label'], min_value=0.1, max_value=2.0, value=1.0, step=0.1, help=text['gamma_help'])
+    delta = st.sidebar.slider(text['delta_label'], min_value=0.0, max_value=2.0, value=0.5, step=0.1, help=text['delta_help'])
+    phi = st.sidebar.slider(text['phi_label'], min_value=0.0, max_value=2.0, value=0.0, step=0.1, help=text['phi_help'])
+
+    # 样本量与随机种子
+    st.sidebar.markdown("---")
+    st.sidebar.header(text['sample_section'])
+    n = st.sidebar.select_slider(text['n_label'], options=STORE_N_VALUES, value=1000, format_func=lambda v: f'{v:,}', help=text['n_help'], key='n')
+    seed = int(st.sidebar.number_input(text['seed_label'], min_value=0, max_value=2 ** 32 - 1, value=42, step=1, help=text['seed_help'], key='seed'))
+    use_background = st.sidebar.checkbox(text['background_enable'], value=True, help=text['background_help'], key='background_enable')
+
+    # ======================== 异质性处理效应部分 (HTE Section) ========================
+    st.sidebar.markdown("---")
+    st.sidebar.header(text['hte_section'])
+
+    # 动态生成单选框选项，确保纯净的对应语言
+    scenario_options = [text['scenario_basic'], text['scenario_one_option'], text['scenario_two_option']]
+    scenario_choice_str = st.sidebar.radio(text['scenario_choice'], scenario_options)
+
+    # 判断是否使用基础模型
+    use_hte = scenario_choice_str != text['scenario_basic']
+
+    if use_hte:
+        st.sidebar.markdown(text['prop_setting_title'])
+        st.sidebar.markdown(text['prop_setting_note'])
+        col_prop = st.sidebar.columns([1, 1])
+    
+        with col_prop[0]:
+            prop_compliers_temp = st.number_input(text['compliers_label'], min_value=0.0, max_value=100.0, value=40.0, step=1.0, key='prop_compliers')
+            prop_always_temp = st.number_input(text['always_takers_label'], min_value=0.0, max_value=100.0, value=30.0, step=1.0, key='prop_always')
+        with col_prop[1]:
+            prop_never_temp = st.number_input(text['never_takers_label'], min_value=0.0, max_value=100.0, value=30.0, step=1.0, key='prop_never')
+            prop_defiers_temp = st.number_input(text['defiers_label'], min_value=0.0, max_value=100.0, value=0.0, step=1.0, key='prop_defiers')
+        
+        total = prop_compliers_temp + prop_always_temp + prop_never_temp + prop_defiers_temp
+        if total > 0:
+            prop_compliers = prop_compliers_temp / total
+            prop_always = prop_always_temp / total
+            prop_never = prop_never_temp / total
+            prop_defiers = prop_defiers_temp / total
+        else:
+            prop_compliers, prop_always, prop_never, prop_defiers = 0.4, 0.3, 0.3, 0.0
+        
+        st.sidebar.info(f"""
+    {text['adjusted_prop']}:
+    - {text['compliers']}: {prop_compliers:.1%}
+    - {text['always_takers']}: {prop_always:.1%}
+    - {text['never_takers']}: {prop_never:.1%}
+    - {text['defiers']}: {prop_defiers:.1%}
+    - {text['total']}: {prop_compliers + prop_always + prop_never + prop_defiers:.1%}
+        """)
+    
+        # 警告提示
+        if scenario_choice_str == text['scenario_one_option'] and prop_defiers > 0.01:
+            st.sidebar.warning(text['defier_warn_scen1'])
+        elif scenario_choice_str == text['scenario_two_option'] and prop_defiers < 0.01:
+            st.sidebar.info(text['defier_info_scen2'])
+    
+        # 异质性处理效应大小设置
+        st.sidebar.markdown(text['effect_preset_title'])
+        st.sidebar.info(text['effect_preset_info'])
+    
+        # 固定处理效应值
+        beta_compliers, beta_always, beta_never, beta_defiers = 5.0, 2.0, 2.0, 2.0
+
+    # 蒙特卡洛模式
+    st.sidebar.markdown("---")
+    st.sidebar.header(text['mc_section'])
+    use_mc = st.sidebar.checkbox(text['mc_enable'], value=False, key='mc_enable')
+    if use_mc:
+        mc_reps = int(st.sidebar.number_input(text['mc_reps'], min_value=100, max_value=MAX_REPS, value=10000, step=1000, help=text['mc_reps_help'], key='mc_reps'))
+
+    # 参数扫描（仅基础模型）
+    use_sweep = False
+    if not use_hte:
+        st.sidebar.markdown("---")
+        st.sidebar.header(text['sweep_section'])
+        use_sweep = st.sidebar.checkbox(text['sweep_enable'], value=False, key='sweep_enable')
+        if use_sweep:
+            sweep_reps = int(st.sidebar.number_input(text['sweep_reps'], min_value=50, max_value=5000, value=200, step=50, help=text['sweep_reps_help'], key='sweep_reps'))
+
+    # 保存当前参数为自定义预设，供“场景比较”标签页使用（仅保存在本会话中）
+    st.sidebar.markdown("---")
+    st.sidebar.header(text['compare_section'])
+    preset_name = st.sidebar.text_input(text['compare_save_name'], key='preset_name').strip()
+    if st.sidebar.button(text['compare_save'], key='preset_save') and preset_name:
+        st.session_state.setdefault('saved_presets', {})[preset_name] = (
+            {'model': 'hte', 'props': (prop_compliers, prop_always, prop_never, prop_defiers), 'betas': (beta_compliers, beta_always, beta_never, beta_defiers)}
+            if use_hte else {'model': 'basic', 'gamma': gamma, 'delta': delta, 'phi': phi})
+        st.sidebar.success(text['compare_saved'].format(preset_name))
+
+    # ======================== 解析结果（总体概率极限） ========================
+    # 闭式计算只需微秒，在模拟开始前显示，模拟进行中即可看到理论答案
+    if use_hte:
+        type_probs = [prop_compliers, prop_always, prop_never, prop_defiers]
+        population = population_hte(type_probs, [beta_compliers, beta_always, beta_never, beta_defiers])
+    else:
+        population = population_basic(gamma, delta, phi)
+    st.markdown(f"#### {text['population_title']}")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("plim β̂_OLS", f"{population.plim_ols:.4f}")
+    col2.metric("plim β̂_2SLS", f"{population.plim_2sls:.4f}")
+    col3.metric("LATE" if use_hte else "β", f"{population.late:.4f}")
+    col4.metric(text['expected_f'], f"{1 + concentration(population.first_stage_r2, n):.1f}", help=text['expected_f_help'])
+
+    # ======================== 数据生成与回归分析部分 ========================
+    # 模拟与估计结果按 (模型, 参数, n, seed) 缓存，切换语言等界面操作不会重新计算。
+    # 未命中时复用本会话中同一参数的渐进式样本：只增大 n 时仅生成新增的块，并逐块显示中间估计。
+    # 滑块网格上的取值与内置 HTE 预设优先从预计算结果库中查表，不在库中的取值在线计算。
+    if use_hte:
+        stream_key = ('hte', tuple(type_probs), (beta_compliers, beta_always, beta_never, beta_defiers), seed)
+    else:
+        stream_key = ('basic', gamma, delta, phi, seed)
+    if st.session_state.get('stream_key') != stream_key:
+        st.session_state['stream_key'] = stream_key
+        st.session_state['stream'] = (ProgressiveStream.hte(type_probs, [beta_compliers, beta_always, beta_never, beta_defiers], seed) if use_hte
+                                      else ProgressiveStream.basic(gamma, delta, phi, seed))
+    progress_bar = st.empty()
+
+
+    def show_progress(n_done, G):
+        partial = estimates_from_moments(G)
+        progress_bar.progress(n_done / n, text=text['progress_text'].format(n_done, n, partial.ols.slope, partial.tsls.slope))
+
+
+    # 大 n 时（且结果库未命中）在后台计算：本次运行只显示进度并结束，任务完成后自动重跑
+    if use_hte:
+        hte_args = (type_probs, [beta_compliers, beta_always, beta_never, beta_defiers], n)
+        if use_background and n >= BACKGROUND_MIN_N:
+            run = (result_store.hte(*hte_args, seed) if result_store is not None else None) or background_result('main_job', 'hte', *hte_args, seed)
+        else:
+            run = run_hte(*hte_args, seed=seed, stream=st.session_state['stream'], callback=show_progress, store=result_store)
+    else:
+        if use_background and n >= BACKGROUND_MIN_N:
+            run = (result_store.basic(gamma, delta, phi, n, seed) if result_store is not None else None) or background_result('main_job', 'basic', gamma, delta, phi, n, seed)
+        else:
+            run = run_basic(gamma, delta, phi, n, seed=seed, stream=st.session_state['stream'], callback=show_progress, store=result_store)
+    if run is None:
+        st.stop()
+    if use_hte:
+        Z, type_codes, D, U, betas, Y = run.sample
+        X = D
+    else:
+        U, Z, e1, e2, X, Y = run.sample
+    progress_bar.empty()
+    # 图形缓存键：结果的缓存键加上语言（图中文字随语言变化），参数相同的会话共用同一个图形
+    run_key = (lang, *(hte_key(*hte_args, seed) if use_hte else basic_key(gamma, delta, phi, n, seed)))
+
+    # ======================== 回归分析部分 ========================
+    # 单工具变量：OLS、2SLS、第一阶段 F 统计量均由同一组交叉乘积一次算出
+    moments = run.moments
+    est = run.estimates
+    beta_ols = [est.ols.intercept, est.ols.slope]
+    beta_ols_coef, r2_ols = est.ols.slope, est.ols.r2
+    beta_2sls = [est.tsls.intercept, est.tsls.slope]
+    beta_2sls_coef, r2_2sls = est.tsls.slope, est.tsls.r2
+    f_stat = est.f_stat
+    # 单工具变量、单内生变量：Stock–Yogo 10% 最大检验水平临界值（查表）取代经验规则 F < 10
+    f_critical = stock_yogo(1, 'size', 0.10)
+
+    if use_hte:
+        compliers_ate = beta_compliers if prop_compliers > 0 else 0
+    
+        if prop_defiers == 0:
+            late_theoretical = compliers_ate
+        else:
+            late_theoretical = population.plim_2sls
+    else:
+        beta_true = BETA_TRUE
+
+    # ======================== 页面布局 ========================
+    # 估计结果、图表、模型说明、蒙特卡洛与参数扫描分置于标签页中，只有当前打开的标签页会执行其中的计算与绘图。
+    # 标签集合保持固定（未启用的部分显示提示），切换侧边栏选项时不会跳回第一个标签页
+    tab_keys = ['tab_results', 'tab_figures', 'tab_model', 'tab_mc', 'tab_sweep', 'tab_compare', 'tab_data', 'tab_po']
+    tabs = dict(zip(tab_keys, lazy_tabs([text[k] for k in tab_keys], key='main_tab')))
+    for tab_key, enabled in (('tab_mc', use_mc), ('tab_sweep', use_sweep)):
+        if not enabled and is_open(tabs[tab_key]):
+            tabs[tab_key].info(text['tab_disabled'])
+
+    # ======================== 估计结果 ========================
+    if is_open(tabs['tab_results']):
+        with tabs['tab_results']:
+            if use_hte:
+                st.subheader(text['hte_results'])
+    
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown(f"### {text['ols_regression']}")
+                    st.metric("β̂_OLS", f"{beta_ols_coef:.4f}", delta=f"{beta_ols_coef - compliers_ate:.4f}")
+                    st.metric("R²", f"{r2_ols:.4f}")
+                    st.markdown(f"**{text['model']}**: Y = {beta_ols[0]:.4f} + {beta_ols_coef:.4f}·D")
+                with col2:
+                    st.markdown(f"### {text['tsls_regression']}")
+                    st.metric("β̂_2SLS (LATE)", f"{beta_2sls_coef:.4f}", delta=f"{beta_2sls_coef - late_theoretical:.4f}")
+                    st.metric("R²", f"{r2_2sls:.4f}")
+                    st.markdown(f"**{text['model']}**: Y = {beta_2sls[0]:.4f} + {beta_2sls_coef:.4f}·D_pred")
+    
+                st.markdown("---")
+                st.subheader(text['iv_diagnosis'])
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric(text['first_stage_f'], f"{f_stat:.2f}")
+                    if f_stat < f_critical: st.warning(f"⚠️ {text['iv_weak'].format(f_critical)}")
+                    else: st.success(f"✓ {text['iv_strong']}")
+                with col2:
+                    st.metric(text['correlation'], f"{est.corr_xz:.4f}")
+                with col3:
+                    st.metric(text['covariance'], f"{est.cov_xz:.4f}")
+    
+                st.markdown("---")
+                st.subheader(text['late_theorem'])
+                st.markdown(f"{text['late_explanation']}\n\n{text['late_assumption_1']}\n{text['late_assumption_2']}\n{text['late_assumption_3']}\n\n**Analysis**:\n\n{text['late_result_scenario1'] if prop_defiers == 0 else text['late_result_scenario2']}")
+    
+                if prop_defiers > 0:
+                    st.warning(text['monotonicity_violation'])
+
+                # Wald 比率分解（总体值）：plim β̂_2SLS = Σ 权重 × β，Defiers 以负权重进入
+                st.markdown(f"#### {text['wald_decomp_title']}")
+                decomposition = wald_decomposition(type_probs, [beta_compliers, beta_always, beta_never, beta_defiers])
+                show_table([{text['individual_type']: dtype, text['wald_weight']: f'{w:.4f}', 'βᵢ': f'{b:.4f}', text['weighted_contrib']: f'{c:.4f}'}
+                            for dtype, w, b, c in zip(TYPE_LABELS, decomposition.weights, [beta_compliers, beta_always, beta_never, beta_defiers], decomposition.contributions)
+                            if w != 0])
+                st.caption(text['wald_decomp_caption'].format(decomposition.first_stage, decomposition.reduced_form, decomposition.wald, decomposition.late, decomposition.defier_bias))
+    
+                st.markdown("---")
+                st.subheader(text['hte_results'])
+    
+                hte_comparison_data = [
+                    {text['individual_type']: 'Compliers', text['proportion']: f'{prop_compliers:.0%}', text['true_effect_col']: f'{beta_compliers:.4f}', text['weighted_contrib']: f'{beta_compliers * prop_compliers:.4f}'},
+                    {text['individual_type']: 'Always-takers', text['proportion']: f'{prop_always:.0%}', text['true_effect_col']: f'{beta_always:.4f}', text['weighted_contrib']: f'{beta_always * prop_always:.4f}'},
+                    {text['individual_type']: 'Never-takers', text['proportion']: f'{prop_never:.0%}', text['true_effect_col']: f'{beta_never:.4f}', text['weighted_contrib']: f'{beta_never * prop_never:.4f}'}
+                ]
+                if prop_defiers > 0:
+                    hte_comparison_data.append({text['individual_type']: 'Defiers', text['proportion']: f'{prop_defiers:.0%}', text['true_effect_col']: f'{beta_defiers:.4f}', text['weighted_contrib']: f'{beta_defiers * prop_defiers:.4f}'})
+    
+                show_table(hte_comparison_data)
+    
+                pop_ate = (beta_compliers * prop_compliers + beta_always * prop_always + beta_never * prop_never + beta_defiers * prop_defiers)
+    
+                st.markdown(f"""
+            {text['key_results']}:
+            - **{text['pop_ate']}**: {pop_ate:.4f}
+            - **{text['ols_est']}**: {beta_ols_coef:.4f}
+            - **{text['tsls_est']}**: {beta_2sls_coef:.4f}
+            - **{text['theoretical_late']}**: {late_theoretical:.4f}
+            - **{text['tsls_dev']}**: {abs(beta_2sls_coef - late_theoretical):.4f}
+
+            {text['explain_title']}:
+                """)
+                if prop_defiers == 0:
+                    st.success(text['scen1_success'].format(beta_compliers, beta_2sls_coef, late_theoretical))
+                else:
+                    st.error(text['scen2_error'].format(prop_defiers, beta_2sls_coef))
+            else:
+                st.subheader(text['regression_comparison'])
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown(f"### {text['ols_regression']}")
+                    st.metric("β̂_OLS", f"{beta_ols_coef:.4f}", delta=f"{beta_ols_coef - beta_true:.4f} ({text['true_value']}: 1.0)")
+                    st.metric("R²", f"{r2_ols:.4f}")
+                    st.markdown(f"**{text['model']}**: Y = {beta_ols[0]:.4f} + {beta_ols_coef:.4f}·X")
+
+                with col2:
+                    st.markdown(f"### {text['tsls_regression']}")
+                    st.metric("β̂_2SLS", f"{beta_2sls_coef:.4f}", delta=f"{beta_2sls_coef - beta_true:.4f} ({text['true_value']}: 1.0)")
+                    st.metric("R²", f"{r2_2sls:.4f}")
+                    st.markdown(f"**{text['model']}**: Y = {beta_2sls[0]:.4f} + {beta_2sls_coef:.4f}·X_pred")
+
+                st.markdown("---")
+                st.subheader(text['iv_diagnosis'])
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric(text['first_stage_f'], f"{f_stat:.2f}")
+                    if f_stat < f_critical: st.warning(f"⚠️ {text['iv_weak'].format(f_critical)}")
+                    else: st.success(f"✓ {text['iv_strong']}")
+                with col2:
+                    st.metric(text['correlation'], f"{est.corr_xz:.4f}")
+                with col3:
+                    st.metric(text['covariance'], f"{est.cov_xz:.4f}")
+
+                st.subheader(text['insight'])
+
+                bias_ols = beta_ols_coef - beta_true
+                bias_2sls = beta_2sls_coef - beta_true
+
+                st.markdown(f"""
+
+            **{text['explanation']}**:
+                """)
+
+                if lang == 'en':
+                        st.markdown("""
+                        - When φ > 0, Z directly affects Y, violating the exclusion restriction and causing OLS bias.
+                        - 2SLS eliminates this bias using the instrumental variable method.
+                        - The stronger the IV (γ), the more precise the 2SLS estimate.
+                        - Error transmission (δ) affects the correlation between X and U, impacting the degree of OLS bias.
+                        """
+                        )
+                elif lang == 'zh':
+                    st.markdown("""
+                    - 当 φ > 0 时，Z 会直接影响 Y，违反排他性条件，导致 OLS 回归产生偏差。
+                    - 2SLS 利用工具变量方法消除该偏差。
+                    - 工具变量越强（γ 越大），2SLS 估计越精确。
+                    - 误差传导（δ）影响 X 与 U 的相关性，进而影响 OLS 偏差程度。
+                    """
+                    )
+
+            # 推断：标准误与正态置信区间、Anderson–Rubin 置信集（弱工具变量下仍然有效）、可选的自助法区间
+            st.markdown("---")
+            st.subheader(text['inference_title'])
+            model_name, model_params = (('hte', (tuple(type_probs), (beta_compliers, beta_always, beta_never, beta_defiers))) if use_hte
+                                        else ('basic', (gamma, delta, phi)))
+            if use_background and n >= BACKGROUND_MIN_N:
+                inference = background_result('inference_job', 'inference', model_name, model_params, n, seed)
+            else:
+                inference = run_inference(model_name, model_params, n, seed=seed, stream=st.session_state['stream'])
+            if inference is not None:
+                se_type = st.selectbox(text['se_type'], SE_TYPES, index=SE_TYPES.index('HC1'), key='se_type')
+                inference_rows = []
+                for name, coef, se in [('β̂_OLS', beta_ols_coef, inference.se.ols), ('β̂_2SLS', beta_2sls_coef, inference.se.tsls)]:
+                    lo, hi = normal_ci(coef, getattr(se, se_type))
+                    inference_rows.append({text['mc_estimator']: name, text['estimate']: f'{coef:.4f}', text['std_error']: f'{getattr(se, se_type):.4f}',
+                                           text['ci_95']: f'[{lo:.4f}, {hi:.4f}]'})
+                inference_rows.append({text['mc_estimator']: 'Anderson–Rubin', text['estimate']: '', text['std_error']: '',
+                                       text['ci_95']: format_intervals(inference.ar.intervals)})
+                show_table(inference_rows)
+                st.caption(text['inference_caption'])
+                if not (len(inference.ar.intervals) == 1 and np.all(np.isfinite(inference.ar.intervals[0]))):
+                    st.warning(text['ar_unbounded'])
+
+                # 弱工具变量诊断：统计量与推断共用同一组交叉乘积和同一次稳健遍历，临界值查表得到
+                weak = inference.weak
+                weak_rows = []
+                for label, value, critical in [('weak_stat_cd', weak.cragg_donald, weak.critical.stock_yogo_size),
+                                               ('weak_stat_cd_bias', weak.cragg_donald, weak.critical.stock_yogo_bias),
+                                               ('weak_stat_kp', weak.kleibergen_paap, weak.critical.stock_yogo_size),
+                                               ('weak_stat_eff', weak.effective_f, weak.critical.effective_f)]:
+                    if not np.isfinite(critical):
+                        continue
+                    weak_rows.append({text['weak_statistic']: text[label], text['weak_value']: f'{value:.2f}', text['weak_critical']: f'{critical:.2f}',
+                                      text['weak_verdict']: text['weak_pass'] if value >= critical else text['weak_fail']})
+                st.markdown(f"#### {text['weak_iv_title']}")
+                show_table(weak_rows)
+                st.caption(text['weak_caption'].format(weak.k_eff))
+
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    use_boot = st.checkbox(text['boot_enable'], value=False, key='boot_enable')
+                if use_boot:
+                    with col2:
+                        boot_method = st.selectbox(text['boot_method'], BOOTSTRAP_METHODS, format_func=lambda m: text[f'boot_{m}'], key='boot_method')
+                    with col3:
+                        boot_reps = int(st.number_input(text['boot_reps'], min_value=100, max_value=10000, value=1000, step=100, key='boot_reps'))
+                    if n > HEAD_MAX:
+                        st.info(text['boot_too_large'].format(HEAD_MAX))
+                    else:
+                        # 重复按块分给全部 CPU；B × n 较大时交给后台任务，不阻塞会话
+                        boot_args = (model_name, model_params, n, boot_reps, boot_method)
+                        if use_background and n * boot_reps >= BACKGROUND_MIN_ELEMENTS:
+                            boot = background_result('boot_job', 'bootstrap', *boot_args, seed)
+                        else:
+                            boot = run_bootstrap(*boot_args, seed=seed, workers=None, stream=st.session_state['stream'])
+                        if boot is not None:
+                            show_table([{text['mc_estimator']: name, text['std_error']: f'{np.std(draws, ddof=1):.4f}',
+                                         text['ci_95']: '[{:.4f}, {:.4f}]'.format(*percentile_ci(draws))}
+                                        for name, draws in [('β̂_OLS', boot.beta_ols), ('β̂_2SLS', boot.beta_2sls)]])
+                            st.caption(text['boot_caption'].format(boot_reps))
+
+    # ======================== 数据可视化 ========================
+    if is_open(tabs['tab_figures']):
+        from iv_render import scatter_with_fits, box_from_summaries, cached_figure
+
+        with tabs['tab_figures']:
+            if use_hte:
+                st.subheader(text['visualization'])
+    
+                def build_box():
+                    colors = {'Compliers': 'blue', 'Always-takers': 'green', 'Never-takers': 'orange', 'Defiers': 'red'}
+                    # 组编号 2·类型编码 + D，八个 (类型, D) 组的摘要一次算出
+                    box_summaries = grouped_box_stats(2 * type_codes + D.astype(np.int8), Y, 2 * len(TYPE_LABELS))
+                    box_groups = []
+                    for code, dtype in enumerate(TYPE_LABELS):
+                        if dtype == 'Defiers' and prop_defiers == 0: continue
+                        if box_summaries[2 * code].count + box_summaries[2 * code + 1].count > 0:
+                            box_groups.append((f'{dtype} (D=0)', box_summaries[2 * code], colors[dtype], 0.7))
+                            box_groups.append((f'{dtype} (D=1)', box_summaries[2 * code + 1], colors[dtype], 1.0))
+                    return box_from_summaries(box_groups, text['dist_title'], text['dist_xaxis'])
+
+                show_chart(cached_figure(default_cache, ('box', *run_key), build_box))
+                if len(Y) < n:
+                    st.caption(text['plot_subsample'].format(len(Y), n))
+            else:
+                st.subheader(text['visualization'])
+
+                # 大样本时自动切换为 WebGL 或服务端密度图；两条回归线均为 Y = μ̂₀ + μ̂₁·X 的直线
+                show_chart(cached_figure(default_cache, ('scatter', *run_key), lambda: scatter_with_fits(X, Y, [
+                    (f'OLS (β̂={beta_ols_coef:.4f})', est.ols.intercept, beta_ols_coef, 'red'),
+                    (f'2SLS (β̂={beta_2sls_coef:.4f})', est.tsls.intercept, beta_2sls_coef, 'green'),
+                ], text['data_point'], text['scatter_plot'])))
+                if len(Y) < n:
+                    st.caption(text['plot_subsample'].format(len(Y), n))
+
+    # ======================== 模型预览 ========================
+    if is_open(tabs['tab_model']):
+        with tabs['tab_model']:
+            st.markdown(f"### {text['model_preview']}")
+            st.markdown("---")
+
+            if use_hte:
+                st.markdown(text['hte_model_title'])
+                st.markdown("""
+            **Structural Form:**
+            $$Y_i = \\beta_0 + \\beta_1 X_{1i} + \\boldsymbol{\\beta} \\mathbf{X} + \\epsilon_i$$
+
+            **First Stage:**
+            $$X_{1i} = \\gamma_0 + \\gamma_1 Z + \\boldsymbol{\\gamma} \\mathbf{X} + v_i$$
+
+            **Second Stage (2SLS):**
+            $$Y_i = \\mu_0 + \\mu_1 \\hat{X}_{1i} + \\boldsymbol{\\mu} \\mathbf{X} + e_i$$
+                """)
+    
+                st.markdown("---")
+                st.markdown(text['four_types_title'])
+    
+                table_md = """
+            | 个体类型 | Z→D 关系 | 数学表达 | 真实处理效应 | 说明 |
+            |---------|---------|--------|-----------|------|
+            | **Compliers** | 完全遵照 | $D_i = Z$ | $\\beta_{1,comp} = 5.0$ | 受工具变量影响，Z=1时接受处理 |
+            | **Always-takers** | 始终接受 | $D_i = 1$ | $\\beta_{1,always} = 2.0$ | 无论Z如何都接受处理 |
+            | **Never-takers** | 始终不接受 | $D_i = 0$ | $\\beta_{1,never} = 2.0$ | 无论Z如何都不接受处理 |
+            | **Defiers** | 违抗指导 | $D_i = 1 - Z$ | $\\beta_{1,defiers} = 2.0$ | 违背工具变量指导的个体 |
+                """ if lang == 'zh' else """
+            | Type | Z→D Relation | Math | True Effect | Description |
+            |---------|---------|--------|-----------|------|
+            | **Compliers** | Follows | $D_i = Z$ | $\\beta_{1,comp} = 5.0$ | Affected by IV, accepts when Z=1 |
+            | **Always-takers** | Always accepts | $D_i = 1$ | $\\beta_{1,always} = 2.0$ | Accepts regardless of Z |
+            | **Never-takers** | Never accepts | $D_i = 0$ | $\\beta_{1,never} = 2.0$ | Rejects regardless of Z |
+            | **Defiers** | Defies | $D_i = 1 - Z$ | $\\beta_{1,defiers} = 2.0$ | Does opposite of IV assignment |
+                """
+                st.markdown(table_md)
+    
+                st.markdown("---")
+                st.markdown(f"**{text['late_theorem']}**:\n\n$$\\hat{{\\mu}}_1^{{2SLS}} \\xrightarrow{{p}} E[\\beta_{{1,i}} \\mid \\text{{Complier}}] = \\beta_{{1,comp}} = 5.0$$")
+    
+                st.markdown("---")
+                st.markdown(text['model_params'])
+    
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    st.markdown(text['prop_setting_title'])
+                    rows_data = [
+                        {text['individual_type']: 'Compliers', text['proportion']: f'{prop_compliers:.1%}'},
+                        {text['individual_type']: 'Always-takers', text['proportion']: f'{prop_always:.1%}'},
+                        {text['individual_type']: 'Never-takers', text['proportion']: f'{prop_never:.1%}'},
+                        {text['individual_type']: 'Defiers', text['proportion']: f'{prop_defiers:.1%}'}
+                    ]
+                    show_table(rows_data)
+                    if prop_defiers > 0.01 and scenario_choice_str == text['scenario_one_option']:
+                        st.warning(text['defier_detect_warn'])
+            
+                with col2:
+                    st.markdown(text['effect_preset_title'])
+                    effect_data = [
+                        {text['individual_type']: 'Compliers', 'βᵢ': f'{beta_compliers:.1f}'},
+                        {text['individual_type']: 'Always-takers', 'βᵢ': f'{beta_always:.1f}'},
+                        {text['individual_type']: 'Never-takers', 'βᵢ': f'{beta_never:.1f}'},
+                        {text['individual_type']: 'Defiers', 'βᵢ': f'{beta_defiers:.1f}'}
+                    ]
+                    show_table(effect_data)
+
+            else:
+                st.markdown(f"**{text['original_model']}:**")
+                st.latex(r"Y_i = \beta_0 + \beta_1 X_{1i} + \mathbf{\beta} \mathbf{X} + \varepsilon_i")
+                st.markdown(f"**{text['first_stage']}:**")
+                st.latex(r"X_{1i} = \pi_1 Z_i + \mathbf{\pi} \mathbf{X} + v_i")
+                st.markdown(f"**{text['second_stage']}:**")
+                st.latex(r"Y_i = \mu_0 + \mu_1 \widehat{X_{1i}} + \mathbf{\mu} \mathbf{X} + e_i")
+                st.markdown(text['mu1_unbiased'])
+                st.markdown("---")
+                st.markdown(f"### {text['param_detail']}")
+    
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown(f"#### {text['variable_def']}")
+                    st.markdown(f"- **U**: {text['error_term']}，$U \\sim N(0, 1)$\n- **Z**: {text['instrument']}，$Z \\sim N(0, 1)$\n- **X**: {text['endogenous']}\n- **Y**: {text['explained']}")
+                with col2:
+                    st.markdown(f"#### {text['param_meaning']}")
+                    st.markdown(f"- **γ (gamma)** = {gamma:.2f}: {text['iv_strength']}\n- **δ (delta)** = {delta:.2f}: {text['error_transmission']}\n- **β (beta)** = 1.0: {text['true_effect']}\n\n{text['exclusion_condition']}")
+
+    # ======================== 蒙特卡洛抽样分布 ========================
+    if use_mc and is_open(tabs['tab_mc']):
+        import plotly.graph_objects as go
+        from iv_render import cached_figure
+
+        with tabs['tab_mc']:
+            st.subheader(text['mc_title'])
+            if mc_reps > max_reps_for(n):
+                mc_reps = max_reps_for(n)
+                st.info(text['reps_capped'].format(MAX_ELEMENTS, mc_reps))
+            mc_background = use_background and n * mc_reps >= BACKGROUND_MIN_ELEMENTS
+            if use_hte:
+                mc_args = (type_probs, [beta_compliers, beta_always, beta_never, beta_defiers], n, mc_reps)
+                mc = background_result('mc_job', 'mc_hte', *mc_args, seed) if mc_background else run_monte_carlo_hte(*mc_args, seed=seed)
+                mc_truth = compliers_ate
+                mc_key = (lang, *mc_hte_key(*mc_args, seed))
+            else:
+                mc_args = (gamma, delta, phi, n, mc_reps)
+                mc = background_result('mc_job', 'mc_basic', *mc_args, seed) if mc_background else run_monte_carlo_basic(*mc_args, seed=seed)
+                mc_truth = beta_true
+                mc_key = (lang, *mc_basic_key(*mc_args, seed))
+            if mc is not None:
+                st.caption(text['mc_caption'].format(mc_reps, n))
+
+                mc_rows = []
+                for name, draws, plim in [('β̂_OLS', mc.beta_ols, population.plim_ols), ('β̂_2SLS', mc.beta_2sls, population.plim_2sls)]:
+                    summary = summarize(draws, mc_truth)
+                    check = validate(draws, plim)
+                    mc_rows.append({text['mc_estimator']: name, text['mc_mean']: f'{summary.mean:.4f}', text['mc_median']: f'{summary.median:.4f}',
+                                    text['mc_std']: f'{summary.std:.4f}', text['mc_bias']: f'{summary.bias:.4f}', text['mc_rmse']: f'{summary.rmse:.4f}',
+                                    text['mc_plim']: f'{plim:.4f}', text['mc_z']: f'{check.z:.1f}'})
+                show_table(mc_rows)
+                st.caption(text['mc_validation_caption'])
+
+                mc_cols = st.columns(3)
+                def build_mc_hist(name, counts, edges, ref, color):
+                    fig_mc = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), marker_color=color, opacity=0.7, name=name))
+                    fig_mc.add_vline(x=ref, line_dash='dash', line_color='black', annotation_text=f"{text['mc_reference']}: {ref:g}")
+                    fig_mc.update_layout(title=name, xaxis_title=name, yaxis_title=text['mc_count'], height=350, showlegend=False, bargap=0)
+                    return fig_mc
+
+                for col, (name, draws, ref, color) in zip(mc_cols, [('β̂_OLS', mc.beta_ols, mc_truth, 'red'), ('β̂_2SLS', mc.beta_2sls, mc_truth, 'green'), ('F', mc.f_stat, 10.0, 'gray')]):
+                    counts, edges, clipped = histogram(draws)
+                    with col:
+                        show_chart(cached_figure(default_cache, ('mc_hist', name, *mc_key),
+                                                 lambda: build_mc_hist(name, counts, edges, ref, color)))
+                        if clipped > 0.0:
+                            st.caption(text['mc_clipped'].format(clipped))
+                st.info(text['mc_weak_share'].format(np.mean(mc.f_stat < 10)))
+
+    # ======================== 参数扫描 ========================
+    if use_sweep and is_open(tabs['tab_sweep']):
+        import plotly.graph_objects as go
+
+        with tabs['tab_sweep']:
+            st.subheader(text['sweep_title'])
+            if sweep_reps > max_reps_for(n):
+                sweep_reps = max_reps_for(n)
+                st.info(text['reps_capped'].format(MAX_ELEMENTS, sweep_reps))
+            # 网格部分的计算量与 n 无关，按 reps × (n + SWEEP_REP_COST) 判断是否交给后台任务
+            if use_background and sweep_reps * (n + SWEEP_REP_COST) >= BACKGROUND_MIN_ELEMENTS:
+                sweep = background_result('sweep_job', 'sweep', n, sweep_reps, seed)
+            else:
+                sweep = run_parameter_sweep(n, sweep_reps, seed=seed)
+            if sweep is not None:
+                phi_idx = int(np.argmin(np.abs(sweep.phis - phi)))
+                st.caption(text['sweep_caption'].format(sweep.gammas.size * sweep.deltas.size * sweep.phis.size, sweep_reps, n, sweep.phis[phi_idx]))
+
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    sweep_metric = st.selectbox(text['sweep_metric'], SWEEP_METRICS, format_func=lambda m: text[m], key='sweep_metric')
+                with col2:
+                    sweep_surface = st.checkbox(text['sweep_surface'], value=False, key='sweep_surface')
+
+                z_values = getattr(sweep, sweep_metric)[:, :, phi_idx]
+                diverging = sweep_metric.startswith('bias') or sweep_metric.startswith('median')
+                if sweep_surface:
+                    fig_sweep = go.Figure(go.Surface(x=sweep.deltas, y=sweep.gammas, z=z_values, colorscale='RdBu_r' if diverging else 'Viridis'))
+                    fig_sweep.update_layout(scene=dict(xaxis_title='δ', yaxis_title='γ', zaxis_title=text[sweep_metric]), height=600)
+                else:
+                    fig_sweep = go.Figure(go.Heatmap(x=sweep.deltas, y=sweep.gammas, z=z_values, colorscale='RdBu_r' if diverging else 'Viridis',
+                                                     zmid=0.0 if diverging else None, colorbar=dict(title=text[sweep_metric])))
+                    fig_sweep.add_trace(go.Scatter(x=[delta], y=[gamma], mode='markers', marker=dict(symbol='x', size=12, color='black'), showlegend=False))
+                    fig_sweep.update_layout(xaxis_title='δ', yaxis_title='γ', height=550)
+                fig_sweep.update_layout(title=f"{text[sweep_metric]} (φ = {sweep.phis[phi_idx]:.1f})")
+                show_chart(fig_sweep)
+
+    # ======================== 多场景比较 ========================
+    # 内置三个场景与本会话保存的预设在线程池中并发计算，共用当前的 n 与 seed；预计算结果库中的场景直接查表，
+    # 大 n 时交给后台任务；同一坐标轴上并排比较
+    if is_open(tabs['tab_compare']):
+        import plotly.graph_objects as go
+
+        with tabs['tab_compare']:
+            builtin_labels = {'basic': text['scenario_basic'], 'scenario_1': text['scenario_one_option'], 'scenario_2': text['scenario_two_option']}
+            compare_options = {key: SCENARIO_PRESETS[key] for key in builtin_labels}
+            compare_options.update({f'saved:{name}': spec for name, spec in st.session_state.get('saved_presets', {}).items()})
+            compare_label = lambda key: builtin_labels.get(key, key.split(':', 1)[-1])
+            chosen = st.multiselect(text['compare_select'], list(compare_options), default=list(builtin_labels), format_func=compare_label, key='compare_select')
+            if not chosen:
+                st.info(text['compare_empty'])
+            else:
+                compare_specs = [dict(compare_options[key], name=compare_label(key)) for key in chosen]
+                # 与单场景视图相同：先查预计算结果库，大 n 且库中缺少某个场景时整个比较交给后台任务
+                if use_background and n >= BACKGROUND_MIN_N:
+                    comparison = ((compare_from_store(compare_specs, n, seed, result_store) if result_store is not None else None)
+                                  or background_result('compare_job', 'compare', compare_specs, n, seed,
+                                                       result_store.path if result_store is not None else None))
+                else:
+                    comparison = compare_scenarios(compare_specs, n, seed=seed, store=result_store)
+                if comparison is not None:
+                    show_table([{text['compare_scenario']: c.name, 'β̂_OLS': f'{c.run.estimates.ols.slope:.4f}', 'β̂_2SLS': f'{c.run.estimates.tsls.slope:.4f}',
+                                 'plim β̂_2SLS': f'{c.population.plim_2sls:.4f}', 'LATE': f'{c.population.late:.4f}', 'ATE': f'{c.pop_ate:.4f}',
+                                 'F': f'{c.run.estimates.f_stat:.2f}'} for c in comparison])
+                    names = [c.name for c in comparison]
+                    fig_compare = go.Figure()
+                    for metric, values, color in [('β̂_OLS', [c.run.estimates.ols.slope for c in comparison], 'red'),
+                                                  ('β̂_2SLS', [c.run.estimates.tsls.slope for c in comparison], 'green'),
+                                                  ('LATE', [c.population.late for c in comparison], 'blue'),
+                                                  ('ATE', [c.pop_ate for c in comparison], 'gray')]:
+                        fig_compare.add_trace(go.Bar(x=names, y=values, name=metric, marker_color=color))
+                    fig_compare.update_layout(title=text['compare_chart_title'].format(n, seed), barmode='group', height=450)
+                    show_chart(fig_compare)
+                    st.caption(text['compare_caption'])
+
+    # ======================== 真实数据 ========================
+    # 上传文件或服务器路径，选择 Y、X、Z 与协变量 W 后按块流式估计；结果按（数据源, 所选列）缓存
+    if is_open(tabs['tab_data']):
+        with tabs['tab_data']:
+            st.caption(text['data_intro'])
+            data_mode = st.radio(text['data_source'], ['data_upload', 'data_path'], format_func=lambda m: text[m], horizontal=True, key='data_mode')
+            data_source = data_key = data_name = None
+            if data_mode == 'data_upload':
+                uploaded = st.file_uploader(text['data_file_label'], type=['csv', 'parquet'], key='data_file')
+                if uploaded is not None:
+                    data_source, data_key, data_name = uploaded, ('upload', uploaded.file_id, uploaded.size), uploaded.name
+            else:
+                data_path = st.text_input(text['data_path'], key='data_path').strip()
+                if data_path and not os.path.isfile(data_path):
+                    st.error(text['data_not_found'].format(data_path))
+                elif data_path:
+                    stat = os.stat(data_path)
+                    data_source, data_key, data_name = data_path, ('path', os.path.abspath(data_path), stat.st_mtime_ns, stat.st_size), data_path
+            data_cols = None
+            if data_source is not None:
+                try:
+                    data_fmt = infer_data_format(data_name)
+                    data_cols = data_columns(data_source, data_fmt)
+                except (ValueError, RuntimeError) as exc:
+                    st.error(str(exc))
+            if data_cols:
+                col1, col2, col3, col4 = st.columns(4)
+                y_col = col1.selectbox('Y', data_cols, key='data_y')
+                x_cols = col2.multiselect('X', [c for c in data_cols if c != y_col], key='data_x')
+                z_cols = col3.multiselect('Z', [c for c in data_cols if c != y_col and c not in x_cols], key='data_z')
+                w_cols = col4.multiselect(text['data_w'], [c for c in data_cols if c != y_col and c not in x_cols and c not in z_cols], key='data_w')
+                data_robust = st.checkbox(text['data_robust'], value=False, key='data_robust')
+                data_request = (data_key, y_col, tuple(x_cols), tuple(z_cols), tuple(w_cols), data_robust)
+                if st.button(text['data_run'], key='data_run', disabled=not (x_cols and len(z_cols) >= len(x_cols))):
+                    total_rows = data_rows(data_source, data_fmt)
+                    data_bar = st.progress(0.0)
+                    try:
+                        result = run_file_iv(data_source, data_key, y_col, x_cols, z_cols, w_cols, data_fmt, data_robust,
+                                             callback=lambda done: data_bar.progress(min(done / total_rows, 1.0) if total_rows else 0.0, text=text['data_progress'].format(done)))
+                        st.session_state['data_result'] = (data_request, result)
+                    except (ValueError, RuntimeError, np.linalg.LinAlgError) as exc:
+                        st.error(str(exc))
+                    data_bar.empty()
+                stored = st.session_state.get('data_result')
+                if stored is not None and stored[0] == data_request:
+                    result = stored[1]
+                    fit, weak = result.fit, result.diagnostics
+                    names = ['const', *w_cols, *x_cols]
+                    show_table([{text['data_regressor']: name, 'β̂_OLS': f'{fit.ols.coef[i, 0]:.4f}', f"{text['std_error']} (OLS)": f'{fit.ols.se[i, 0]:.4f}',
+                                 'β̂_2SLS': f'{fit.tsls.coef[i, 0]:.4f}', f"{text['std_error']} (2SLS)": f'{fit.tsls.se[i, 0]:.4f}'}
+                                for i, name in enumerate(names)])
+                    st.caption(text['data_caption'].format(fit.n, result.rows_read, result.rows_dropped))
+                    weak_rows = [{text['weak_statistic']: text['data_first_stage'].format(x), text['weak_value']: f'{f:.2f}', text['weak_critical']: '', text['weak_verdict']: ''}
+                                 for x, f in zip(x_cols, fit.first_stage.partial_f)]
+                    for label, value, critical in [('weak_stat_cd', weak.cragg_donald, weak.critical.stock_yogo_size),
+                                                   ('weak_stat_cd_bias', weak.cragg_donald, weak.critical.stock_yogo_bias),
+                                                   ('weak_stat_kp', weak.kleibergen_paap, weak.critical.stock_yogo_size),
+                                                   ('weak_stat_eff', weak.effective_f, weak.critical.effective_f)]:
+                        if not np.isfinite(value):
+                            continue
+                        weak_rows.append({text['weak_statistic']: text[label], text['weak_value']: f'{value:.2f}',
+                                          text['weak_critical']: f'{critical:.2f}' if np.isfinite(critical) else '–',
+                                          text['weak_verdict']: (text['weak_pass'] if value >= critical else text['weak_fail']) if np.isfinite(critical) else ''})
+                    st.markdown(f"#### {text['weak_iv_title']}")
+                    show_table(weak_rows)
+                    if weak.sargan.df > 0:
+                        st.markdown(f"#### {text['data_overid']}")
+                        show_table([{text['weak_statistic']: name, text['weak_value']: f'{test.statistic:.3f}', 'df': test.df, text['data_p_value']: f'{test.p_value:.4f}'}
+                                    for name, test in [('Sargan', weak.sargan), ('Hansen J', weak.hansen)] if np.isfinite(test.statistic)])
+
+    # ======================== 潜在结果模型 ========================
+    # 连续的个体处理效应与连续/多值工具变量；模拟与总体量按 (模型参数, n, seed) 缓存，一次遍历同时得到估计与样本 MTE
+    if is_open(tabs['tab_po']):
+        from iv_render import mte_figure
+
+        with tabs['tab_po']:
+            st.caption(text['po_intro'])
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                po_instrument = st.radio(text['po_instrument'], INSTRUMENTS, format_func=lambda m: text[f'po_{m}'], key='po_instrument')
+                po_levels = st.number_input(text['po_levels'], min_value=2, max_value=10, value=2, step=1, key='po_levels',
+                                            disabled=po_instrument != 'discrete')
+                po_pi0 = st.slider(text['po_pi0'], -2.0, 2.0, 0.0, 0.1, key='po_pi0')
+                po_pi1 = st.slider(text['po_pi1'], -2.0, 2.0, 1.0, 0.1, key='po_pi1')
+            with col2:
+                po_dist = st.selectbox(text['po_beta_dist'], BETA_DISTRIBUTIONS, format_func=lambda m: text[f'po_{m}'], key='po_beta_dist')
+                po_mean = st.slider(text['po_beta_mean'], -3.0, 5.0, 2.0, 0.1, key='po_beta_mean')
+                po_sd = st.slider(text['po_beta_sd'], 0.0, 3.0, 1.0, 0.1, key='po_beta_sd')
+            with col3:
+                po_rho_gain = st.slider(text['po_rho_gain'], -0.95, 0.95, 0.5, 0.05, key='po_rho_gain')
+                po_rho_u = st.slider(text['po_rho_u'], -0.95, 0.95, 0.5, 0.05, key='po_rho_u')
+
+            try:
+                po = po_model(instrument=po_instrument, z_levels=po_levels, pi0=po_pi0, pi1=po_pi1, beta_dist=po_dist,
+                              beta_mean=po_mean, beta_sd=po_sd, rho_gain=po_rho_gain, rho_u=po_rho_u)
+            except ValueError as exc:
+                st.error(str(exc))
+                po = None
+            if po is not None:
+                po_bar = st.empty()
+                po_run = run_po(po, n, seed=seed, callback=lambda done, G: po_bar.progress(done / n, text=text['po_progress'].format(done, n)))
+                po_bar.empty()
+                pop, po_est = po_run.population, po_run.estimates
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric('ATE', f'{pop.ate:.4f}')
+                col2.metric('LATE', f'{pop.late:.4f}')
+                col3.metric('β̂_2SLS', f'{po_est.tsls.slope:.4f}', delta=f'{po_est.tsls.slope - pop.ate:.4f}')
+                col4.metric('β̂_OLS', f'{po_est.ols.slope:.4f}', delta=f'{po_est.ols.slope - pop.ate:.4f}')
+
+                weight_colors = {'ate': 'gray', 'att': 'red', 'atu': 'orange', 'late': 'blue', 'iv': 'green'}
+                shown = st.multiselect(text['po_weights'], list(weight_colors), default=['ate', 'iv'], format_func=str.upper, key='po_weights')
+                show_chart(mte_figure(pop.grid, pop.mte, po_run.empirical_mte.mte,
+                                      [(name.upper(), getattr(pop.weights, name), weight_colors[name]) for name in shown],
+                                      text['po_mte_names'], text['po_mte_title'].format(n)))
+
+                thirds = np.array_split(np.arange(pop.grid.size), 3)
+                # 模拟列全部基于同一组 n 个观测：ATE / ATT / ATU 在流式遍历中累加，没有处理组或控制组时为 NaN，显示为 –
+                simulated = {'ate': po_run.effects.ate, 'att': po_run.effects.att, 'atu': po_run.effects.atu, 'late': None, 'iv': po_est.tsls.slope}
+                st.markdown(f"#### {text['po_decomposition']}")
+                show_table([{text['po_parameter']: 'plim β̂_2SLS' if name == 'iv' else name.upper(),
+                             text['po_population']: f'{value:.4f}',
+                             text['po_simulated']: '–' if simulated[name] is None or not np.isfinite(simulated[name]) else f'{simulated[name]:.4f}',
+                             **{text[label]: f'{contrib[idx].sum():.4f}' for label, idx in zip(('po_low', 'po_mid', 'po_high'), thirds)}}
+                            for name, value, contrib in zip(weight_colors, (pop.ate, pop.att, pop.atu, pop.late, pop.plim_2sls), pop.contributions)]
+                           + [{text['po_parameter']: 'plim β̂_OLS', text['po_population']: f'{pop.plim_ols:.4f}',
+                               text['po_simulated']: f'{po_est.ols.slope:.4f}', text['po_low']: '', text['po_mid']: '', text['po_high']: ''}])
+                z_lo, z_hi = ('-1', '1') if po.instrument == 'continuous' else ('0', str(po.z_levels - 1))
+                st.caption(text['po_caption'].format(z_lo, z_hi, *pop.late_range))
+
+    # ======================== 性能分析面板 ========================
+    # 每次运行的记录保存在会话的滚动历史中，可导出为 Chrome trace（chrome://tracing 或 Perfetto 打开）
+    st.sidebar.markdown("---")
+    use_profile = st.sidebar.checkbox(text['profile_enable'], value=False, key='profile_enable', help=text['profile_help'])
+finally:
+    if profiler is not None:
+        profiler.stop()
+if profiler is not None:
+    profile_history = st.session_state.setdefault('profile_history', ProfileHistory())
+    st.session_state['profile_runs'] = st.session_state.get('profile_runs', 0) + 1
+    profiler.label = f"run {st.session_state['profile_runs']}"
+    profile_history.add(profiler)
+    if use_profile:
+        with st.sidebar:
+            show_table([{text['profile_stage']: s.name, text['profile_calls']: s.calls, text['profile_time']: f'{s.total * 1000:.1f}',
+                         text['profile_peak']: f'{s.peak_bytes / 2 ** 20:.1f}'} for s in profiler.summary()])
+            st.caption(text['profile_last'].format(profiler.total * 1000))
+            runs = profile_history.snapshot()[-10:][::-1]
+            st.markdown(f"**{text['profile_history'].format(len(runs))}**")
+            show_table([{text['profile_run']: p.label, text['profile_total']: f'{p.total * 1000:.0f}',
+                         **{s.name: f'{s.total * 1000:.1f}' for s in p.summary()}} for p in runs])
+            st.download_button(text['profile_download'], profile_history.to_json(), file_name='iv_profile_trace.json',
+                               mime='application/json', key='profile_download')
+
+# ======================== 调试面板 ========================
+# 放在脚本末尾，使计数与耗时包含本次运行；面板收起时不渲染
+debug_panel = lazy_expander(st.sidebar, text['debug_panel'], key='debug_panel')
+if is_open(debug_panel):
+    with debug_panel:
+        cache_stats = default_cache.stats()
+        hit_rate = cache_stats.hits / max(cache_stats.hits + cache_stats.misses, 1)
+        st.markdown(f"""
+    - {text['cache_hits']}: {cache_stats.hits} ({hit_rate:.1%})
+    - {text['cache_misses']}: {cache_stats.misses}
+    - {text['cache_entries']}: {cache_stats.entries} / {cache_stats.max_entries}
+    - {text['cache_memory']}: {cache_stats.nbytes / 2 ** 20:.1f} / {cache_stats.max_bytes / 2 ** 20:.0f} MB
+    - {text['cache_evictions']}: {cache_stats.evictions}
+    - {text['cache_shared'].format(cache_stats.expirations, cache_stats.coalesced, cache_stats.backend_hits)}
+    - {text['run_time']}: {(time.perf_counter() - run_start) * 1000:.0f} ms
+        """)
+        if default_cache.backend is not None:
+            backend_stats = default_cache.backend.stats()
+            st.caption(text['cache_backend'].format(
+                backend_stats.path, backend_stats.entries, backend_stats.nbytes / 2 ** 20, backend_stats.max_bytes / 2 ** 20,
+                backend_stats.hits / max(backend_stats.hits + backend_stats.misses, 1), backend_stats.evictions))
+        st.caption(text['job_stats'].format(*job_queue.stats()))
+        if result_store is not None:
+            store_stats = result_store.stats()
+            st.caption(text['store_status'].format(store_stats.hits, store_stats.misses, store_stats.n_values, store_stats.presets))
+        else:
+            st.caption(text['store_missing'])
+        if st.button(text['cache_clear'], key='cache_clear'):
+            default_cache.clear()
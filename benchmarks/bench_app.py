@@ -0,0 +1,97 @@
+# 应用冷启动与重跑耗时：用 Streamlit AppTest 无界面运行 IV变量.py
+# 用法: python benchmarks/bench_app.py [--baseline HEAD~1] [--reruns 10] [--cold 3]
+# 每次冷启动在新的子进程中进行（Streamlit 已导入，应用自身的导入与首次渲染计入耗时）；
+# 重跑耗时为同一会话中参数不变、切换语言、拖动滑块后的中位数。--baseline 给出的 git 版本
+# 会被临时导出到仓库根目录，与当前工作区版本并排比较。
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = 'IV变量.py'
+SCENARIOS = ('basic', 'hte')
+
+
+def child(script, scenario, reruns):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(script, default_timeout=300)
+    t0 = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - t0
+    if scenario == 'hte':
+        radio = at.sidebar.radio[0]
+        at = radio.set_value(radio.options[1]).run()
+
+    def timed(action):
+        t0 = time.perf_counter()
+        action()
+        return time.perf_counter() - t0
+
+    same = [timed(at.run) for _ in range(reruns)]
+    languages = ['中文', 'English']
+    lang = [timed(lambda i=i: at.sidebar.selectbox[0].set_value(languages[i % 2]).run()) for i in range(reruns)]
+    slider = [timed(lambda i=i: at.sidebar.slider[0].set_value(1.0 + 0.1 * (i % 2 + 1)).run()) for i in range(reruns)]
+    errors = [e.value for e in at.exception]
+    print(json.dumps({'cold': cold, 'rerun': statistics.median(same), 'language': statistics.median(lang),
+                      'slider': statistics.median(slider), 'errors': errors}))
+
+
+def measure(script, scenario, reruns, cold):
+    runs = []
+    for _ in range(cold):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', script, scenario, str(reruns)],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    if any(r['errors'] for r in runs):
+        raise RuntimeError(f"{script} ({scenario}) raised: {runs[0]['errors']}")
+    return {k: min(r[k] for r in runs) if k == 'cold' else statistics.median(r[k] for r in runs)
+            for k in ('cold', 'rerun', 'language', 'slider')}
+
+
+def export_revision(rev):
+    source = subprocess.run(['git', 'show', f'{rev}:{APP}'], cwd=ROOT, capture_output=True, check=True).stdout
+    path = os.path.join(ROOT, f'.bench_app_{rev.replace("/", "_").replace("~", "_")}.py')
+    with open(path, 'wb') as fh:
+        fh.write(source)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cold-start and rerun latency of the Streamlit app')
+    parser.add_argument('--baseline', help='git revision of IV变量.py to compare against (e.g. HEAD~1)')
+    parser.add_argument('--reruns', type=int, default=10)
+    parser.add_argument('--cold', type=int, default=3, help='cold starts per scenario (best is reported)')
+    parser.add_argument('--child', nargs=3, metavar=('SCRIPT', 'SCENARIO', 'RERUNS'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        script, scenario, reruns = args.child
+        return child(script, scenario, int(reruns))
+
+    versions = [('working tree', os.path.join(ROOT, APP))]
+    baseline_path = None
+    if args.baseline:
+        baseline_path = export_revision(args.baseline)
+        versions.insert(0, (args.baseline, baseline_path))
+    try:
+        results = {(label, sc): measure(path, sc, args.reruns, args.cold) for label, path in versions for sc in SCENARIOS}
+    finally:
+        if baseline_path:
+            os.remove(baseline_path)
+
+    print(f"{'version':<14}{'scenario':<9}{'cold start':>12}{'rerun':>10}{'language':>10}{'slider':>10}   (ms)")
+    for (label, sc), r in results.items():
+        print(f"{label:<14}{sc:<9}{r['cold'] * 1000:>12.0f}{r['rerun'] * 1000:>10.1f}{r['language'] * 1000:>10.1f}{r['slider'] * 1000:>10.1f}")
+    if baseline_path:
+        print()
+        for sc in SCENARIOS:
+            old, new = results[(args.baseline, sc)], results[('working tree', sc)]
+            print(f"{sc:<9}" + '  '.join(f"{k} {old[k] / new[k]:.2f}x" for k in ('cold', 'rerun', 'language', 'slider')))
+
+
+if __name__ == '__main__':
+    main()
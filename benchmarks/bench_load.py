@@ -0,0 +1,449 @@
+# 负载测试：模拟多个并发用户操作 IV变量.py，报告重跑延迟分位数、吞吐量以及每个会话的 CPU 与内存
+# 用法: python benchmarks/bench_load.py [--users 20] [--actions 30] [--driver server|apptest] [--think 1.0]
+#                                      [--url http://HOST:PORT --pid PID] [--env IV_CACHE_DB=/tmp/iv.sqlite]
+#                                      [--save BASELINE.json] [--compare BASELINE.json] [--tolerance 0.25]
+# 两种驱动方式：
+#   server（默认）：在本地启动 streamlit run（或连接 --url 给出的服务器），每个虚拟用户是一个 websocket 客户端，
+#     与浏览器前端一样发送 BackMsg（重跑请求 + 全部控件状态），收到 script_finished 即为一次重跑完成。
+#     所有会话共享同一个服务器进程（与真实部署相同：共享缓存、GIL 与后台任务队列）；CPU 与内存取自服务器
+#     进程树的 /proc（仅 Linux），按会话数平均。连接外部服务器时需用 --pid 指定其进程号才能统计资源。
+#   apptest：每个虚拟用户在独立子进程中用 Streamlit AppTest 运行脚本（AppTest 不能在同一进程内并发），
+#     CPU 与峰值内存由子进程的 getrusage 精确给出，但会话之间不共享进程内缓存（可用 --env IV_CACHE_DB 共享磁盘缓存）。
+# 每个用户的操作序列由 --seed 与用户编号确定：拖动 γ / δ / φ 滑块（逐格触发重跑，间隔 --drag-interval，
+# 与前端滑块拖动时的去抖提交相当）、切换场景、改变 n、切换标签页，手势之间等待指数分布的思考时间（均值 --think）。
+# 客户端等待一次重跑结束后才发送下一个操作（闭环模型）。用户在 --ramp 秒内依次进入。
+# --compare 时，总体 p50 / p95 延迟变慢或吞吐量下降超过 tolerance 即以退出码 1 结束。
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import namedtuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'IV变量.py')
+sys.path.insert(0, ROOT)
+from iv_engine import STORE_N_VALUES as N_VALUES
+
+DRIVERS = ('server', 'apptest')
+
+# 侧边栏滑块：(最小值, 最大值, 默认值)，步长 0.1；n 的取值 N_VALUES 与应用的样本量滑块相同
+SLIDERS = {'gamma': (0.1, 2.0, 1.0), 'delta': (0.0, 2.0, 0.5), 'phi': (0.0, 2.0, 0.0)}
+SLIDER_SYMBOLS = {'γ': 'gamma', 'δ': 'delta', 'φ': 'phi'}
+# 手势及其概率；场景为侧边栏单选框的选项下标，标签页为主标签页的下标（结果、图表、模型）
+GESTURES = ('drag', 'scenario', 'n', 'tab')
+GESTURE_WEIGHTS = (0.6, 0.15, 0.1, 0.15)
+SCENARIO_COUNT = 3
+TAB_COUNT = 3
+PERCENTILES = (50, 90, 95, 99)
+
+Action = namedtuple('Action', ['kind', 'target', 'value', 'pause'])
+Rerun = namedtuple('Rerun', ['kind', 'start', 'latency', 'nbytes', 'errors'])
+
+
+# ======================== 操作序列 ========================
+def slider_grid(name):
+    lo, hi, _ = SLIDERS[name]
+    return np.round(np.arange(lo, hi + 1e-9, 0.1), 1)
+
+
+# 第一个操作是打开页面（load）；之后每个手势展开为一个或多个重跑
+def user_actions(seed, user, count, think, drag_interval, max_n):
+    rng = np.random.default_rng([seed, user])
+    values = {name: default for name, (_, _, default) in SLIDERS.items()}
+    n_values = [v for v in N_VALUES if v <= max_n]
+    n, scenario, tab = 1000, 0, 0
+    actions = [Action('load', None, None, 0.0)]
+    while len(actions) < count:
+        gesture = GESTURES[rng.choice(len(GESTURES), p=GESTURE_WEIGHTS)]
+        pause = float(rng.exponential(think))
+        if gesture == 'drag':
+            name = list(SLIDERS)[rng.integers(len(SLIDERS))]
+            grid = slider_grid(name)
+            start, stop = int(np.abs(grid - values[name]).argmin()), int(rng.integers(len(grid)))
+            step = 1 if stop > start else -1
+            for k, i in enumerate(range(start + step, stop + step, step) if stop != start else ()):
+                actions.append(Action('drag', name, float(grid[i]), pause if k == 0 else drag_interval))
+            values[name] = float(grid[stop])
+        elif gesture == 'scenario':
+            scenario = (scenario + 1 + int(rng.integers(SCENARIO_COUNT - 1))) % SCENARIO_COUNT
+            actions.append(Action('scenario', 'scenario', scenario, pause))
+        elif gesture == 'n' and len(n_values) > 1:
+            n = [v for v in n_values if v != n][rng.integers(len(n_values) - 1)]
+            actions.append(Action('n', 'n', n, pause))
+        elif gesture == 'tab':
+            tab = (tab + 1 + int(rng.integers(TAB_COUNT - 1))) % TAB_COUNT
+            actions.append(Action('tab', 'tab', tab, pause))
+    return actions[:count]
+
+
+# ======================== server 驱动：websocket 客户端 ========================
+# 从服务器发来的元素中记下需要操作的控件：γ / δ / φ 滑块（按标签首字符识别）、n、场景单选框与主标签页
+class ServerSession:
+    def __init__(self, url):
+        self.url = url.rstrip('/').replace('http://', 'ws://').replace('https://', 'wss://') + '/_stcore/stream'
+        self.ws = None
+        self.page_hash = ''
+        self.widgets = {}
+        self.options = {}
+        self.states = {}
+        self._tab_path = None
+
+    async def connect(self):
+        import websockets
+
+        self.ws = await websockets.connect(self.url, subprotocols=['streamlit'], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    def _learn(self, delta, path):
+        kind = delta.WhichOneof('type')
+        if kind == 'add_block':
+            block = delta.add_block
+            if block.WhichOneof('type') == 'tab_container' and block.tab_container.id:
+                self.widgets['tab'], self.options['tab'], self._tab_path = block.tab_container.id, [], path
+            elif block.WhichOneof('type') == 'tab' and path[:-1] == self._tab_path:
+                self.options['tab'].append(block.tab.label)
+            return 0
+        if kind != 'new_element':
+            return 0
+        element = delta.new_element
+        etype = element.WhichOneof('type')
+        if etype == 'exception':
+            return 1
+        el = getattr(element, etype)
+        wid = getattr(el, 'id', '')
+        if etype == 'slider' and wid.endswith('-n'):
+            self.widgets['n'] = wid
+        elif etype == 'slider' and wid.endswith('-None') and el.label[:1] in SLIDER_SYMBOLS:
+            self.widgets[SLIDER_SYMBOLS[el.label[:1]]] = wid
+        elif etype == 'radio' and wid.endswith('-None'):
+            self.widgets['scenario'], self.options['scenario'] = wid, list(el.options)
+        return 0
+
+    def apply(self, action):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        if action.kind == 'load':
+            return
+        wid = self.widgets[action.target]
+        state = WidgetState(id=wid)
+        if action.kind == 'drag':
+            state.double_array_value.data.append(action.value)
+        elif action.kind == 'n':
+            state.string_array_value.data.append(f'{action.value:,}')
+        else:
+            state.string_value = self.options[action.target][action.value]
+        self.states[wid] = state
+
+    async def rerun(self, kind):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.page_script_hash = self.page_hash
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        nbytes = errors = 0
+        while True:
+            raw = await self.ws.recv()
+            nbytes += len(raw)
+            fm = ForwardMsg.FromString(raw)
+            kind_ = fm.WhichOneof('type')
+            if kind_ == 'new_session':
+                self.page_hash = fm.new_session.page_script_hash
+            elif kind_ == 'delta':
+                errors += self._learn(fm.delta, tuple(fm.metadata.delta_path))
+            elif kind_ == 'script_finished' and fm.script_finished in (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_WITH_COMPILE_ERROR):
+                errors += fm.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR
+                return Rerun(kind, start, time.perf_counter() - start, nbytes, errors)
+
+
+async def server_user(url, actions, delay, t0):
+    await asyncio.sleep(delay)
+    session = ServerSession(url)
+    await session.connect()
+    reruns = []
+    try:
+        for action in actions:
+            await asyncio.sleep(action.pause)
+            session.apply(action)
+            r = await session.rerun(action.kind)
+            reruns.append(r._replace(start=r.start - t0))
+    finally:
+        await session.close()
+    return reruns
+
+
+# 服务器进程树（含后台任务的工作进程）的 CPU 秒数与常驻内存；非 Linux 时返回 None
+def proc_tree(pid):
+    pids, stack = [], [pid]
+    while stack:
+        p = stack.pop()
+        pids.append(p)
+        try:
+            for tid in os.listdir(f'/proc/{p}/task'):
+                with open(f'/proc/{p}/task/{tid}/children') as fh:
+                    stack.extend(int(c) for c in fh.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def proc_usage(pid):
+    if pid is None or not os.path.isdir(f'/proc/{pid}'):
+        return None
+    tick, page = os.sysconf('SC_CLK_TCK'), os.sysconf('SC_PAGE_SIZE')
+    cpu = rss = 0
+    for p in proc_tree(pid):
+        try:
+            with open(f'/proc/{p}/stat') as fh:
+                fields = fh.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{p}/statm') as fh:
+                rss += int(fh.read().split()[1]) * page
+        except OSError:
+            continue
+        cpu += (int(fields[11]) + int(fields[12])) / tick
+    return cpu, rss
+
+
+async def sample_usage(pid, samples, interval=0.25):
+    while True:
+        usage = proc_usage(pid)
+        if usage is not None:
+            samples.append(usage)
+        await asyncio.sleep(interval)
+
+
+async def run_server_users(url, pid, plans, ramp):
+    samples = []
+    before = proc_usage(pid)
+    sampler = asyncio.create_task(sample_usage(pid, samples))
+    t0 = time.perf_counter()
+    delays = np.linspace(0.0, ramp, len(plans)) if len(plans) > 1 else [0.0]
+    results = await asyncio.gather(*(server_user(url, actions, d, t0) for actions, d in zip(plans, delays)))
+    wall = time.perf_counter() - t0
+    sampler.cancel()
+    after = proc_usage(pid)
+    usage = None
+    if before is not None and after is not None:
+        usage = {'cpu': after[0] - before[0], 'rss_before': before[1], 'rss_after': after[1],
+                 'rss_peak': max([before[1], after[1]] + [s[1] for s in samples])}
+    return results, wall, usage
+
+
+def start_server(port, env):
+    cmd = [sys.executable, '-m', 'streamlit', 'run', APP, '--server.headless', 'true', '--server.port', str(port),
+           '--browser.gatherUsageStats', 'false', '--server.fileWatcherType', 'none']
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    url = f'http://localhost:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"streamlit exited: {proc.stderr.read().decode(errors='replace')[-2000:]}")
+        try:
+            with urllib.request.urlopen(url + '/_stcore/health', timeout=1) as resp:
+                if resp.status == 200:
+                    return proc, url
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError('streamlit server did not become healthy within 60 s')
+
+
+# ======================== apptest 驱动：每个用户一个子进程 ========================
+def apply_apptest(at, action):
+    if action.kind == 'drag':
+        at.sidebar.slider[list(SLIDERS).index(action.target)].set_value(action.value)
+    elif action.kind == 'n':
+        at.select_slider(key='n').set_value(action.value)
+    elif action.kind == 'scenario':
+        radio = at.sidebar.radio[0]
+        radio.set_value(radio.options[action.value])
+    elif action.kind == 'tab':
+        at.session_state['main_tab'] = at.tabs[action.value].label
+
+
+def child(spec):
+    import resource
+
+    from streamlit.testing.v1 import AppTest
+
+    spec = json.loads(spec)
+    actions = [Action(*a) for a in spec['actions']]
+    time.sleep(spec['delay'])
+    at = AppTest.from_file(APP, default_timeout=600)
+    usage0 = resource.getrusage(resource.RUSAGE_SELF)
+    reruns = []
+    for action in actions:
+        time.sleep(action.pause)
+        apply_apptest(at, action)
+        start = time.perf_counter()
+        at.run()
+        reruns.append(Rerun(action.kind, start - spec['t0'], time.perf_counter() - start, 0, len(at.exception)))
+    usage1 = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = usage1.ru_utime + usage1.ru_stime - usage0.ru_utime - usage0.ru_stime
+    print(json.dumps({'reruns': reruns, 'cpu': cpu, 'maxrss': usage1.ru_maxrss * 1024}))
+
+
+def run_apptest_users(plans, ramp, env):
+    t0 = time.time()
+    delays = np.linspace(0.0, ramp, len(plans)) if len(plans) > 1 else [0.0]
+    procs = []
+    for actions, delay in zip(plans, delays):
+        spec = json.dumps({'actions': actions, 'delay': float(delay), 't0': 0.0})
+        procs.append(subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', spec], cwd=ROOT, env=env,
+                                      stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True))
+    outputs = []
+    for proc in procs:
+        out, err = proc.communicate()
+        if proc.returncode != 0:
+            raise RuntimeError(f'virtual user failed:\n{err[-2000:]}')
+        outputs.append(json.loads(out.strip().splitlines()[-1]))
+    wall = time.time() - t0
+    results = [[Rerun(*r) for r in o['reruns']] for o in outputs]
+    usage = {'cpu': sum(o['cpu'] for o in outputs), 'rss_per_session': float(np.mean([o['maxrss'] for o in outputs]))}
+    return results, wall, usage
+
+
+# ======================== 汇总 ========================
+def latency_table(reruns):
+    by_kind = {}
+    for r in reruns:
+        by_kind.setdefault(r.kind, []).append(r.latency)
+    by_kind['all'] = [r.latency for r in reruns]
+    return {kind: {'count': len(v), 'mean': float(np.mean(v)), **{f'p{q}': float(np.percentile(v, q)) for q in PERCENTILES},
+                   'max': float(np.max(v))} for kind, v in by_kind.items()}
+
+
+def summarize_run(results, wall, usage, driver, users):
+    reruns = [r for user in results for r in user]
+    record = {
+        'driver': driver, 'users': users, 'reruns': len(reruns), 'wall': wall,
+        'throughput': len(reruns) / wall, 'errors': int(sum(r.errors for r in reruns)),
+        'bytes_per_rerun': float(np.mean([r.nbytes for r in reruns])) if driver == 'server' else None,
+        'latency': latency_table(reruns),
+    }
+    if usage is not None:
+        record['cpu_total'] = usage['cpu']
+        record['cpu_per_rerun'] = usage['cpu'] / len(reruns)
+        record['cpu_per_session'] = usage['cpu'] / users
+        if driver == 'server':
+            record['rss_before'], record['rss_peak'] = usage['rss_before'], usage['rss_peak']
+            record['rss_per_session'] = (usage['rss_peak'] - usage['rss_before']) / users
+        else:
+            record['rss_per_session'] = usage['rss_per_session']
+    return record
+
+
+def print_report(record):
+    print(f"\n{record['users']} users ({record['driver']} driver), {record['reruns']} reruns in {record['wall']:.1f} s: "
+          f"{record['throughput']:.2f} reruns/s, {record['errors']} errors")
+    print(f"{'action':<10}{'count':>7}{'mean':>9}" + ''.join(f"{f'p{q}':>9}" for q in PERCENTILES) + f"{'max':>9}   (ms)")
+    for kind, s in record['latency'].items():
+        print(f"{kind:<10}{s['count']:>7}{s['mean'] * 1000:>9.0f}" + ''.join(f"{s[f'p{q}'] * 1000:>9.0f}" for q in PERCENTILES)
+              + f"{s['max'] * 1000:>9.0f}")
+    if record.get('bytes_per_rerun') is not None:
+        print(f"payload: {record['bytes_per_rerun'] / 1024:.1f} KB per rerun")
+    if 'cpu_total' in record:
+        print(f"CPU: {record['cpu_total']:.1f} s total, {record['cpu_per_rerun'] * 1000:.0f} ms per rerun, "
+              f"{record['cpu_per_session']:.2f} s per session")
+        if 'rss_peak' in record:
+            print(f"memory: {record['rss_before'] / 2 ** 20:.0f} MB before, {record['rss_peak'] / 2 ** 20:.0f} MB peak, "
+                  f"{record['rss_per_session'] / 2 ** 20:.1f} MB per session")
+        else:
+            print(f"memory: {record['rss_per_session'] / 2 ** 20:.0f} MB peak RSS per session (isolated process)")
+    else:
+        print('CPU / memory: not available (pass --pid for an external server; Linux only)')
+
+
+# 总体 p50 / p95 延迟变慢或吞吐量下降超过 tolerance 的指标
+def regressions(record, baseline, tolerance):
+    out = []
+    for q in ('p50', 'p95'):
+        ref, new = baseline['latency']['all'][q], record['latency']['all'][q]
+        if new > ref * (1 + tolerance):
+            out.append((f'latency {q}', ref, new))
+    if record['throughput'] < baseline['throughput'] / (1 + tolerance):
+        out.append(('throughput', baseline['throughput'], record['throughput']))
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test: concurrent virtual users replaying slider drags and scenario switches')
+    parser.add_argument('--driver', choices=DRIVERS, default='server')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--actions', type=int, default=30, help='reruns per user, including the initial page load')
+    parser.add_argument('--think', type=float, default=1.0, help='mean think time between gestures (s)')
+    parser.add_argument('--drag-interval', type=float, default=0.2, help='time between reruns within one slider drag (s)')
+    parser.add_argument('--ramp', type=float, default=5.0, help='users join evenly over this many seconds')
+    parser.add_argument('--max-n', type=int, default=100000, help='largest sample size a user selects')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help='existing server (e.g. http://localhost:8501); default starts one locally')
+    parser.add_argument('--pid', type=int, help='process id of the --url server, for CPU / memory accounting')
+    parser.add_argument('--port', type=int, default=8599, help='port of the locally started server')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra environment for the app (e.g. IV_CACHE_DB=/tmp/iv_cache.sqlite)')
+    parser.add_argument('--save', help='write the results to this baseline file')
+    parser.add_argument('--compare', help='baseline file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        return child(args.child)
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    env.update(kv.split('=', 1) for kv in args.env)
+    plans = [user_actions(args.seed, u, args.actions, args.think, args.drag_interval, args.max_n) for u in range(args.users)]
+
+    if args.driver == 'apptest':
+        results, wall, usage = run_apptest_users(plans, args.ramp, env)
+    else:
+        proc = None
+        url, pid = args.url, args.pid
+        if url is None:
+            proc, url = start_server(args.port, env)
+            pid = proc.pid
+        try:
+            results, wall, usage = asyncio.run(run_server_users(url, pid, plans, args.ramp))
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+    record = summarize_run(results, wall, usage, args.driver, args.users)
+    print_report(record)
+
+    if args.save:
+        from bench_suite import git_revision
+
+        record.update(timestamp=datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+                      revision=git_revision(), python=platform.python_version(), machine=platform.machine(),
+                      settings={k: v for k, v in vars(args).items() if k not in ('save', 'compare', 'child')})
+        with open(args.save, 'w', encoding='utf-8') as fh:
+            json.dump(record, fh, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        slow = regressions(record, baseline, args.tolerance)
+        print(f"\ncompared with {args.compare} (revision {baseline.get('revision')}), tolerance {args.tolerance:.0%}")
+        for name, ref, new in slow:
+            print(f"REGRESSION {name}: {ref:.4f} -> {new:.4f}")
+        if slow:
+            return 1
+        print('no regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+# 流式估计基准：运行时间、峰值内存（tracemalloc）随 n 的变化，并与一次性载入的结果对照
+# 用法: python benchmarks/bench_streaming.py [--sizes 1000000 10000000 100000000] [--check-max 10000000]
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from iv_engine import estimate, iter_basic_chunks, iter_hte_chunks, stream_basic, stream_hte
+
+
+def in_memory(chunks):
+    X, Y, Z = (np.concatenate(parts) for parts in zip(*chunks))
+    return estimate(X, Y, Z)
+
+
+def max_rel_diff(a, b):
+    va = np.array([a.ols.slope, a.tsls.slope, a.f_stat, a.corr_xz, a.cov_xz], dtype=float)
+    vb = np.array([b.ols.slope, b.tsls.slope, b.f_stat, b.corr_xz, b.cov_xz], dtype=float)
+    return float(np.max(np.abs(va - vb) / np.maximum(np.abs(vb), 1e-300)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000000, 10000000, 100000000])
+    parser.add_argument('--check-max', type=int, default=10000000, help='n 不超过该值时与一次性载入结果对照')
+    args = parser.parse_args(argv)
+
+    props, betas = [0.3, 0.3, 0.3, 0.1], [5.0, 2.0, 2.0, 2.0]
+    cases = [
+        ('basic', lambda n: stream_basic(1.0, 0.5, 0.2, n), lambda n: iter_basic_chunks(1.0, 0.5, 0.2, n)),
+        ('hte', lambda n: stream_hte(props, betas, n), lambda n: iter_hte_chunks(props, betas, n)),
+    ]
+    print(f"{'model':>6} {'n':>12} {'time (s)':>9} {'peak MB':>8} {'2SLS':>9} {'max rel diff':>13}")
+    for name, stream, chunks in cases:
+        for n in args.sizes:
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            est = stream(n)
+            elapsed = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+            diff = f"{max_rel_diff(est, in_memory(chunks(n))):.2e}" if n <= args.check_max else '-'
+            print(f"{name:>6} {n:>12} {elapsed:>9.2f} {peak:>8.1f} {est.tsls.slope:>9.4f} {diff:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+# 模拟器分阶段基准套件：数据生成、估计、绘图分别计时，记录历史并检测性能回退
+# 用法: python benchmarks/bench_suite.py [--sizes 1000 100000 10000000]
+#                                        [--stages basic_block hte_block stream basic_dgp hte_dgp estimate render]
+# basic_block / hte_block 为应用与命令行实际使用的 Generator 分块抽样，stream 为渐进式流的完整一遍
+# （逐块抽样 + 交叉乘积，即应用每次重跑的主计算）；basic_dgp / hte_dgp 为只用于与原脚本逐位对照的旧版
+# RandomState 路径，保留以延续历史记录。估计与绘图使用分块抽样生成的数据。
+#                                        [--save BASELINE.json] [--compare BASELINE.json] [--tolerance 0.25]
+# 每个用例取 --repeat 次中的最短时间；结果追加到 --history（JSON Lines，带 git 版本与时间戳），
+# 便于长期跟踪。--compare 时，任一用例比基线慢超过 tolerance（且绝对差超过 --min-delta 秒）即以退出码 1 结束。
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from iv_engine import (
+    HEAD_MAX, SAMPLE_STREAM, SCENARIO_PRESETS, TYPE_LABELS, ProgressiveStream, basic_block, estimate, grouped_box_stats, hte_block,
+    normalize_props, simulate_basic, simulate_hte,
+)
+
+STAGES = ('basic_block', 'hte_block', 'stream', 'basic_dgp', 'hte_dgp', 'estimate', 'render')
+SEED = 42
+DEFAULT_HISTORY = os.path.join(ROOT, 'benchmarks', 'history.jsonl')
+
+# (γ, δ, φ)：默认强工具变量、弱工具变量、违反排他性
+BASIC_SETTINGS = {
+    'default': (1.0, 0.5, 0.0),
+    'weak': (0.05, 0.5, 0.0),
+    'exclusion': (1.0, 0.9, 0.5),
+}
+# 类型比例：两个内置场景与全部为 Compliers
+HTE_SETTINGS = {
+    'scenario_1': (normalize_props(SCENARIO_PRESETS['scenario_1']['props']), SCENARIO_PRESETS['scenario_1']['betas']),
+    'scenario_2': (normalize_props(SCENARIO_PRESETS['scenario_2']['props']), SCENARIO_PRESETS['scenario_2']['betas']),
+    'compliers': ((1.0, 0.0, 0.0, 0.0), SCENARIO_PRESETS['scenario_1']['betas']),
+}
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+# 与应用相同的绘图调用：基础模型为散点 + 回归直线，HTE 为按类型与 D 分组的箱线图；只使用前 HEAD_MAX 个观测
+def render_basic(sample, fit):
+    from iv_render import scatter_with_fits
+
+    m = min(len(sample.X), HEAD_MAX)
+    return scatter_with_fits(sample.X[:m], sample.Y[:m], [
+        ('OLS', fit.ols.intercept, fit.ols.slope, 'red'), ('2SLS', fit.tsls.intercept, fit.tsls.slope, 'green'),
+    ], 'points', 'scatter')
+
+
+def render_hte(sample):
+    from iv_render import box_from_summaries
+
+    m = min(len(sample.Y), HEAD_MAX)
+    stats = grouped_box_stats(2 * sample.types[:m] + sample.D[:m].astype(np.int8), sample.Y[:m], 2 * len(TYPE_LABELS))
+    groups = []
+    for code, label in enumerate(TYPE_LABELS):
+        groups.append((f'{label} (D=0)', stats[2 * code], 'blue', 0.7))
+        groups.append((f'{label} (D=1)', stats[2 * code + 1], 'blue', 1.0))
+    return box_from_summaries(groups, 'distribution', 'type')
+
+
+# 每次计时都新建流，不复用已缓存的前缀和
+def stream_pass(make_stream, n):
+    return make_stream().moments(n)
+
+
+# 生成 (阶段, 设定, n, 计时函数)；估计与绘图所用的数据在计时外生成
+def cases(stages, sizes):
+    for n in sizes:
+        for name, (gamma, delta, phi) in BASIC_SETTINGS.items():
+            if 'basic_block' in stages:
+                yield 'basic_block', name, n, lambda: basic_block(gamma, delta, phi, SEED, (SAMPLE_STREAM, 0), n)
+            if 'stream' in stages:
+                yield 'stream', name, n, lambda: stream_pass(lambda: ProgressiveStream.basic(gamma, delta, phi, SEED), n)
+            if 'basic_dgp' in stages:
+                yield 'basic_dgp', name, n, lambda: simulate_basic(gamma, delta, phi, n)
+            if 'estimate' in stages or 'render' in stages:
+                sample = basic_block(gamma, delta, phi, SEED, (SAMPLE_STREAM, 0), n)
+                if 'estimate' in stages:
+                    yield 'estimate', name, n, lambda: estimate(sample.X, sample.Y, sample.Z)
+                if 'render' in stages:
+                    fit = estimate(sample.X, sample.Y, sample.Z)
+                    yield 'render', name, n, lambda: render_basic(sample, fit)
+                del sample
+        for name, (props, betas) in HTE_SETTINGS.items():
+            if 'hte_block' in stages:
+                yield 'hte_block', name, n, lambda: hte_block(props, betas, SEED, (SAMPLE_STREAM, 0), n)
+            if 'stream' in stages:
+                yield 'stream', name, n, lambda: stream_pass(lambda: ProgressiveStream.hte(props, betas, SEED), n)
+            if 'hte_dgp' in stages:
+                yield 'hte_dgp', name, n, lambda: simulate_hte(props, betas, n)
+            if 'estimate' in stages or 'render' in stages:
+                sample = hte_block(props, betas, SEED, (SAMPLE_STREAM, 0), n)
+                if 'estimate' in stages:
+                    yield 'estimate', name, n, lambda: estimate(sample.D, sample.Y, sample.Z)
+                if 'render' in stages:
+                    yield 'render', name, n, lambda: render_hte(sample)
+                del sample
+
+
+def case_key(stage, setting, n):
+    return f'{stage}/{setting}/{n}'
+
+
+def git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True, text=True).stdout
+        return out.stdout.strip() + ('-dirty' if dirty.strip() else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# 比基线慢超过 tolerance（相对）且超过 min_delta（绝对，秒）的用例；基线中没有的用例忽略
+def regressions(results, baseline, tolerance, min_delta):
+    out = []
+    for key, t in results.items():
+        ref = baseline.get(key)
+        if ref is not None and t > ref * (1 + tolerance) and t - ref > min_delta:
+            out.append((key, ref, t))
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-stage benchmark suite with history and regression check')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 10000000])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON Lines file the run is appended to ("" to skip)')
+    parser.add_argument('--save', help='write the timings to this baseline file')
+    parser.add_argument('--compare', help='baseline file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown vs the baseline')
+    parser.add_argument('--min-delta', type=float, default=0.002, help='ignore slowdowns smaller than this many seconds')
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'stage':<13}{'setting':<12}{'n':>10}{'time (s)':>12}")
+    for stage, setting, n, fn in cases(args.stages, args.sizes):
+        t = best_of(fn, args.repeat)
+        results[case_key(stage, setting, n)] = t
+        print(f"{stage:<13}{setting:<12}{n:>10}{t:>12.4f}", flush=True)
+
+    record = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'revision': git_revision(), 'python': platform.python_version(), 'numpy': np.__version__,
+        'machine': platform.machine(), 'repeat': args.repeat, 'results': results,
+    }
+    if args.history:
+        with open(args.history, 'a', encoding='utf-8') as fh:
+            fh.write(json.dumps(record) + '\n')
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as fh:
+            json.dump(record, fh, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        slow = regressions(results, baseline['results'], args.tolerance, args.min_delta)
+        print(f"\ncompared with {args.compare} (revision {baseline.get('revision')}), tolerance {args.tolerance:.0%}")
+        for key, ref, t in slow:
+            print(f"REGRESSION {key}: {ref:.4f}s -> {t:.4f}s ({t / ref:.2f}x)")
+        if slow:
+            return 1
+        print('no regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
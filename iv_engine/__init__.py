@@ -0,0 +1,75 @@
+# IV 模拟器计算引擎：不依赖 Streamlit / plotly，可在批处理任务中直接导入
+from .profiling import (
+    StageRecord, StageSummary, PROFILE_HISTORY, RunProfiler, ProfileHistory, active_profiler, stage, chrome_trace,
+)
+from .rng import (
+    SAMPLE_STREAM, MONTE_CARLO_STREAM, BOOTSTRAP_STREAM, BIT_GENERATORS, DEFAULT_BIT_GENERATOR,
+    seed_sequence, generator, spawn,
+)
+from .dgp import (
+    TYPE_LABELS, TREATMENT_TABLE, BETA_TRUE, ALPHA,
+    HTESample, BasicSample,
+    hte_type_table, hte_from_draws, basic_from_shocks, draw_hte, draw_basic, simulate_hte, simulate_basic,
+    basic_shocks, basic_block, hte_block,
+)
+from .estimators import (
+    LinearFit, TSLSFit, IVEstimates,
+    cross_moments, ols, tsls, first_stage_f, corr_xz, cov_xz, wald_ratio,
+    estimates_from_moments, estimate,
+)
+from .analytic import (
+    PopulationResult, WaldDecomposition, Validation,
+    population_basic, population_hte, wald_decomposition, concentration, validate,
+)
+from .linear_iv import (
+    IVLayout, GeneralFit, FirstStageFit, IVRegression, GRAM_ROWS, QR_ROWS, IV_METHODS,
+    design_moments, moments_factor, qr_factor, design_factor, iv_from_factor, iv_regression, iv_from_moments,
+)
+from .critical_values import (
+    STOCK_YOGO_SIZE, STOCK_YOGO_SIZE_LEVELS, STOCK_YOGO_BIAS, STOCK_YOGO_BIAS_LEVELS,
+    EFFECTIVE_F_K, EFFECTIVE_F_TAUS, EFFECTIVE_F_CRITICAL, stock_yogo, effective_f_critical,
+)
+from .diagnostics import (
+    WeakIVCritical, OverIdTest, WeakIVDiagnostics, EFFECTIVE_F_TAU,
+    chi2_sf, diagnostics_from_factor, weak_iv_diagnostics, moment_diagnostics,
+)
+from .inference import (
+    SE_TYPES, SlopeSE, StandardErrors, ARConfidenceSet, BootstrapResult, BOOT_BLOCK_ELEMENTS, BOOTSTRAP_METHODS,
+    sandwich_sums, standard_errors, normal_ci, ar_statistic, anderson_rubin, boot_block_size, bootstrap, percentile_ci,
+)
+from .potential_outcomes import (
+    BETA_DISTRIBUTIONS, INSTRUMENTS, MTE_GRID, INTEGRATION_GRID, POModel, POSample, MTEWeights, POPopulation,
+    EmpiricalMTE, SampleEffects, MTEAccumulator, EffectAccumulator, po_model, po_from_shocks, po_block, po_chunk, mte, population_po, empirical_mte,
+)
+from .montecarlo import (
+    MAX_REPS, MAX_ELEMENTS, REP_BLOCK, MonteCarloResult, DistSummary, max_reps_for, block_size,
+    monte_carlo_basic, monte_carlo_hte, summarize, histogram,
+)
+from .workers import POOL_START_METHOD, process_pool
+from .cache import CACHE_DB_ENV, CACHE_TTL_ENV, CacheStats, BackendStats, SQLiteBackend, ResultCache, cache_from_env, default_cache
+from .sweep import (
+    GAMMA_GRID, DELTA_GRID, PHI_GRID, SWEEP_METRICS, SWEEP_REP_COST, SweepResult,
+    base_moments, transform, parameter_sweep,
+)
+from .scenarios import (
+    ScenarioRun, InferenceRun, PORun, ScenarioComparison, HEAD_MAX, HTE_BETAS, DEFAULT_PROPS, SCENARIO_PRESETS, normalize_props,
+    run_basic, run_hte, run_monte_carlo_basic, run_monte_carlo_hte, run_parameter_sweep, run_inference, run_bootstrap,
+    run_po, run_file_iv, compare_scenarios, compare_from_store, basic_key, hte_key, mc_basic_key, mc_hte_key, inference_key,
+    bootstrap_key, sweep_key, compare_key,
+)
+from .jobs import (
+    JOB_KINDS, JOB_STATES, JOB_HISTORY, JOB_POLL_SECONDS, JobProgress, JobQueueStats, JobCancelled, Job, JobQueue, default_jobs,
+)
+from .store import (
+    STORE_VERSION, STORE_N_VALUES, STORE_PRESETS, STORE_ENV, StoreStats, ResultStore, build_store, open_store,
+)
+from .streaming import (
+    CHUNK_SIZE, MomentAccumulator, ProgressiveStream, chunk_bounds, basic_chunk, hte_chunk,
+    iter_basic_chunks, iter_hte_chunks,
+    accumulate, stream_basic, stream_hte,
+)
+from .ingest import (
+    DATA_FORMATS, INGEST_ROWS, FileIVResult, infer_data_format, data_columns, data_rows, iter_column_chunks, file_iv,
+)
+from .summaries import BoxStats, Density2D, box_stats, grouped_box_stats, density_2d
+from .batch import OUTPUT_FORMATS, expand_spec, load_spec, run_scenario, run_batch, write_rows
@@ -0,0 +1 @@
+# spawn / forkserver 工作进程的 __main__：只导入 iv_engine，不执行任何代码（见 workers.py）
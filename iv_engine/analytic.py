@@ -0,0 +1,108 @@
+import numpy as np
+from collections import namedtuple
+
+from .dgp import ALPHA, BETA_TRUE, _type_cdf, hte_type_table
+
+# ======================== 总体（解析）概率极限 ========================
+# 两个数据生成过程的二阶矩都有闭式表达，因此 OLS / 2SLS 的概率极限、LATE 与
+# Wald 比率分解无需模拟即可算出（微秒级），可在模拟进行时立即显示，并用于校验蒙特卡洛结果。
+# 字段与 IVEstimates 对应：r2_2sls 以真实 X 计算残差，即 1 - Var(Y - plim β̂_2SLS·X) / Var(Y)。
+# first_stage_r2 为总体第一阶段 R²，集中参数 μ² = n·R²/(1-R²)，E[F] ≈ 1 + μ²/k（k = 1）。
+PopulationResult = namedtuple('PopulationResult', [
+    'plim_ols', 'plim_2sls', 'late', 'r2_ols', 'r2_2sls', 'corr_xz', 'cov_xz', 'first_stage_r2',
+])
+WaldDecomposition = namedtuple('WaldDecomposition', [
+    'first_stage', 'reduced_form', 'weights', 'contributions', 'wald', 'late', 'defier_bias',
+])
+Validation = namedtuple('Validation', ['median', 'se', 'z'])
+
+
+# ======================== 基础模型 ========================
+# U, Z, e1, e2 独立 N(0, 1)；X = γZ + δU + e1，Y = βX + αU + φZ + e2
+# 于是 Y = (βγ + φ)Z + (βδ + α)U + βe1 + e2，
+# plim β̂_OLS = β + (αδ + φγ) / (γ² + δ² + 1)，plim β̂_2SLS = β + φ / γ。
+# 参数可为数组（按广播规则逐元素计算），例如整张 (γ, δ, φ) 网格。
+def population_basic(gamma, delta, phi):
+    gamma, delta, phi = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (gamma, delta, phi)))
+    var_x = gamma ** 2 + delta ** 2 + 1.0
+    var_y = (BETA_TRUE * gamma + phi) ** 2 + (BETA_TRUE * delta + ALPHA) ** 2 + BETA_TRUE ** 2 + 1.0
+    cov_xy = gamma * (BETA_TRUE * gamma + phi) + delta * (BETA_TRUE * delta + ALPHA) + BETA_TRUE
+    cov_zy = BETA_TRUE * gamma + phi
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plim_2sls = cov_zy / gamma
+    return PopulationResult(
+        plim_ols=(cov_xy / var_x)[()],
+        plim_2sls=plim_2sls[()],
+        late=np.full_like(gamma, BETA_TRUE)[()],
+        r2_ols=(cov_xy ** 2 / (var_x * var_y))[()],
+        r2_2sls=(1.0 - (var_y - 2.0 * plim_2sls * cov_xy + plim_2sls ** 2 * var_x) / var_y)[()],
+        corr_xz=(gamma / np.sqrt(var_x))[()],
+        cov_xz=gamma[()],
+        first_stage_r2=(gamma ** 2 / var_x)[()],
+    )
+
+
+# ======================== 异质性处理效应模型 ========================
+# Z ~ Bernoulli(0.5) 与类型独立，Y = β_i·D + U。记 p_c, p_a, p_n, p_d 为类型比例：
+#   第一阶段 E[D|Z=1] - E[D|Z=0] = p_c - p_d
+#   简约式   E[Y|Z=1] - E[Y|Z=0] = β_c·p_c - β_d·p_d
+# 2SLS 收敛到 Wald 比率 = w_c·β_c + w_d·β_d，w_c = p_c / (p_c - p_d)，w_d = -p_d / (p_c - p_d)；
+# 无 Defiers 时 w_c = 1，即 LATE = β_c。OLS 收敛到 E[β_i | D = 1] = E[β_i·D] / P(D = 1)。
+def wald_decomposition(props, betas):
+    p = np.asarray(props, dtype=float)
+    _type_cdf(p)
+    b = hte_type_table(betas)
+    first_stage = p[0] - p[3]
+    reduced_form = b[0] * p[0] - b[3] * p[3]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.array([p[0], 0.0, 0.0, -p[3]]) / first_stage
+    contributions = weights * b
+    wald = contributions.sum() if first_stage != 0 else np.nan
+    late = b[0] if p[0] > 0 else np.nan
+    return WaldDecomposition(first_stage, reduced_form, weights, contributions, wald, late, wald - late)
+
+
+def population_hte(props, betas):
+    p = np.asarray(props, dtype=float)
+    _type_cdf(p)
+    b = hte_type_table(betas)
+    dec = wald_decomposition(p, b)
+    # P(D=1) 及 E[β_i·D]、E[β_i²·D]：Always-takers 恒处理，Compliers / Defiers 各有一半处理
+    treated = np.array([0.5, 1.0, 0.0, 0.5]) * p
+    q = treated.sum()
+    m1 = (treated * b).sum()
+    m2 = (treated * b * b).sum()
+    var_y = m2 - m1 ** 2 + 1.0
+    cov_zd = 0.25 * dec.first_stage
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr_xz = cov_zd / np.sqrt(0.25 * q * (1.0 - q))
+        return PopulationResult(
+            plim_ols=m1 / q,
+            plim_2sls=dec.wald,
+            late=dec.late,
+            r2_ols=m1 ** 2 * (1.0 - q) / (q * var_y),
+            r2_2sls=1.0 - (var_y - 2.0 * dec.wald * m1 * (1.0 - q) + dec.wald ** 2 * q * (1.0 - q)) / var_y,
+            corr_xz=corr_xz,
+            cov_xz=cov_zd,
+            first_stage_r2=corr_xz ** 2,
+        )
+
+
+# ======================== 弱工具变量与蒙特卡洛校验 ========================
+# 集中参数 μ² = n·R²/(1-R²)；单工具变量时 E[F] ≈ 1 + μ²
+def concentration(first_stage_r2, n):
+    r2 = np.asarray(first_stage_r2, dtype=float)
+    with np.errstate(divide='ignore'):
+        return (n * r2 / (1.0 - r2))[()]
+
+
+# 以中位数比较抽样分布与概率极限（弱工具变量下 2SLS 的均值可能不存在）；
+# 中位数标准误按 IQR 估计的尺度计算：1.2533·(IQR/1.349)/√R。|z| 很大时说明存在有限样本偏差或程序错误。
+def validate(draws, plim):
+    draws = np.asarray(draws, dtype=float)
+    draws = draws[np.isfinite(draws)]
+    q1, median, q3 = np.percentile(draws, [25, 50, 75])
+    se = 1.2533 * (q3 - q1) / 1.349 / np.sqrt(max(draws.size, 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (median - plim) / se
+    return Validation(median, se, z)
@@ -0,0 +1,152 @@
+import json
+import math
+import os
+
+from .analytic import population_basic, population_hte
+from .dgp import TYPE_LABELS
+from .montecarlo import monte_carlo_basic, monte_carlo_hte, summarize
+from .scenarios import SCENARIO_PRESETS, normalize_props
+from .streaming import ProgressiveStream
+from .workers import process_pool
+
+# ======================== 批量场景运行 ========================
+# 场景说明文件（JSON）格式：
+# {
+#   "defaults": {"n": 1000, "seed": 42},
+#   "scenarios": [
+#     {"name": "basic_strong", "preset": "basic", "gamma": 1.5},
+#     {"name": "late", "preset": "scenario_1", "n": 1000000},
+#     {"name": "defiers", "model": "hte", "props": {"Compliers": 30, "Always-takers": 30,
+#                                                    "Never-takers": 30, "Defiers": 10}, "reps": 2000}
+#   ]
+# }
+# 每个场景依次合并：预设 → defaults → 场景自身字段。给出 reps 时额外运行蒙特卡洛并输出汇总。
+BASIC_FIELDS = ('gamma', 'delta', 'phi')
+PROP_COLUMNS = ('prop_compliers', 'prop_always', 'prop_never', 'prop_defiers')
+BETA_COLUMNS = ('beta_compliers', 'beta_always', 'beta_never', 'beta_defiers')
+
+
+def _by_type(value, field):
+    if isinstance(value, dict):
+        unknown = set(value) - set(TYPE_LABELS)
+        if unknown:
+            raise ValueError(f"{field}: unknown types {sorted(unknown)}")
+        return [value.get(label, 0.0) for label in TYPE_LABELS]
+    return list(value)
+
+
+def expand_spec(spec):
+    if not isinstance(spec, dict) or not isinstance(spec.get('scenarios'), list) or not spec['scenarios']:
+        raise ValueError("spec must be an object with a non-empty 'scenarios' list")
+    defaults = spec.get('defaults', {})
+    scenarios = []
+    for i, entry in enumerate(spec['scenarios']):
+        preset_name = entry.get('preset')
+        if preset_name is not None and preset_name not in SCENARIO_PRESETS:
+            raise ValueError(f"scenario {i}: unknown preset {preset_name!r}, expected one of {sorted(SCENARIO_PRESETS)}")
+        sc = {'n': 1000, 'seed': 42, **SCENARIO_PRESETS.get(preset_name, {}), **defaults, **entry}
+        sc.setdefault('name', preset_name or f'scenario_{i}')
+        model = sc.get('model')
+        if model == 'basic':
+            missing = [f for f in BASIC_FIELDS if f not in sc]
+            if missing:
+                raise ValueError(f"scenario {sc['name']!r}: missing {missing}")
+        elif model == 'hte':
+            sc['props'] = normalize_props(_by_type(sc.get('props', SCENARIO_PRESETS['scenario_1']['props']), 'props'))
+            sc['betas'] = tuple(float(b) for b in _by_type(sc.get('betas', SCENARIO_PRESETS['scenario_1']['betas']), 'betas'))
+        else:
+            raise ValueError(f"scenario {sc['name']!r}: model must be 'basic' or 'hte'")
+        sc['n'], sc['seed'] = int(sc['n']), int(sc['seed'])
+        if sc['n'] < 3:
+            raise ValueError(f"scenario {sc['name']!r}: n must be at least 3")
+        scenarios.append(sc)
+    return scenarios
+
+
+def load_spec(path):
+    with open(path, encoding='utf-8') as fh:
+        return expand_spec(json.load(fh))
+
+
+# 退化场景（如没有依从者时 2SLS 的概率极限）给出 NaN / ±inf，写为 null：JSON 标准不允许 NaN
+def _float(v):
+    v = float(v)
+    return v if math.isfinite(v) else None
+
+
+# 运行单个场景，返回一行扁平结果（只含 Python 标量，便于写 JSON/Parquet）
+def run_scenario(sc):
+    n, seed = sc['n'], sc['seed']
+    row = {'name': sc['name'], 'model': sc['model'], 'n': n, 'seed': seed}
+    if sc['model'] == 'basic':
+        params = tuple(float(sc[f]) for f in BASIC_FIELDS)
+        row.update(zip(BASIC_FIELDS, params))
+        est = ProgressiveStream.basic(*params, seed=seed).estimates(n)
+        population = population_basic(*params)
+        truth = 1.0
+    else:
+        row.update(zip(PROP_COLUMNS, sc['props']))
+        row.update(zip(BETA_COLUMNS, sc['betas']))
+        est = ProgressiveStream.hte(sc['props'], sc['betas'], seed=seed).estimates(n)
+        population = population_hte(sc['props'], sc['betas'])
+        truth = sc['betas'][0]
+    row.update({
+        'ols_intercept': _float(est.ols.intercept), 'ols_slope': _float(est.ols.slope), 'r2_ols': _float(est.ols.r2),
+        'tsls_intercept': _float(est.tsls.intercept), 'tsls_slope': _float(est.tsls.slope), 'r2_2sls': _float(est.tsls.r2),
+        'f_stat': _float(est.f_stat), 'corr_xz': _float(est.corr_xz), 'cov_xz': _float(est.cov_xz),
+        'plim_ols': _float(population.plim_ols), 'plim_2sls': _float(population.plim_2sls), 'late': _float(population.late),
+    })
+    reps = sc.get('reps')
+    if reps:
+        mc = (monte_carlo_basic(*params, n, int(reps), seed) if sc['model'] == 'basic'
+              else monte_carlo_hte(sc['props'], sc['betas'], n, int(reps), seed))
+        s_ols, s_2sls = summarize(mc.beta_ols, truth), summarize(mc.beta_2sls, truth)
+        row.update({
+            'mc_reps': int(reps),
+            'mc_ols_mean': _float(s_ols.mean), 'mc_ols_std': _float(s_ols.std), 'mc_ols_rmse': _float(s_ols.rmse),
+            'mc_2sls_mean': _float(s_2sls.mean), 'mc_2sls_median': _float(s_2sls.median),
+            'mc_2sls_std': _float(s_2sls.std), 'mc_2sls_rmse': _float(s_2sls.rmse),
+            'mc_weak_rate': _float((mc.f_stat < 10).mean()),
+        })
+    return row
+
+
+def run_batch(scenarios, workers=1):
+    workers = min(workers or os.cpu_count() or 1, len(scenarios))
+    if workers <= 1:
+        return [run_scenario(sc) for sc in scenarios]
+    with process_pool(workers) as pool:
+        return list(pool.map(run_scenario, scenarios))
+
+
+# ======================== 结果输出 ========================
+OUTPUT_FORMATS = ('json', 'jsonl', 'parquet')
+
+
+def infer_format(path):
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if ext not in OUTPUT_FORMATS:
+        raise ValueError(f"cannot infer output format from {path!r}; use one of {OUTPUT_FORMATS}")
+    return ext
+
+
+def write_rows(rows, path, fmt=None):
+    fmt = fmt or infer_format(path)
+    if fmt == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("writing Parquet requires pyarrow (pip install pyarrow)") from None
+        # 各场景列可能不同（如仅部分场景含蒙特卡洛），按全部列对齐，缺失处为 null
+        columns = list(dict.fromkeys(k for row in rows for k in row))
+        pq.write_table(pa.table({c: [row.get(c) for row in rows] for c in columns}), path)
+    elif fmt == 'jsonl':
+        with open(path, 'w', encoding='utf-8') as fh:
+            for row in rows:
+                fh.write(json.dumps(row, ensure_ascii=False, allow_nan=False) + '\n')
+    elif fmt == 'json':
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(rows, fh, ensure_ascii=False, indent=2, allow_nan=False)
+    else:
+        raise ValueError(f"unknown output format {fmt!r}; use one of {OUTPUT_FORMATS}")
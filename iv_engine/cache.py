@@ -0,0 +1,289 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+# ======================== 结果缓存 ========================
+# 以 (模型, 参数, n, seed) 为键的进程内 LRU 缓存，同时受条目数与内存大小约束。
+# Streamlit 的各个会话运行在不同线程中，所有读写都在锁内完成。
+# 缓存中的数组被设为只读，避免调用方原地修改污染其他会话的结果。
+# 课堂部署时几百个会话同时打开同一组默认参数：
+#   * get_or_compute 对同一个键只计算一次（single-flight），并发的相同请求等待第一个请求的结果；
+#   * ttl（秒）给条目设置过期时间，过期的条目在下次访问时删除并重新计算；
+#   * backend 为可选的磁盘后端（SQLiteBackend），内存未命中时先查磁盘，计算结果同时写入磁盘，
+#     同一台机器上的多个 Streamlit 进程、以及重启后的进程共享已算出的结果。
+# 默认缓存由环境变量配置：IV_CACHE_DB 为 SQLite 文件路径（不设置则只用内存），IV_CACHE_TTL 为过期秒数。
+CACHE_DB_ENV = 'IV_CACHE_DB'
+CACHE_TTL_ENV = 'IV_CACHE_TTL'
+
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'evictions', 'entries', 'nbytes', 'max_entries', 'max_bytes',
+                                       'expirations', 'coalesced', 'backend_hits'])
+BackendStats = namedtuple('BackendStats', ['path', 'hits', 'misses', 'writes', 'evictions', 'expirations',
+                                           'entries', 'nbytes', 'max_bytes'])
+
+
+def _freeze(value):
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _freeze(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _freeze(v)
+    return value
+
+
+def sizeof(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return 64 + sum(sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return 64 + sum(sizeof(v) for v in value.values())
+    return 32
+
+
+# ======================== 磁盘后端 ========================
+# 单个 SQLite 文件，值为 pickle 序列化的结果（namedtuple + NumPy 数组），键为 repr(key) 的 SHA-256。
+# WAL 模式下读写互不阻塞；每个线程使用自己的连接，多进程之间由 SQLite 的文件锁保证一致。
+# 总大小超过 max_bytes 时按最近访问时间淘汰。pickle 只应读取自己写入的文件，路径不要指向不受信任的位置。
+class SQLiteBackend:
+    def __init__(self, path, max_bytes=2 * 2 ** 30, ttl=None):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)')
+        self._connect().execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key, default=None):
+        digest, now = self._digest(key), time.time()
+        conn = self._connect()
+        row = conn.execute('SELECT value, created FROM results WHERE key = ?', (digest,)).fetchone()
+        if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+            conn.execute('DELETE FROM results WHERE key = ?', (digest,))
+            self._count('expirations')
+            row = None
+        if row is None:
+            self._count('misses')
+            return default
+        conn.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, digest))
+        self._count('hits')
+        return pickle.loads(row[0])
+
+    # 无法序列化或超过 max_bytes 的结果只留在内存中，返回是否写入
+    def put(self, key, value):
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+        if len(blob) > self.max_bytes:
+            return False
+        now = time.time()
+        conn = self._connect()
+        conn.execute('INSERT OR REPLACE INTO results (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)',
+                     (self._digest(key), blob, len(blob), now, now))
+        self._count('writes')
+        self._evict(conn)
+        return True
+
+    def _evict(self, conn):
+        if self.ttl is not None:
+            removed = conn.execute('DELETE FROM results WHERE created < ?', (time.time() - self.ttl,)).rowcount
+            with self._lock:
+                self.expirations += max(removed, 0)
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for digest, size in conn.execute('SELECT key, size FROM results ORDER BY accessed').fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute('DELETE FROM results WHERE key = ?', (digest,))
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def clear(self):
+        self._connect().execute('DELETE FROM results')
+
+    def stats(self):
+        entries, nbytes = self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        with self._lock:
+            return BackendStats(self.path, self.hits, self.misses, self.writes, self.evictions, self.expirations,
+                                entries, nbytes, self.max_bytes)
+
+
+# 正在计算中的键：第一个请求计算，其余请求等待 event
+class _Pending:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    def __init__(self, max_entries=128, max_bytes=256 * 2 ** 20, ttl=None, backend=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.backend = backend
+        self._data = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        self.backend_hits = 0
+
+    def _expired(self, entry):
+        return entry[2] is not None and time.monotonic() > entry[2]
+
+    def _drop(self, key):
+        self._nbytes -= self._data.pop(key)[1]
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self._expired(entry):
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return default
+
+    # persist=False 时只写内存（用于从磁盘后端读回的结果）
+    def put(self, key, value, persist=True):
+        size = sizeof(value)
+        _freeze(value)
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            # 单个结果超过内存上限时不缓存
+            if size <= self.max_bytes:
+                self._data[key] = (value, size, expires)
+                self._nbytes += size
+                while len(self._data) > self.max_entries or self._nbytes > self.max_bytes:
+                    _, (_, old_size, _) = self._data.popitem(last=False)
+                    self._nbytes -= old_size
+                    self.evictions += 1
+        if persist and self.backend is not None:
+            self.backend.put(key, value)
+        return value
+
+    # 命中则直接返回；否则依次查磁盘后端、调用 compute() 并写入缓存。
+    # 同一个键同时只有一个请求在计算，其余请求等待并共享结果（计算失败时同样收到异常）
+    def get_or_compute(self, key, compute):
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        with self._lock:
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = _Pending()
+            else:
+                self.coalesced += 1
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+        try:
+            value = missing if self.backend is None else self.backend.get(key, missing)
+            if value is not missing:
+                with self._lock:
+                    self.backend_hits += 1
+                value = self.put(key, value, persist=False)
+            else:
+                value = self.put(key, compute())
+            pending.value = value
+            return value
+        except BaseException as exc:
+            pending.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.event.set()
+
+    # 只清空内存；clear_backend=True 时同时清空磁盘后端
+    def clear(self, clear_backend=False):
+        with self._lock:
+            self._data.clear()
+            self._nbytes = 0
+        if clear_backend and self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions, len(self._data), self._nbytes,
+                              self.max_entries, self.max_bytes, self.expirations, self.coalesced, self.backend_hits)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and not self._expired(entry)
+
+
+# 由环境变量 IV_CACHE_DB / IV_CACHE_TTL 配置的缓存；两者都未设置时与 ResultCache() 相同
+def cache_from_env(environ=None):
+    environ = os.environ if environ is None else environ
+    ttl = float(environ[CACHE_TTL_ENV]) if environ.get(CACHE_TTL_ENV) else None
+    backend = SQLiteBackend(environ[CACHE_DB_ENV], ttl=ttl) if environ.get(CACHE_DB_ENV) else None
+    return ResultCache(ttl=ttl, backend=backend)
+
+
+# 进程级默认缓存，供 Streamlit 各会话与批处理共用
+default_cache = cache_from_env()
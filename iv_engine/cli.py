@@ -0,0 +1,63 @@
+import argparse
+import sys
+import time
+
+# ======================== 命令行入口 ========================
+# python -m iv_engine run SPEC.json -o results.parquet [--workers 4]
+# python -m iv_engine build-store result_store [--n 1000 10000] [--seed 42]
+# 只导入计算引擎（numpy），不导入 Streamlit / plotly / pandas，适合 cron 与 CI。
+
+
+def _cmd_run(args):
+    from .batch import load_spec, run_batch, write_rows
+
+    t0 = time.perf_counter()
+    scenarios = load_spec(args.spec)
+    rows = run_batch(scenarios, workers=args.workers)
+    write_rows(rows, args.output, args.format)
+    if not args.quiet:
+        print(f"{len(rows)} scenario(s) -> {args.output} in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+    return 0
+
+
+def _cmd_build_store(args):
+    from .store import STORE_N_VALUES, STORE_PRESETS, build_store
+
+    t0 = time.perf_counter()
+    progress = None if args.quiet else (lambda msg: print(f"  {msg}", file=sys.stderr, flush=True))
+    build_store(args.path, args.n or STORE_N_VALUES, args.seed or (42,), args.presets or STORE_PRESETS, callback=progress)
+    if not args.quiet:
+        print(f"result store -> {args.path} in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m iv_engine', description='Headless IV simulator')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help='run the scenarios in a JSON spec file and write the results')
+    run.add_argument('spec', help='scenario spec file (JSON)')
+    run.add_argument('-o', '--output', required=True, help='output path (.json, .jsonl or .parquet)')
+    run.add_argument('--format', choices=('json', 'jsonl', 'parquet'), help='output format (default: from extension)')
+    run.add_argument('-w', '--workers', type=int, default=1, help='worker processes (0 = all CPUs)')
+    run.add_argument('-q', '--quiet', action='store_true')
+    run.set_defaults(func=_cmd_run)
+
+    store = sub.add_parser('build-store', help='precompute the basic-model grid and HTE presets into a result store')
+    store.add_argument('path', help='output directory (memory-mapped .npy files and manifest.json)')
+    store.add_argument('--n', type=int, nargs='+', help='sample sizes (default: the app\'s sample-size options)')
+    store.add_argument('--seed', type=int, nargs='+', help='random seeds (default: 42)')
+    store.add_argument('--presets', nargs='+', help='HTE presets to include (default: scenario_1 scenario_2)')
+    store.add_argument('-q', '--quiet', action='store_true')
+    store.set_defaults(func=_cmd_build_store)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError, RuntimeError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
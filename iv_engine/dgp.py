@@ -0,0 +1,126 @@
+import numpy as np
+from collections import namedtuple
+
+from .profiling import stage
+from .rng import generator
+
+# ======================== 个体类型与查找表 ========================
+# 类型编码：0=Compliers, 1=Always-takers, 2=Never-takers, 3=Defiers
+TYPE_LABELS = ('Compliers', 'Always-takers', 'Never-takers', 'Defiers')
+
+# 处理规则查找表：D = TREATMENT_TABLE[类型编码, Z]
+TREATMENT_TABLE = np.array([
+    [0.0, 1.0],  # Compliers:     D = Z
+    [1.0, 1.0],  # Always-takers: D = 1
+    [0.0, 0.0],  # Never-takers:  D = 0
+    [1.0, 0.0],  # Defiers:       D = 1 - Z
+])
+
+HTESample = namedtuple('HTESample', ['Z', 'types', 'D', 'U', 'betas', 'Y'])
+BasicSample = namedtuple('BasicSample', ['U', 'Z', 'e1', 'e2', 'X', 'Y'])
+
+# 基础模型中的真实参数：Y = β·X + α·U + φ·Z + e2
+BETA_TRUE = 1.0
+ALPHA = 1.0
+
+
+# 按 TYPE_LABELS 顺序整理处理效应查找表，可传入序列或 {标签: β} 字典
+def hte_type_table(betas):
+    if isinstance(betas, dict):
+        betas = [betas[label] for label in TYPE_LABELS]
+    table = np.asarray(betas, dtype=float)
+    if table.shape != (len(TYPE_LABELS),):
+        raise ValueError(f"expected {len(TYPE_LABELS)} treatment effects, got shape {table.shape}")
+    return table
+
+
+# 与 RandomState.choice(k, p=props) 相同的累积分布（含归一化），用于逐元素比较抽取类型
+def _type_cdf(props):
+    p = np.asarray(props, dtype=float)
+    if p.shape != (len(TYPE_LABELS),) or np.any(p < 0):
+        raise ValueError("props must be 4 non-negative type proportions")
+    if abs(p.sum() - 1.0) > np.sqrt(np.finfo(float).eps):
+        raise ValueError("type proportions do not sum to 1")
+    cdf = p.cumsum()
+    cdf /= cdf[-1]
+    return cdf
+
+
+# ======================== 异质性处理效应数据生成 ========================
+# 由两个 uniform（u_z 决定 Z，u_type 决定类型）与结构误差 U 构造样本
+def hte_from_draws(props, betas, u_z, u_type, U):
+    cdf = _type_cdf(props)
+    beta_table = hte_type_table(betas)
+    Z = (u_z > 0.5).view(np.int8)
+    types = (u_type >= cdf[0]).view(np.int8)
+    for c in cdf[1:-1]:
+        types += (u_type >= c).view(np.int8)
+    D = TREATMENT_TABLE.ravel().take(2 * types + Z)
+    beta_i = beta_table.take(types)
+    Y = beta_i * D
+    Y += U
+    return HTESample(Z, types, D, U, beta_i, Y)
+
+
+# 随机数消耗与原脚本完全一致：binomial(1, 0.5) 与 choice(p=...) 在旧版 RandomState 中
+# 各自恰好消耗一个 uniform，因此一次抽取 2n 个 uniform 后用阈值比较即可逐元素复现，
+# 之后的 normal 也保持同一状态。相同 seed 下 Z、类型、D、U、β、Y 与循环版本逐位相同。
+# shape 可为 n 或 (R, n)，后者用于蒙特卡洛批量抽样。
+def draw_hte(rng, props, betas, shape):
+    shape = (shape,) if np.isscalar(shape) else tuple(shape)
+    _type_cdf(props)
+    u = rng.random_sample((2,) + shape)
+    U = rng.normal(0, 1, shape)
+    return hte_from_draws(props, betas, u[0], u[1], U)
+
+
+def simulate_hte(props, betas, n, seed=42):
+    return draw_hte(np.random.RandomState(seed), props, betas, n)
+
+
+# ======================== 基础模型数据生成 ========================
+# X = γ·Z + δ·U + e1,  Y = β·X + α·U + φ·Z + e2
+def basic_from_shocks(gamma, delta, phi, U, Z, e1, e2):
+    X = gamma * Z + delta * U + e1
+    Y = BETA_TRUE * X + ALPHA * U + phi * Z + e2
+    return BasicSample(U, Z, e1, e2, X, Y)
+
+
+# 抽样顺序与原脚本一致（U, Z, e1, e2）
+def draw_basic(rng, gamma, delta, phi, shape):
+    U = rng.normal(0, 1, shape)
+    Z = rng.normal(0, 1, shape)
+    e1 = rng.normal(0, 1, shape)
+    e2 = rng.normal(0, 1, shape)
+    return basic_from_shocks(gamma, delta, phi, U, Z, e1, e2)
+
+
+def simulate_basic(gamma, delta, phi, n, seed=42):
+    return draw_basic(np.random.RandomState(seed), gamma, delta, phi, n)
+
+
+# ======================== 基于 Generator 的分块抽样 ========================
+# 随机流由 (seed, key) 确定（见 rng.py），正态数用 ziggurat 抽样。按行交错抽取：
+# 形状为 (m, ...) 的块恰是 (m', ...)（m' > m）块的前 m 行，分块与批量结果可互相复现。
+# 旧版 simulate_* 仍保留，用于与原脚本逐位对照。
+def basic_shocks(seed, key, shape):
+    shape = (shape,) if np.isscalar(shape) else tuple(shape)
+    return generator(seed, *key).standard_normal(shape + (4,))
+
+
+def basic_block(gamma, delta, phi, seed, key, shape):
+    with stage('rng'):
+        shocks = basic_shocks(seed, key, shape)
+    with stage('dgp'):
+        return basic_from_shocks(gamma, delta, phi, *np.moveaxis(shocks, -1, 0))
+
+
+# uniform 与正态误差来自同一 key 下的两个子流，保证两者都满足前缀一致
+def hte_block(props, betas, seed, key, shape):
+    shape = (shape,) if np.isscalar(shape) else tuple(shape)
+    _type_cdf(props)
+    with stage('rng'):
+        u = generator(seed, *key, 0).random(shape + (2,))
+        U = generator(seed, *key, 1).standard_normal(shape)
+    with stage('dgp'):
+        return hte_from_draws(props, betas, u[..., 0], u[..., 1], U)
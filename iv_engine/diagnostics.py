@@ -0,0 +1,145 @@
+import math
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+
+from .critical_values import effective_f_critical, stock_yogo
+from .estimators import CONST, first_stage_f, tsls
+from .linear_iv import GRAM_ROWS, _blocks, _rows, design_factor, iv_from_factor
+
+# ======================== 弱工具变量诊断 ========================
+# 所有统计量都由同一组交叉乘积（一般情形为 linear_iv 中数据矩阵 D 的上三角因子 F，单工具变量情形为 4×4 的 G）
+# 给出；异方差稳健的部分（Kleibergen–Paap、有效 F、Hansen J）另需一次按块遍历数据累加“肉”矩阵。
+#   first_stage_f   各内生变量第一阶段中排除工具变量的偏 F（同方差）
+#   cragg_donald    Cragg–Donald 最小特征值 F 统计量（同方差），kx = 1 时等于第一阶段 F，与 Stock–Yogo 临界值比较
+#   kleibergen_paap Kleibergen–Paap rk Wald F（异方差稳健），kx = 1 时即第一阶段排除工具变量的稳健 Wald 统计量 / lz
+#   effective_f     Montiel Olea–Pflueger 有效 F = π̂ᵀ(Z̃ᵀZ̃)π̂ / tr(V̂π·Z̃ᵀZ̃)，只对 kx = 1 有定义；
+#                   k_eff 为其有效自由度（τ = 10%），同方差时有效 F 等于第一阶段 F、k_eff 等于 lz
+#   sargan / hansen 过度识别检验（lz > kx 时）：Sargan = n·R²（2SLS 残差对全部工具变量回归），Hansen J 为其稳健版本
+# 稳健方差使用 HC1 自由度调整 n/(n-l)，使同方差数据下的稳健统计量与同方差统计量可比。
+WeakIVCritical = namedtuple('WeakIVCritical', ['effective_f', 'stock_yogo_size', 'stock_yogo_bias'])
+OverIdTest = namedtuple('OverIdTest', ['statistic', 'df', 'p_value'])
+WeakIVDiagnostics = namedtuple('WeakIVDiagnostics', [
+    'n', 'lz', 'kx', 'first_stage_f', 'cragg_donald', 'kleibergen_paap', 'effective_f', 'k_eff', 'critical',
+    'sargan', 'hansen',
+])
+
+# 有效 F 的临界值与有效自由度所用的最大相对偏差 τ
+EFFECTIVE_F_TAU = 0.10
+
+
+# χ² 分布的上尾概率（整数自由度，闭式级数，不依赖 scipy）
+def chi2_sf(x, df):
+    if df <= 0 or not np.isfinite(x):
+        return np.nan
+    if x <= 0:
+        return 1.0
+    if df % 2 == 0:
+        term = total = math.exp(-x / 2)
+        for j in range(1, df // 2):
+            term *= x / (2 * j)
+            total += term
+        return min(total, 1.0)
+    r = math.sqrt(x)
+    total = 2.0 * (1.0 - NormalDist().cdf(r))
+    term = 2.0 * math.exp(-x / 2) / math.sqrt(2 * math.pi) * r
+    for j in range(1, (df + 1) // 2):
+        total += term
+        term *= x / (2 * j + 1)
+    return min(total, 1.0)
+
+
+def _overid(statistic, df):
+    if df <= 0:
+        return OverIdTest(np.nan, df, np.nan)
+    return OverIdTest(statistic, df, chi2_sf(statistic, df))
+
+
+# 有效自由度：S = (Z̃ᵀZ̃)^½ V̂π (Z̃ᵀZ̃)^½ 的特征值 λ，K_eff = (Σλ)²(1+2x) / (Σλ² + 2x·Σλ·max λ)，x = 1/τ
+def _k_eff(eigenvalues, tau=EFFECTIVE_F_TAU):
+    lam = np.clip(np.real(eigenvalues), 0.0, None)
+    x = 1.0 / tau
+    return lam.sum() ** 2 * (1 + 2 * x) / ((lam * lam).sum() + 2 * x * lam.sum() * lam.max())
+
+
+def _critical(lz, kx, k_eff):
+    return WeakIVCritical(effective_f_critical(k_eff, EFFECTIVE_F_TAU) if np.isfinite(k_eff) else np.nan,
+                          stock_yogo(lz, 'size', 0.10, kx), stock_yogo(lz, 'bias', 0.10, kx))
+
+
+# ======================== 一般情形（k 个回归元、l 个工具变量） ========================
+# rows 为数据矩阵 D（列顺序同 linear_iv：[常数, W, Z, X, Y]）按行分块的可迭代对象；rows=None 时只给出同方差统计量
+def diagnostics_from_factor(F, n, layout, rows=None):
+    const, kw, lz, kx, m = layout
+    if m != 1:
+        raise ValueError("weak-instrument diagnostics need a single dependent variable")
+    kw += const
+    l = kw + lz
+    x_cols = np.arange(l, l + kx)
+    y_col = l + kx
+    fit = iv_from_factor(F, n, layout)
+
+    # Cragg–Donald：X 中由排除工具变量解释的部分 F[kw:l, X] 相对第一阶段残差协方差的最小广义特征值
+    A = F[kw:l][:, x_cols]
+    E = F[l:][:, x_cols]
+    sigma_vv = E.T @ E / (n - l)
+    cragg_donald = np.linalg.eigvals(np.linalg.solve(sigma_vv, A.T @ A)).real.min() / lz
+
+    # Sargan：2SLS 残差 e = D·c，n·eᵀP_Q e / eᵀe，P_Q 部分即 F[:l]·c
+    c = np.zeros(F.shape[1])
+    c[y_col] = 1.0
+    c[np.concatenate([np.arange(kw), x_cols])] = -fit.tsls.coef[:, 0]
+    fc = F @ c
+    sargan = _overid(n * (fc[:l] @ fc[:l]) / (fc @ fc), lz - kx)
+
+    R = F[:l, :l]
+    gamma = np.linalg.solve(R, F[:l][:, x_cols])
+    kleibergen_paap = effective_f = k_eff = np.nan
+    hansen = _overid(np.nan, lz - kx)
+    if rows is not None:
+        S_v, S_e = np.zeros((l, l)), np.zeros((l, l))
+        for D in rows:
+            Q = D[:, :l]
+            e = D @ c
+            S_e += (Q * (e * e)[:, None]).T @ Q
+            if kx == 1:
+                v = D[:, l] - Q @ gamma[:, 0]
+                S_v += (Q * (v * v)[:, None]).T @ Q
+        # Hansen J = gᵀ S_e⁻¹ g，g = Qᵀe = Rᵀ(F[:l]·c)
+        g = R.T @ fc[:l]
+        hansen = _overid(g @ np.linalg.solve(S_e, g), lz - kx)
+        if kx == 1:
+            R_inv = np.linalg.inv(R)
+            QtQ_inv = R_inv @ R_inv.T
+            V = (QtQ_inv @ S_v @ QtQ_inv)[kw:l, kw:l] * n / (n - l)
+            ztz = np.linalg.inv(QtQ_inv[kw:l, kw:l])
+            pi = gamma[kw:l, 0]
+            kleibergen_paap = pi @ np.linalg.solve(V, pi) / lz
+            effective_f = pi @ ztz @ pi / np.trace(V @ ztz)
+            k_eff = _k_eff(np.linalg.eigvals(V @ ztz))
+    first = fit.first_stage.partial_f
+    return WeakIVDiagnostics(n, lz, kx, first[0] if kx == 1 else first, cragg_donald, kleibergen_paap, effective_f,
+                             k_eff, _critical(lz, kx, k_eff), sargan, hansen)
+
+
+def weak_iv_diagnostics(y, X, Z, W=None, add_constant=True, method='cholesky', robust=True, chunk_rows=GRAM_ROWS):
+    n, layout, F = design_factor(y, X, Z, W, add_constant, method)
+    rows = None
+    if robust:
+        _, _, blocks = _blocks(y, X, Z, W, add_constant)
+        rows = (_rows(blocks, layout.const, start, min(start + chunk_rows, n)) for start in range(0, n, chunk_rows))
+    return diagnostics_from_factor(F, n, layout, rows)
+
+
+# ======================== 单工具变量（4×4 交叉乘积 G） ========================
+# 恰好识别，无过度识别检验；Kleibergen–Paap 与有效 F 都等于第一阶段斜率的稳健 Wald 统计量 (π̂ / se_HC1)²，
+# 稳健标准误来自 inference.standard_errors 的同一次数据遍历（se=None 时只给出同方差统计量）
+def moment_diagnostics(G, se=None):
+    f = first_stage_f(G)
+    robust = np.nan
+    if se is not None and np.isfinite(se.first_stage.HC1):
+        robust = (tsls(G).pi1 / se.first_stage.HC1) ** 2
+    k_eff = 1.0 if np.isfinite(robust) else np.nan
+    return WeakIVDiagnostics(G[CONST, CONST], 1, 1, f, f, robust, robust, k_eff, _critical(1, 1, k_eff),
+                             _overid(np.nan, 0), _overid(np.nan, 0))
@@ -0,0 +1,106 @@
+import numpy as np
+from collections import namedtuple
+
+from .profiling import stage
+
+# ======================== 充分统计量 ========================
+# 单工具变量情形下 OLS / 2SLS / F 统计量只依赖于 [1, X, Y, Z] 的交叉乘积矩阵
+# G = AᵀA（4×4），一次矩阵乘法即可得到全部所需的和与平方和。
+# 所有函数都支持任意前导批量维度：X, Y, Z 形状为 (..., n) 时 G 形状为 (..., 4, 4)，
+# 标量输入返回 Python/NumPy 标量。
+CONST, X_IDX, Y_IDX, Z_IDX = 0, 1, 2, 3
+
+LinearFit = namedtuple('LinearFit', ['intercept', 'slope', 'r2'])
+TSLSFit = namedtuple('TSLSFit', ['intercept', 'slope', 'r2', 'pi0', 'pi1'])
+IVEstimates = namedtuple('IVEstimates', [
+    'n', 'ols', 'tsls', 'f_stat', 'corr_xz', 'cov_xz',
+])
+
+
+def cross_moments(X, Y, Z):
+    X = np.asarray(X, dtype=float)
+    A = np.empty(X.shape[:-1] + (4, X.shape[-1]))
+    A[..., CONST, :] = 1.0
+    A[..., X_IDX, :] = X
+    A[..., Y_IDX, :] = Y
+    A[..., Z_IDX, :] = Z
+    return A @ A.swapaxes(-1, -2)
+
+
+# 由交叉乘积矩阵得到样本量与中心化二阶矩 S_ab = Σ(a-ā)(b-b̄)
+def _centered(G, a, b):
+    n = G[..., CONST, CONST]
+    return G[..., a, b] - G[..., CONST, a] * G[..., CONST, b] / n
+
+
+def _mean(G, a):
+    return G[..., CONST, a] / G[..., CONST, CONST]
+
+
+# ======================== 估计量 ========================
+def ols(G):
+    sxx, sxy, syy = _centered(G, X_IDX, X_IDX), _centered(G, X_IDX, Y_IDX), _centered(G, Y_IDX, Y_IDX)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = sxy / sxx
+        r2 = np.where(syy > 0, sxy * sxy / (sxx * syy), 0.0)[()]
+    intercept = _mean(G, Y_IDX) - slope * _mean(G, X_IDX)
+    return LinearFit(intercept, slope, r2)
+
+
+# 2SLS 斜率即协方差比 Cov(Z, Y) / Cov(Z, X)。R² 以真实 X 计算第二阶段残差 e = Y - μ̂₀ - μ̂₁·X
+# （原脚本用拟合值 X̂ 计算，得到的是 Corr(Z, Y)² 而非 2SLS 的拟合优度），可能为负
+def tsls(G):
+    szz, szx, szy = _centered(G, Z_IDX, Z_IDX), _centered(G, Z_IDX, X_IDX), _centered(G, Z_IDX, Y_IDX)
+    sxx, sxy, syy = _centered(G, X_IDX, X_IDX), _centered(G, X_IDX, Y_IDX), _centered(G, Y_IDX, Y_IDX)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = szy / szx
+        pi1 = szx / szz
+        rss = syy - 2.0 * slope * sxy + slope * slope * sxx
+        r2 = np.where(syy > 0, 1.0 - rss / syy, 0.0)[()]
+    x_bar = _mean(G, X_IDX)
+    intercept = _mean(G, Y_IDX) - slope * x_bar
+    pi0 = x_bar - pi1 * _mean(G, Z_IDX)
+    return TSLSFit(intercept, slope, r2, pi0, pi1)
+
+
+# 第一阶段 F 统计量（单工具变量）：(解释平方和 / 1) / (残差平方和 / (n - 2))
+def first_stage_f(G):
+    n = G[..., CONST, CONST]
+    szz, szx, sxx = _centered(G, Z_IDX, Z_IDX), _centered(G, Z_IDX, X_IDX), _centered(G, X_IDX, X_IDX)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        msr = szx * szx / szz
+        mse = (sxx - msr) / (n - 2)
+        return np.where(mse > 1e-10, msr / mse, np.inf)[()]
+
+
+def cov_xz(G):
+    return _centered(G, X_IDX, Z_IDX) / (G[..., CONST, CONST] - 1)
+
+
+def corr_xz(G):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _centered(G, X_IDX, Z_IDX) / np.sqrt(_centered(G, X_IDX, X_IDX) * _centered(G, Z_IDX, Z_IDX))
+
+
+# 二值工具变量的 Wald 比率 (E[Y|Z=1] - E[Y|Z=0]) / (E[D|Z=1] - E[D|Z=0])；
+# 分子分母分别是 Y、D 对 Z 的回归斜率，分母过小时返回 0（与原脚本一致）
+def wald_ratio(G):
+    szz = _centered(G, Z_IDX, Z_IDX)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        num = _centered(G, Z_IDX, Y_IDX) / szz
+        den = _centered(G, Z_IDX, X_IDX) / szz
+        return np.where(np.abs(den) > 1e-6, num / den, 0.0)[()]
+
+
+def estimates_from_moments(G):
+    with stage('ols'):
+        o = ols(G)
+    with stage('tsls'):
+        t = tsls(G)
+    with stage('first_stage_f'):
+        f = first_stage_f(G)
+    return IVEstimates(G[..., CONST, CONST][()], o, t, f, corr_xz(G), cov_xz(G))
+
+
+def estimate(X, Y, Z):
+    return estimates_from_moments(cross_moments(X, Y, Z))
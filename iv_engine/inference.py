@@ -0,0 +1,183 @@
+import os
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+
+from .estimators import CONST, X_IDX, Y_IDX, Z_IDX, _centered, _mean, cross_moments, ols, tsls
+from .rng import BOOTSTRAP_STREAM, generator
+from .workers import process_pool
+
+# ======================== 标准误 ========================
+# 单工具变量模型（含常数项）中斜率的标准误。由 FWL 定理，斜率的夹心方差只依赖于去均值后的
+# 回归元（OLS 为 ẍ = x - x̄，2SLS 为 z̈ = z - z̄）与残差 e：
+#   OLS:  Var(β̂) = Σ ẍᵢ² ωᵢ / Sxx²，        2SLS: Var(β̂) = Σ z̈ᵢ² ωᵢ / Szx²
+# 其中 HC0: ωᵢ = eᵢ²，HC1: 再乘 n/(n-2)，HC2: eᵢ²/(1-hᵢ)，HC3: eᵢ²/(1-hᵢ)²。
+# 杠杆值 hᵢ = 1/n + ẍᵢ²/Sxx（2SLS 用第二阶段回归元 X̂ 的杠杆值，与 [1, Z] 的相同：1/n + z̈ᵢ²/Szz）。
+# 2SLS 残差用真实 X 计算。第一阶段（X 对 Z 回归）斜率 π̂ 同理：Var(π̂) = Σ z̈ᵢ² vᵢ² / Szz²，v 为第一阶段残差，
+# 其稳健方差供弱工具变量诊断（有效 F）使用。同方差标准误只需交叉乘积矩阵 G；HC 类需要再遍历一次数据，可按块累加。
+SE_TYPES = ('homoskedastic', 'HC0', 'HC1', 'HC2', 'HC3')
+SlopeSE = namedtuple('SlopeSE', SE_TYPES)
+StandardErrors = namedtuple('StandardErrors', ['ols', 'tsls', 'first_stage'])
+ARConfidenceSet = namedtuple('ARConfidenceSet', ['intervals', 'level', 'critical_value'])
+BootstrapResult = namedtuple('BootstrapResult', ['beta_ols', 'beta_2sls'])
+
+# 每个随机块约 2^22 个重抽样元素（块内重复数 × n），块编号决定随机流，与进程数无关
+BOOT_BLOCK_ELEMENTS = 2 ** 22
+BOOTSTRAP_METHODS = ('pairs', 'wild')
+
+
+def _fit_info(G):
+    n = G[CONST, CONST]
+    o, t = ols(G), tsls(G)
+    return (n, _mean(G, X_IDX), _mean(G, Z_IDX), o.intercept, o.slope, t.intercept, t.slope,
+            _centered(G, X_IDX, X_IDX), _centered(G, Z_IDX, Z_IDX), _centered(G, Z_IDX, X_IDX), t.pi0, t.pi1)
+
+
+# 一块数据对夹心“肉”的贡献：依次为 OLS、2SLS、第一阶段的 HC0/HC2/HC3
+def sandwich_sums(X, Y, Z, G):
+    n, x_bar, z_bar, a_o, b_o, a_t, b_t, sxx, szz, _, pi0, pi1 = _fit_info(G)
+    xd, zd = X - x_bar, Z - z_bar
+    e_o = Y - a_o - b_o * X
+    e_t = Y - a_t - b_t * X
+    v = X - pi0 - pi1 * Z
+    out = np.empty(9)
+    for i, (d, e, s) in enumerate([(xd, e_o, sxx), (zd, e_t, szz), (zd, v, szz)]):
+        w = d * d * e * e
+        one_minus_h = 1.0 - 1.0 / n - d * d / s
+        out[3 * i:3 * i + 3] = w.sum(), (w / one_minus_h).sum(), (w / (one_minus_h * one_minus_h)).sum()
+    return out
+
+
+# chunks 为 (X, Y, Z) 块的可迭代对象（须与 G 对应同一组数据）；chunks=None 时只给出同方差标准误
+def standard_errors(G, chunks=None):
+    n, _, _, a_o, b_o, a_t, b_t, sxx, szz, szx, _, pi1 = _fit_info(G)
+    syy, sxy = _centered(G, Y_IDX, Y_IDX), _centered(G, X_IDX, Y_IDX)
+    rss_o = syy - 2.0 * b_o * sxy + b_o * b_o * sxx
+    rss_t = syy - 2.0 * b_t * sxy + b_t * b_t * sxx
+    rss_f = sxx - pi1 * szx
+    homo = [np.sqrt(rss_o / (n - 2) / sxx), np.sqrt(rss_t / (n - 2) * szz / (szx * szx)), np.sqrt(rss_f / (n - 2) / szz)]
+    if chunks is None:
+        return StandardErrors(*(SlopeSE(h, *[np.nan] * 4) for h in homo))
+    sums = sum((sandwich_sums(X, Y, Z, G) for X, Y, Z in chunks), np.zeros(9))
+    dof = n / (n - 2)
+    ses = []
+    for h, hc, s in zip(homo, sums.reshape(3, 3), [sxx * sxx, szx * szx, szz * szz]):
+        hc = hc / s
+        ses.append(SlopeSE(h, *np.sqrt([hc[0], hc[0] * dof, hc[1], hc[2]])))
+    return StandardErrors(*ses)
+
+
+def normal_ci(estimate, se, level=0.95):
+    z = NormalDist().inv_cdf(0.5 + level / 2)
+    return estimate - z * se, estimate + z * se
+
+
+# ======================== Anderson–Rubin 置信集 ========================
+# H0: β = β0 的 AR 检验即 (Y - β0·X) 对 Z 回归中 Z 系数的检验，统计量
+#   AR(β0) = (n-2)·S_zỹ² / (Szz·S_ỹỹ - S_zỹ²)，ỹ = Y - β0·X，
+# 在弱工具变量下仍有正确的检验水平。{β0 : AR(β0) ≤ c} 化为二次不等式 a·β0² + b·β0 + d ≤ 0，
+# 因此置信集可能是有界区间、两条射线之并或整条实数轴（工具变量弱时），直接由 G 求出。
+# 临界值用 χ²(1) 分位数。intervals 为 (下界, 上界) 列表，可含 ±inf。
+def _ar_moments(G):
+    return (G[CONST, CONST], _centered(G, Z_IDX, Z_IDX), _centered(G, Z_IDX, X_IDX), _centered(G, Z_IDX, Y_IDX),
+            _centered(G, X_IDX, X_IDX), _centered(G, X_IDX, Y_IDX), _centered(G, Y_IDX, Y_IDX))
+
+
+def ar_statistic(G, beta0):
+    n, szz, szx, szy, sxx, sxy, syy = _ar_moments(G)
+    s_zy = szy - beta0 * szx
+    s_yy = syy - 2.0 * beta0 * sxy + beta0 * beta0 * sxx
+    return (n - 2) * s_zy * s_zy / (szz * s_yy - s_zy * s_zy)
+
+
+def anderson_rubin(G, level=0.95):
+    n, szz, szx, szy, sxx, sxy, syy = _ar_moments(G)
+    crit = NormalDist().inv_cdf(0.5 + level / 2) ** 2
+    k = crit / (n - 2)
+    a = (1 + k) * szx * szx - k * szz * sxx
+    b = -2.0 * (1 + k) * szy * szx + 2.0 * k * szz * sxy
+    d = (1 + k) * szy * szy - k * szz * syy
+    disc = b * b - 4.0 * a * d
+    if disc < 0:
+        intervals = [] if a > 0 else [(-np.inf, np.inf)]
+    else:
+        r1, r2 = sorted([(-b - np.sqrt(disc)) / (2.0 * a), (-b + np.sqrt(disc)) / (2.0 * a)])
+        intervals = [(r1, r2)] if a > 0 else [(-np.inf, r1), (r2, np.inf)]
+    return ARConfidenceSet(intervals, level, crit)
+
+
+# ======================== 自助法 ========================
+# 配对自助法：每块生成 (B_块, n) 的下标矩阵，按行计数得到权重矩阵 W，
+# 再以一次矩阵乘法 W @ P 得到所有重复的交叉乘积（P 为 [1, x, y, z] 两两乘积的 n×10 矩阵）。
+# 野自助法（Rademacher 权重 v）：Y* = Ŷ + e·v，X、Z 固定，斜率的变化是 v 的线性函数：
+#   β*_OLS - β̂ = Σ ẍ e_OLS v / Sxx，β*_2SLS - β̂ = Σ z̈ e_2SLS v / Szx，
+# 同样一次矩阵乘法 V @ [ẍ e, z̈ e] 得到整块结果。
+# 野自助法保持 X 固定，不能反映弱工具变量下 2SLS 的非正态性；配对自助法可以，AR 置信集则不依赖于工具变量强度。
+_PAIRS = [(0, 0), (0, 1), (0, 2), (0, 3), (1, 1), (1, 2), (1, 3), (2, 2), (2, 3), (3, 3)]
+
+
+def boot_block_size(n):
+    return max(1, min(1024, BOOT_BLOCK_ELEMENTS // max(n, 1)))
+
+
+def _products(X, Y, Z):
+    cols = [np.ones_like(X), X, Y, Z]
+    return np.stack([cols[i] * cols[j] for i, j in _PAIRS], axis=1)
+
+
+def _boot_blocks(method, data, reps, seed, blocks):
+    n = data.shape[0]
+    B = boot_block_size(n)
+    results = []
+    for blk in blocks:
+        size = min(B, reps - blk * B)
+        rng = generator(seed, BOOTSTRAP_STREAM, blk)
+        if method == 'pairs':
+            idx = rng.integers(0, n, (size, n))
+            idx += (np.arange(size) * n)[:, None]
+            W = np.bincount(idx.ravel(), minlength=size * n).reshape(size, n)
+            S = W @ data
+            G = np.empty((size, 4, 4))
+            for col, (i, j) in enumerate(_PAIRS):
+                G[:, i, j] = G[:, j, i] = S[:, col]
+            results.append((blk, np.stack([ols(G).slope, tsls(G).slope])))
+        else:
+            # 每个随机字节给出 8 个 Rademacher 权重
+            bits = np.unpackbits(np.frombuffer(rng.bytes(-(-size * n // 8)), dtype=np.uint8), count=size * n)
+            V = bits.reshape(size, n) * 2.0 - 1.0
+            results.append((blk, (V @ data).T))
+    return results
+
+
+def bootstrap(X, Y, Z, reps, method='pairs', seed=42, workers=1):
+    if method not in BOOTSTRAP_METHODS:
+        raise ValueError(f"unknown bootstrap method {method!r}, expected one of {BOOTSTRAP_METHODS}")
+    X, Y, Z = (np.asarray(v, dtype=float) for v in (X, Y, Z))
+    n = X.shape[0]
+    if method == 'pairs':
+        data = _products(X, Y, Z)
+    else:
+        _, x_bar, z_bar, a_o, b_o, a_t, b_t, sxx, _, szx, _, _ = _fit_info(cross_moments(X, Y, Z))
+        data = np.stack([(X - x_bar) * (Y - a_o - b_o * X) / sxx, (Z - z_bar) * (Y - a_t - b_t * X) / szx], axis=1)
+    B = boot_block_size(n)
+    blocks = list(range(-(-reps // B)))
+    workers = min(workers or os.cpu_count() or 1, len(blocks))
+    if workers <= 1:
+        parts = _boot_blocks(method, data, reps, seed, blocks)
+    else:
+        with process_pool(workers) as pool:
+            futures = [pool.submit(_boot_blocks, method, data, reps, seed, blocks[w::workers]) for w in range(workers)]
+            parts = [item for fut in futures for item in fut.result()]
+    out = np.empty((2, reps))
+    for blk, values in parts:
+        out[:, blk * B:blk * B + values.shape[1]] = values
+    if method == 'wild':
+        out += np.array([[b_o], [b_t]])
+    return BootstrapResult(*out)
+
+
+def percentile_ci(draws, level=0.95):
+    x = np.asarray(draws, dtype=float)
+    x = x[np.isfinite(x)]
+    return tuple(np.percentile(x, [50 * (1 - level), 50 * (1 + level)]))
@@ -0,0 +1,114 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from .diagnostics import diagnostics_from_factor
+from .linear_iv import IVLayout, iv_from_factor, moments_factor
+
+# ======================== 真实数据：按列分块读取 ========================
+# 只读取所选列，按块把 D = [常数, W, Z, X, Y] 的交叉乘积 DᵀD 累加起来（与 linear_iv.design_moments 相同），
+# 完整的设计矩阵从不出现在内存中，峰值内存只与块大小有关。
+#   Parquet：pyarrow 以内存映射打开，按行组分批读取所选列（需要 pyarrow）；
+#   CSV：pandas.read_csv 的 chunksize 迭代器，只解析所选列。
+# source 可以是路径或文件对象（如 Streamlit 上传的文件）。含缺失值或非有限值的行整行删除并计数。
+# pandas / pyarrow 只在读取时导入，引擎本身仍只依赖 NumPy。
+DATA_FORMATS = ('csv', 'parquet')
+INGEST_ROWS = 2 ** 20
+
+FileIVResult = namedtuple('FileIVResult', ['fit', 'diagnostics', 'columns', 'rows_read', 'rows_dropped'])
+
+
+def infer_data_format(name):
+    ext = os.path.splitext(str(name))[1].lower().lstrip('.')
+    if ext in ('parquet', 'pq'):
+        return 'parquet'
+    if ext in ('csv', 'txt', 'gz'):
+        return 'csv'
+    raise ValueError(f"cannot infer data format from {name!r}; use one of {DATA_FORMATS}")
+
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+
+def _parquet(source):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("reading Parquet requires pyarrow (pip install pyarrow)") from None
+    return pq.ParquetFile(_rewind(source), memory_map=isinstance(source, (str, os.PathLike)))
+
+
+def data_columns(source, fmt=None):
+    fmt = fmt or infer_data_format(getattr(source, 'name', source))
+    if fmt == 'parquet':
+        return list(_parquet(source).schema_arrow.names)
+    if fmt == 'csv':
+        import pandas as pd
+        return list(pd.read_csv(_rewind(source), nrows=0).columns)
+    raise ValueError(f"unknown data format {fmt!r}; use one of {DATA_FORMATS}")
+
+
+# 总行数：Parquet 由元数据直接给出，CSV 需要完整扫描一遍，返回 None
+def data_rows(source, fmt=None):
+    fmt = fmt or infer_data_format(getattr(source, 'name', source))
+    return _parquet(source).metadata.num_rows if fmt == 'parquet' else None
+
+
+# 按块给出所选列的 float 矩阵（列顺序同 columns）
+def iter_column_chunks(source, columns, fmt=None, chunk_rows=INGEST_ROWS):
+    fmt = fmt or infer_data_format(getattr(source, 'name', source))
+    if fmt == 'parquet':
+        for batch in _parquet(source).iter_batches(batch_size=chunk_rows, columns=list(columns)):
+            yield np.column_stack([batch.column(c).to_numpy(zero_copy_only=False).astype(float) for c in columns])
+    elif fmt == 'csv':
+        import pandas as pd
+        for frame in pd.read_csv(_rewind(source), usecols=list(columns), chunksize=chunk_rows):
+            try:
+                yield frame[list(columns)].to_numpy(dtype=float)
+            except ValueError as exc:
+                raise ValueError(f"selected columns must be numeric: {exc}") from None
+    else:
+        raise ValueError(f"unknown data format {fmt!r}; use one of {DATA_FORMATS}")
+
+
+def _check_columns(y, X, Z, W):
+    X, Z, W = list(X), list(Z), list(W or [])
+    if not X or not Z:
+        raise ValueError("select at least one endogenous regressor X and one instrument Z")
+    columns = [*W, *Z, *X, y]
+    if len(set(columns)) != len(columns):
+        raise ValueError("Y, X, Z and W columns must all be different")
+    if len(Z) < len(X):
+        raise ValueError(f"model is underidentified: {len(Z)} excluded instruments for {len(X)} endogenous regressors")
+    return columns, IVLayout(1, len(W), len(Z), len(X), 1)
+
+
+# 删除含缺失值的行，在左侧补常数列，得到按 [常数, W, Z, X, Y] 排列的一块 D
+def _design_chunks(chunks, counts):
+    for A in chunks:
+        keep = np.isfinite(A).all(axis=1)
+        counts[0] += A.shape[0]
+        counts[1] += A.shape[0] - int(keep.sum())
+        A = A[keep]
+        yield np.hstack([np.ones((A.shape[0], 1)), A])
+
+
+# callback(rows_read) 在每块累加后调用；robust=True 时再读一遍数据计算异方差稳健的诊断统计量
+def file_iv(source, y, X, Z, W=None, fmt=None, chunk_rows=INGEST_ROWS, robust=False, callback=None):
+    columns, layout = _check_columns(y, X, Z, W)
+    counts = [0, 0]
+    M = np.zeros((len(columns) + 1, len(columns) + 1))
+    for D in _design_chunks(iter_column_chunks(source, columns, fmt, chunk_rows), counts):
+        M += D.T @ D
+        if callback is not None:
+            callback(counts[0])
+    n = counts[0] - counts[1]
+    if n <= M.shape[0]:
+        raise ValueError(f"not enough complete rows ({n}) for {M.shape[0] - 1} columns")
+    F = moments_factor(M)
+    rows = _design_chunks(iter_column_chunks(source, columns, fmt, chunk_rows), [0, 0]) if robust else None
+    return FileIVResult(iv_from_factor(F, n, layout), diagnostics_from_factor(F, n, layout, rows), columns, counts[0], counts[1])
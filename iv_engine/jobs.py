@@ -0,0 +1,328 @@
+import atexit
+import itertools
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import CancelledError
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .cache import default_cache
+from .estimators import estimates_from_moments
+from .montecarlo import monte_carlo_basic, monte_carlo_hte
+from .sweep import GAMMA_GRID, parameter_sweep
+from .scenarios import (
+    _bootstrap, _inference, _run, _stream_for, basic_key, bootstrap_key, compare_key, compare_scenarios, hte_key, inference_key,
+    mc_basic_key, mc_hte_key, sweep_key,
+)
+from .store import open_store
+from .streaming import ProgressiveStream
+from .workers import process_pool
+
+# ======================== 后台任务队列 ========================
+# Streamlit 每次交互都同步重跑整个脚本，大 n、蒙特卡洛等耗时计算会占住会话线程。
+# JobQueue 把这些计算提交到常驻的工作进程池，脚本只需提交任务、读取进度并立即返回：
+#   * 任务编号：submit 返回 Job，之后可凭 job.id 在任何一次重跑中查询（已完成的任务保留最近 JOB_HISTORY 个）；
+#   * 去重：任务键与 scenarios 中的缓存键相同，相同参数的在途任务（跨会话）只计算一次，各会话登记为订阅者；
+#     结果写回 ResultCache，之后同步的 run_* 调用直接命中；已在缓存中的请求不提交，直接返回已完成的任务；
+#   * 取消：cancel(job_id, owner) 注销订阅者，没有订阅者时尚未开始的任务直接撤销，
+#     运行中的任务在下一个检查点（每个数据块 / 重复块之后）停止；
+#   * 进度与中间结果：每个任务一块共享内存（与 sweep.py 相同的 SharedMemory 方式），工作进程在检查点写入
+#     完成比例、已处理的观测数与当前交叉乘积 G，主进程读取 G 即可给出中间估计。
+# 进程池由 workers.process_pool 创建，启动方式固定为 POOL_START_METHOD，工作进程不会重新执行应用脚本。
+JOB_KINDS = ('basic', 'hte', 'mc_basic', 'mc_hte', 'inference', 'bootstrap', 'sweep', 'compare')
+JOB_STATES = ('queued', 'running', 'done', 'cancelled', 'failed')
+JOB_HISTORY = 256
+JOB_POLL_SECONDS = 0.5
+
+JobProgress = namedtuple('JobProgress', ['status', 'fraction', 'n_done', 'partial'])
+JobQueueStats = namedtuple('JobQueueStats', ['submitted', 'deduplicated', 'cache_hits', 'cancelled', 'failed',
+                                             'queued', 'running', 'workers'])
+
+# 共享内存布局：[取消标志, 完成比例, 已处理观测数, G (16)]
+_CANCEL, _FRACTION, _N_DONE, _G = 0, 1, 2, 3
+_SLOTS = _G + 16
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# ======================== 工作进程一侧 ========================
+class _Reporter:
+    def __init__(self, buf):
+        self.buf = buf
+
+    def __call__(self, fraction, n_done=np.nan, G=None):
+        if self.buf[_CANCEL]:
+            raise JobCancelled
+        self.buf[_FRACTION] = fraction
+        self.buf[_N_DONE] = n_done
+        if G is not None:
+            self.buf[_G:] = np.ravel(G)
+
+
+def _moments_report(report, n):
+    return lambda n_done, G: report(n_done / n, n_done, G)
+
+
+def _job_basic(report, gamma, delta, phi, n, seed):
+    return _run(ProgressiveStream.basic(gamma, delta, phi, seed), n, _moments_report(report, n))
+
+
+def _job_hte(report, props, betas, n, seed):
+    return _run(ProgressiveStream.hte(props, betas, seed), n, _moments_report(report, n))
+
+
+def _job_mc_basic(report, gamma, delta, phi, n, reps, seed):
+    return monte_carlo_basic(gamma, delta, phi, n, reps, seed, callback=lambda done: report(done / reps, done))
+
+
+def _job_mc_hte(report, props, betas, n, reps, seed):
+    return monte_carlo_hte(props, betas, n, reps, seed, callback=lambda done: report(done / reps, done))
+
+
+# 第一遍（交叉乘积）报告进度，第二遍（稳健标准误）复用同一渐进式样本的块
+def _job_inference(report, model, params, n, seed):
+    stream = _stream_for(model, params, seed, None)
+    stream.moments(n, lambda n_done, G: report(0.5 * n_done / n, n_done, G))
+    return _inference(stream, n)
+
+
+# 自助法的重复在工作进程内再分给全部 CPU（inference.bootstrap 的进程池）；只能在结束时报告进度
+def _job_bootstrap(report, model, params, n, reps, method, seed):
+    return _bootstrap(_stream_for(model, params, seed, None), n, reps, method, seed, None)
+
+
+# 参数扫描同样在工作进程内再分给全部 CPU，每完成若干个 γ 切片报告一次完成比例
+def _job_sweep(report, n, reps, seed):
+    return parameter_sweep(n, reps, seed, callback=lambda done: report(done / len(GAMMA_GRID)))
+
+
+# 多场景比较：各场景在工作进程内的线程池中计算，结果库中的场景直接查表；每完成一个场景报告一次完成比例
+def _job_compare(report, specs, n, seed, store_path=None):
+    return compare_scenarios(specs, n, seed, store=open_store(store_path) if store_path else None,
+                             callback=lambda done: report(done / len(specs)))
+
+
+_JOBS = {
+    'basic': (basic_key, _job_basic),
+    'hte': (hte_key, _job_hte),
+    'mc_basic': (mc_basic_key, _job_mc_basic),
+    'mc_hte': (mc_hte_key, _job_mc_hte),
+    'inference': (inference_key, _job_inference),
+    'bootstrap': (bootstrap_key, _job_bootstrap),
+    'sweep': (sweep_key, _job_sweep),
+    'compare': (compare_key, _job_compare),
+}
+
+
+def _execute(kind, args, shm_name):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    reporter = _Reporter(np.ndarray((_SLOTS,), dtype=np.float64, buffer=shm.buf))
+    try:
+        return _JOBS[kind][1](reporter, *args)
+    finally:
+        reporter.buf = None
+        shm.close()
+
+
+# ======================== 主进程一侧 ========================
+class Job:
+    def __init__(self, job_id, kind, key, args):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.args = args
+        self.owners = set()
+        self.future = None
+        self._status = 'queued'
+        self._result = None
+        self._error = None
+        self._shm = None
+        self._buf = None
+        self._final = np.full(_SLOTS, np.nan)
+        self._lock = threading.Lock()
+
+    @property
+    def status(self):
+        with self._lock:
+            if self._status == 'queued' and self.future is not None and self.future.running():
+                return 'running'
+            return self._status
+
+    def done(self):
+        return self.status in ('done', 'cancelled', 'failed')
+
+    # 中间结果：basic / hte / inference 任务为当前交叉乘积给出的估计量（IVEstimates），其余为 None
+    def progress(self):
+        with self._lock:
+            values = self._buf.copy() if self._buf is not None else self._final.copy()
+        status = self.status
+        fraction = 1.0 if status == 'done' else float(np.nan_to_num(values[_FRACTION]))
+        G = values[_G:].reshape(4, 4)
+        partial = estimates_from_moments(G) if status != 'done' and G[0, 0] > 0 else None
+        n_done = None if np.isnan(values[_N_DONE]) else int(values[_N_DONE])
+        return JobProgress(status, fraction, n_done, partial)
+
+    def result(self, timeout=None):
+        if self.future is not None and not self.done():
+            try:
+                self.future.result(timeout)
+            except (CancelledError, JobCancelled):
+                pass
+        with self._lock:
+            if self._status == 'done':
+                return self._result
+            if self._status == 'failed':
+                raise self._error
+        raise CancelledError(f"job {self.id} was cancelled")
+
+    def _attach_buffer(self):
+        self._shm = shared_memory.SharedMemory(create=True, size=_SLOTS * 8)
+        self._buf = np.ndarray((_SLOTS,), dtype=np.float64, buffer=self._shm.buf)
+        self._buf[:] = np.nan
+        self._buf[_CANCEL] = 0.0
+        return self._shm.name
+
+    def _request_cancel(self):
+        with self._lock:
+            if self._buf is not None:
+                self._buf[_CANCEL] = 1.0
+
+    def _finish(self, status, result=None, error=None):
+        with self._lock:
+            self._status, self._result, self._error = status, result, error
+            if self._buf is not None:
+                self._final = self._buf.copy()
+                self._buf = None
+                self._shm.close()
+                self._shm.unlink()
+                self._shm = None
+
+
+class JobQueue:
+    def __init__(self, max_workers=None, cache=default_cache, start_method=None):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) - 1)
+        self.cache = cache
+        self.start_method = start_method
+        self._pool = None
+        self._inflight = {}
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduplicated = 0
+        self.cache_hits = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = process_pool(self.max_workers, self.start_method)
+        return self._pool
+
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > JOB_HISTORY:
+            old_id, old = next(iter(self._jobs.items()))
+            if not old.done():
+                break
+            del self._jobs[old_id]
+
+    # 参数与对应的 run_* 相同（不含 cache / stream / callback）；owner 通常为会话编号
+    def submit(self, kind, *args, owner=None):
+        if kind not in _JOBS:
+            raise ValueError(f"unknown job kind {kind!r}, expected one of {JOB_KINDS}")
+        key = _JOBS[kind][0](*args)
+        with self._lock:
+            job = self._inflight.get(key)
+            if job is not None:
+                job.owners.add(owner)
+                self.deduplicated += 1
+                return job
+            job = Job(f'{kind}-{next(self._ids)}', kind, key, args)
+            job.owners.add(owner)
+            missing = object()
+            cached = self.cache.get(key, missing)
+            if cached is not missing:
+                job._finish('done', cached)
+                self.cache_hits += 1
+                self._remember(job)
+                return job
+            shm_name = job._attach_buffer()
+            self._inflight[key] = job
+            self._remember(job)
+            self.submitted += 1
+            job.future = self._executor().submit(_execute, kind, args, shm_name)
+        job.future.add_done_callback(lambda fut, job=job: self._completed(job, fut))
+        return job
+
+    def _completed(self, job, fut):
+        with self._lock:
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+        if fut.cancelled():
+            status, result, error = 'cancelled', None, None
+        else:
+            error = fut.exception()
+            if error is None:
+                status, result = 'done', self.cache.put(job.key, fut.result())
+            elif isinstance(error, JobCancelled):
+                status, result, error = 'cancelled', None, None
+            else:
+                status, result = 'failed', None
+        with self._lock:
+            if status == 'cancelled':
+                self.cancelled += 1
+            elif status == 'failed':
+                self.failed += 1
+        job._finish(status, result, error)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # 注销订阅者；最后一个订阅者离开时取消任务。返回任务是否因此被取消
+    def cancel(self, job_id, owner=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done():
+                return False
+            job.owners.discard(owner)
+            if job.owners:
+                return False
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+        if not job.future.cancel():
+            job._request_cancel()
+        return True
+
+    def stats(self):
+        with self._lock:
+            states = [job.status for job in self._inflight.values()]
+            return JobQueueStats(self.submitted, self.deduplicated, self.cache_hits, self.cancelled, self.failed,
+                                 states.count('queued'), states.count('running'), self.max_workers)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            for job in self._inflight.values():
+                job._request_cancel()
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+# 进程内共享的任务队列（与 default_cache 对应），第一次使用时创建，进程退出时关闭
+def default_jobs():
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+            atexit.register(_default_queue.shutdown, False)
+        return _default_queue
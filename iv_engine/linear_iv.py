@@ -0,0 +1,162 @@
+import numpy as np
+from collections import namedtuple
+
+from .estimators import CONST, X_IDX, Y_IDX, Z_IDX
+
+# ======================== 一般线性 IV（k 个回归元、l 个工具变量） ========================
+# 模型 Y = W·γ + X·β + u：W 为外生协变量（含常数项），X 为 k_x 个内生变量，Z 为 l_z 个排除工具变量，
+# 工具变量矩阵 Q = [W, Z]（l = k_w + l_z 列），回归元 R = [W, X]（k = k_w + k_x 列）。
+# 数据列按 [常数, W, Z, X, Y] 排列（记为 D，p 列）。全部结果只依赖于 D 的上三角因子 F（FᵀF = DᵀD）：
+#   F[:l, :l] 是 Q 的 R 因子，F[:l, l:] = Q̃ᵀ[X, Y]（Q̃ 为 Q 的正交基），F[l:, l:] 是 [X, Y] 对 Q 回归的残差因子。
+# 同一个因子同时给出 OLS、第一阶段（含排除工具变量的偏 F）、第二阶段与残差平方和，无需重复 lstsq。
+# 因子可由交叉乘积矩阵的 Cholesky 分解（method='cholesky'，快）或分块 TSQR（method='qr'，数值更稳）得到。
+# Y 可有多列（形状 (n, m)），所有结果沿最后一维批量给出。
+IVLayout = namedtuple('IVLayout', ['const', 'kw', 'lz', 'kx', 'm'])
+GeneralFit = namedtuple('GeneralFit', ['coef', 'se', 'r2', 'rss', 'sigma2'])
+FirstStageFit = namedtuple('FirstStageFit', ['coef', 'r2', 'partial_f'])
+IVRegression = namedtuple('IVRegression', ['n', 'layout', 'tsls', 'ols', 'first_stage'])
+
+# 分块计算交叉乘积与 TSQR 的行数（不拼接完整的 D，内存只与块大小有关）
+GRAM_ROWS = 65536
+QR_ROWS = 1024
+IV_METHODS = ('cholesky', 'qr')
+
+
+def _as_2d(a, n):
+    if a is None:
+        return np.empty((n, 0))
+    a = np.asarray(a, dtype=float)
+    return a.reshape(n, -1) if a.ndim == 1 else a
+
+
+def _blocks(y, X, Z, W, add_constant):
+    y = np.asarray(y, dtype=float)
+    n = y.shape[0]
+    blocks = [_as_2d(W, n), _as_2d(Z, n), _as_2d(X, n), _as_2d(y, n)]
+    if any(b.shape[0] != n for b in blocks):
+        raise ValueError("y, X, Z and W must have the same number of rows")
+    const = 1 if add_constant else 0
+    layout = IVLayout(const, blocks[0].shape[1], blocks[1].shape[1], blocks[2].shape[1], blocks[3].shape[1])
+    if layout.lz < layout.kx:
+        raise ValueError(f"model is underidentified: {layout.lz} excluded instruments for {layout.kx} endogenous regressors")
+    return n, layout, blocks
+
+
+def _rows(blocks, const, start, stop):
+    parts = ([np.ones((stop - start, 1))] if const else []) + [b[start:stop] for b in blocks]
+    return np.hstack(parts)
+
+
+# D 的交叉乘积矩阵 DᵀD，按行分块累加
+def design_moments(y, X, Z, W=None, add_constant=True, chunk_rows=GRAM_ROWS):
+    n, layout, blocks = _blocks(y, X, Z, W, add_constant)
+    p = sum(layout[:4]) + layout.m
+    M = np.zeros((p, p))
+    for start in range(0, n, chunk_rows):
+        D = _rows(blocks, layout.const, start, min(start + chunk_rows, n))
+        M += D.T @ D
+    return n, layout, M
+
+
+def moments_factor(M):
+    return np.linalg.cholesky(M).T
+
+
+# 分块 TSQR：F ← R([F; D_块])，只保留 R 因子，不显式形成 Q
+def qr_factor(y, X, Z, W=None, add_constant=True, chunk_rows=QR_ROWS):
+    n, layout, blocks = _blocks(y, X, Z, W, add_constant)
+    F = np.empty((0, sum(layout[:4]) + layout.m))
+    for start in range(0, n, chunk_rows):
+        F = np.linalg.qr(np.vstack([F, _rows(blocks, layout.const, start, min(start + chunk_rows, n))]), mode='r')
+    return n, layout, F
+
+
+# 残差平方和 ‖D·c‖² = ‖F·c‖²，c 为各列 Y 对应的系数向量（批量为矩阵）
+def _ss(F, C):
+    E = F @ C
+    return np.einsum('ij,ij->j', E, E)
+
+
+def iv_from_factor(F, n, layout):
+    const, kw, lz, kx, m = layout
+    kw += const
+    l, k = kw + lz, kw + kx
+    x_cols = np.arange(l, l + kx)
+    y_cols = np.arange(l + kx, l + kx + m)
+    r_cols = np.concatenate([np.arange(kw), x_cols])
+    p = F.shape[1]
+
+    # 中心化（含常数项时）所需的总平方和：对常数回归的残差
+    def total_ss(cols):
+        C = np.zeros((p, cols.size))
+        C[cols, np.arange(cols.size)] = 1.0
+        if const:
+            C[0] = -F[0, cols] / F[0, 0]
+        return _ss(F, C)
+
+    # 第二阶段：X̂ 在 Q̃ 坐标下为 A = [F[:l, W], F[:l, X]]，β = argmin ‖A·β - F[:l, Y]‖
+    A = F[:l, r_cols]
+    q_a, r_a = np.linalg.qr(A)
+    coef = np.linalg.solve(r_a, q_a.T @ F[:l][:, y_cols])
+    # 残差用真实的 X 计算：e = Y - R·β
+    C = np.zeros((p, m))
+    C[y_cols, np.arange(m)] = 1.0
+    C[r_cols] = -coef
+    tss_y = total_ss(y_cols)
+    rss = _ss(F, C)
+    sigma2 = rss / (n - k)
+    r_inv = np.linalg.inv(r_a)
+    se = np.sqrt(np.outer((r_inv * r_inv).sum(axis=1), sigma2))
+    tsls_fit = GeneralFit(coef, se, 1.0 - rss / tss_y, rss, sigma2)
+
+    # OLS：Y 对 R = [W, X] 回归，由 FᵀF 的相应子块求解
+    FR = F[:, r_cols]
+    q_o, r_o = np.linalg.qr(FR)
+    coef_ols = np.linalg.solve(r_o, q_o.T @ F[:, y_cols])
+    C[r_cols] = -coef_ols
+    rss_ols = _ss(F, C)
+    r_inv = np.linalg.inv(r_o)
+    sigma2_ols = rss_ols / (n - k)
+    ols_fit = GeneralFit(coef_ols, np.sqrt(np.outer((r_inv * r_inv).sum(axis=1), sigma2_ols)),
+                         1.0 - rss_ols / tss_y, rss_ols, sigma2_ols)
+
+    # 第一阶段：X 对 Q 回归。残差平方和即 F[l:, X] 的列范数平方；
+    # 去掉排除工具变量后残差平方和增加 ‖F[kw:l, X]‖²，由此得到偏 F 统计量
+    fs_coef = np.linalg.solve(F[:l, :l], F[:l][:, x_cols])
+    rss_u = (F[l:, x_cols] ** 2).sum(axis=0)
+    explained = (F[kw:l, x_cols] ** 2).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        partial_f = (explained / lz) / (rss_u / (n - l))
+    first = FirstStageFit(fs_coef, 1.0 - rss_u / total_ss(x_cols), partial_f)
+    return IVRegression(n, layout, tsls_fit, ols_fit, first)
+
+
+def _squeeze(fit):
+    return type(fit)(*(np.squeeze(v, axis=-1)[()] for v in fit))
+
+
+# ======================== 入口 ========================
+# y 形状 (n,) 或 (n, m)；X 为 (n,) 或 (n, k_x)；Z 为 (n,) 或 (n, l_z)；W 可选 (n, k_w)。
+# 系数按 [常数, W, X] 的顺序排列；y 为一维时批量维度被去掉。
+def design_factor(y, X, Z, W=None, add_constant=True, method='cholesky'):
+    if method == 'cholesky':
+        n, layout, M = design_moments(y, X, Z, W, add_constant)
+        return n, layout, moments_factor(M)
+    if method == 'qr':
+        return qr_factor(y, X, Z, W, add_constant)
+    raise ValueError(f"unknown method {method!r}, expected one of {IV_METHODS}")
+
+
+def iv_regression(y, X, Z, W=None, add_constant=True, method='cholesky'):
+    n, layout, F = design_factor(y, X, Z, W, add_constant, method)
+    result = iv_from_factor(F, n, layout)
+    if np.ndim(y) == 1:
+        result = result._replace(tsls=_squeeze(result.tsls), ols=_squeeze(result.ols))
+    return result
+
+
+# 单工具变量的 4×4 交叉乘积矩阵 G（[1, X, Y, Z]）按 [1, Z, X, Y] 重排后即为 k = l = 2 的特例
+def iv_from_moments(G):
+    order = [CONST, Z_IDX, X_IDX, Y_IDX]
+    M = G[np.ix_(order, order)]
+    return iv_from_factor(moments_factor(M), G[CONST, CONST], IVLayout(1, 0, 1, 1, 1))
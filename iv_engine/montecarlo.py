@@ -0,0 +1,123 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from .dgp import basic_block, hte_block
+from .estimators import cross_moments, ols, tsls, first_stage_f
+from .rng import MONTE_CARLO_STREAM
+from .streaming import CHUNK_SIZE, ProgressiveStream
+from .workers import process_pool
+
+# ======================== 蒙特卡洛抽样分布 ========================
+# R 次重复按固定大小的“重复块”生成：第 b 块的 B 次重复以 (B, n) 的批量数组一次抽样，
+# 随机流 key = (MONTE_CARLO_STREAM, b)，每块只保留交叉乘积，内存与 R 无关。
+# 块大小只取决于 n，随机流按块编号，因此结果与进程数、任务划分方式无关；
+# 且同一 seed 下 R 次重复恰是 R' > R 次重复的前 R 次。
+# 单次重复超过 CHUNK_SIZE 个观测时（B = 1），该重复按流式分块累加。
+MonteCarloResult = namedtuple('MonteCarloResult', ['beta_ols', 'beta_2sls', 'f_stat'])
+DistSummary = namedtuple('DistSummary', ['mean', 'median', 'std', 'bias', 'rmse'])
+
+MAX_REPS = 100_000
+# 单次蒙特卡洛运行允许的总抽样规模 R × n
+MAX_ELEMENTS = 10 ** 9
+REP_BLOCK = 256
+
+
+def block_size(n):
+    return max(1, min(REP_BLOCK, CHUNK_SIZE // max(n, 1)))
+
+
+def n_blocks(n, reps):
+    return -(-reps // block_size(n))
+
+
+# 在总规模预算内可用的最大重复次数
+def max_reps_for(n, budget=MAX_ELEMENTS):
+    return int(min(MAX_REPS, max(1, budget // max(n, 1))))
+
+
+def _block_sample(model, params, seed, key, shape):
+    if model == 'basic':
+        s = basic_block(*params, seed, key, shape)
+        return s.X, s.Y, s.Z
+    s = hte_block(*params, seed, key, shape)
+    return s.D, s.Y, s.Z
+
+
+# 第 b 块全部重复的交叉乘积，形状 (块内重复数, 4, 4)
+def block_moments(model, params, n, reps, seed, b):
+    B = block_size(n)
+    size = min(B, reps - b * B)
+    key = (MONTE_CARLO_STREAM, b)
+    if n <= CHUNK_SIZE:
+        return cross_moments(*_block_sample(model, params, seed, key, (size, n)))
+    factory = ProgressiveStream.basic if model == 'basic' else ProgressiveStream.hte
+    return factory(*params, seed=seed, key=key).moments(n)[None]
+
+
+def _simulate_blocks(model, params, n, reps, seed, blocks):
+    results = []
+    for b in blocks:
+        G = block_moments(model, params, n, reps, seed, b)
+        results.append((b, np.stack([ols(G).slope, tsls(G).slope, first_stage_f(G)])))
+    return results
+
+
+# callback(reps_done) 在每个重复块（多进程时为每个进程的全部块）完成后调用
+def _run(model, params, n, reps, seed, workers, callback=None):
+    if not 1 <= reps <= MAX_REPS:
+        raise ValueError(f"reps must be between 1 and {MAX_REPS}")
+    blocks = list(range(n_blocks(n, reps)))
+    workers = min(workers or os.cpu_count() or 1, len(blocks))
+    B = block_size(n)
+    parts = []
+    if workers <= 1:
+        for b in blocks:
+            parts += _simulate_blocks(model, params, n, reps, seed, [b])
+            if callback is not None:
+                callback(min((b + 1) * B, reps))
+    else:
+        with process_pool(workers) as pool:
+            futures = [pool.submit(_simulate_blocks, model, params, n, reps, seed, blocks[w::workers]) for w in range(workers)]
+            for fut in futures:
+                parts += fut.result()
+                if callback is not None:
+                    callback(min(reps, sum(values.shape[1] for _, values in parts)))
+    out = np.empty((3, reps))
+    for b, values in parts:
+        out[:, b * B:b * B + values.shape[1]] = values
+    return MonteCarloResult(*out)
+
+
+# workers=None 时使用全部 CPU；workers=1 在当前进程内计算
+def monte_carlo_basic(gamma, delta, phi, n, reps, seed=42, workers=1, callback=None):
+    return _run('basic', (gamma, delta, phi), n, reps, seed, workers, callback)
+
+
+def monte_carlo_hte(props, betas, n, reps, seed=42, workers=1, callback=None):
+    return _run('hte', (tuple(props), tuple(betas)), n, reps, seed, workers, callback)
+
+
+# 对 NaN/inf（如第一阶段完全共线）忽略后汇总
+def summarize(draws, truth):
+    x = np.asarray(draws, dtype=float)
+    x = x[np.isfinite(x)]
+    if x.size == 0:
+        return DistSummary(np.nan, np.nan, np.nan, np.nan, np.nan)
+    mean = x.mean()
+    return DistSummary(mean, np.median(x), x.std(ddof=1) if x.size > 1 else 0.0,
+                       mean - truth, np.sqrt(np.mean((x - truth) ** 2)))
+
+
+# 直方图在服务端分箱；2SLS 在弱工具下有厚尾，按分位数截取显示区间，返回区间外占比
+def histogram(draws, bins=60, clip=(0.5, 99.5)):
+    x = np.asarray(draws, dtype=float)
+    x = x[np.isfinite(x)]
+    if x.size == 0:
+        return np.zeros(bins), np.linspace(0.0, 1.0, bins + 1), 1.0
+    lo, hi = np.percentile(x, clip)
+    if hi <= lo:
+        lo, hi = lo - 0.5, hi + 0.5
+    counts, edges = np.histogram(x, bins=bins, range=(lo, hi))
+    return counts, edges, 1.0 - counts.sum() / len(draws)
@@ -0,0 +1,267 @@
+import numpy as np
+from collections import namedtuple
+from statistics import NormalDist
+
+from .profiling import stage
+from .rng import SAMPLE_STREAM, generator
+
+# ======================== 一般化潜在结果模型（边际处理效应框架） ========================
+# 选择方程：D = 1{η ≤ π₀ + π₁·Z}，η ~ N(0, 1) 为不可观测的“处理阻力”，V = Φ(η) ~ U(0, 1)，
+# 倾向得分 P(Z) = Φ(π₀ + π₁·Z)。工具变量 Z 为连续（N(0, 1)）或多值（{0, …, K-1} 上均匀，K = 2 即二值）。
+# 结果方程：Y = U + β_i·D，其中
+#   U   = ρ_U·η + √(1-ρ_U²)·ξ                 （水平上的选择）
+#   b   = -ρ_gain·η + √(1-ρ_gain²)·ζ          （收益上的选择：ρ_gain > 0 时阻力越小收益越大）
+#   β_i = 由 b 单调变换得到的均值 beta_mean、标准差 beta_sd 的分布：
+#         normal     β = μ + σ·b
+#         lognormal  β = exp(m + s·b)，m、s 由 μ、σ 反解（要求 μ > 0）
+#         two_point  β = μ + σ·sign(b)（各一半概率）
+# ξ、ζ 与 η、Z 独立。边际处理效应 MTE(v) = E[β | V = v] 有闭式，各处理效应参数都是 MTE 的加权平均：
+#   ATE = ∫MTE，ATT/ATU 权重为 P(P(Z) > v) / P(D=1) 与其补，LATE(p₁, p₂) 在 [p₁, p₂] 上均匀，
+#   IV（2SLS 以 Z 为工具变量）权重 ω(v) = E[(Z - EZ)·1{P(Z) > v}] / Cov(Z, D)。
+# 权重在 v 的细网格上逐点闭式计算，积分用中点法则。
+BETA_DISTRIBUTIONS = ('normal', 'lognormal', 'two_point')
+INSTRUMENTS = ('continuous', 'discrete')
+MTE_GRID = 100
+INTEGRATION_GRID = 20_000
+
+POModel = namedtuple('POModel', [
+    'instrument', 'z_levels', 'pi0', 'pi1', 'beta_dist', 'beta_mean', 'beta_sd', 'rho_gain', 'rho_u',
+], defaults=('continuous', 2, 0.0, 1.0, 'normal', 2.0, 1.0, 0.5, 0.5))
+POSample = namedtuple('POSample', ['Z', 'D', 'U', 'betas', 'Y', 'eta'])
+MTEWeights = namedtuple('MTEWeights', ['ate', 'att', 'atu', 'late', 'iv'])
+POPopulation = namedtuple('POPopulation', [
+    'grid', 'mte', 'weights', 'contributions', 'ate', 'att', 'atu', 'late', 'late_range', 'plim_2sls', 'plim_ols',
+    'p_treated', 'cov_zd',
+])
+EmpiricalMTE = namedtuple('EmpiricalMTE', ['grid', 'mte', 'counts'])
+SampleEffects = namedtuple('SampleEffects', ['ate', 'att', 'atu', 'n', 'n_treated'])
+
+_N = NormalDist()
+_norm_cdf = np.vectorize(_N.cdf, otypes=[float])
+_norm_ppf = np.vectorize(_N.inv_cdf, otypes=[float])
+
+
+def _norm_pdf(x):
+    return np.exp(-0.5 * np.square(x)) / np.sqrt(2 * np.pi)
+
+
+def po_model(**fields):
+    model = POModel(**fields)
+    if model.instrument not in INSTRUMENTS:
+        raise ValueError(f"unknown instrument {model.instrument!r}, expected one of {INSTRUMENTS}")
+    if model.beta_dist not in BETA_DISTRIBUTIONS:
+        raise ValueError(f"unknown beta distribution {model.beta_dist!r}, expected one of {BETA_DISTRIBUTIONS}")
+    if model.instrument == 'discrete' and int(model.z_levels) < 2:
+        raise ValueError("a discrete instrument needs at least 2 levels")
+    if model.beta_sd < 0:
+        raise ValueError("beta_sd must be non-negative")
+    if model.beta_dist == 'lognormal' and model.beta_mean <= 0:
+        raise ValueError("a lognormal beta needs a positive mean")
+    if not (-1 < model.rho_gain < 1 and -1 < model.rho_u < 1):
+        raise ValueError("rho_gain and rho_u must lie strictly between -1 and 1")
+    return model._replace(z_levels=int(model.z_levels), **{f: float(getattr(model, f)) for f in
+                                                          ('pi0', 'pi1', 'beta_mean', 'beta_sd', 'rho_gain', 'rho_u')})
+
+
+def _lognormal_params(mean, sd):
+    s2 = np.log1p((sd / mean) ** 2)
+    return np.log(mean) - s2 / 2, np.sqrt(s2)
+
+
+def _beta_from_latent(model, b):
+    if model.beta_dist == 'normal':
+        return model.beta_mean + model.beta_sd * b
+    if model.beta_dist == 'lognormal':
+        m, s = _lognormal_params(model.beta_mean, model.beta_sd)
+        return np.exp(m + s * b)
+    return model.beta_mean + model.beta_sd * np.where(b > 0, 1.0, -1.0)
+
+
+# ======================== 抽样 ========================
+# shocks[..., :] = (η, ξ, ζ, z)，z 仅在连续工具变量时使用；多值工具变量的取值 z_codes 另行抽取
+def po_from_shocks(model, shocks, z_codes=None):
+    eta, xi, zeta, z = np.moveaxis(shocks, -1, 0)
+    Z = z if model.instrument == 'continuous' else z_codes.astype(float)
+    D = (eta <= model.pi0 + model.pi1 * Z).astype(float)
+    U = model.rho_u * eta + np.sqrt(1 - model.rho_u ** 2) * xi
+    betas = _beta_from_latent(model, -model.rho_gain * eta + np.sqrt(1 - model.rho_gain ** 2) * zeta)
+    Y = betas * D
+    Y += U
+    return POSample(Z, D, U, betas, Y, eta)
+
+
+# 与 dgp.hte_block 相同的约定：同一 key 下两个子流，按行抽取，较短的块是较长块的前缀
+def po_block(model, seed, key, shape):
+    shape = (shape,) if np.isscalar(shape) else tuple(shape)
+    with stage('rng'):
+        shocks = generator(seed, *key, 0).standard_normal(shape + (4,))
+        z_codes = generator(seed, *key, 1).integers(model.z_levels, size=shape) if model.instrument == 'discrete' else None
+    with stage('dgp'):
+        return po_from_shocks(model, shocks, z_codes)
+
+
+def po_chunk(model, seed, k, size, key=(SAMPLE_STREAM,)):
+    return po_block(model, seed, tuple(key) + (k,), size)
+
+
+# ======================== MTE 与总体处理效应参数 ========================
+# E[β | η]：b | η ~ N(-ρ·η, 1-ρ²)
+def _beta_given_eta(model, eta):
+    rho, tail = model.rho_gain, np.sqrt(1 - model.rho_gain ** 2)
+    if model.beta_dist == 'normal':
+        return model.beta_mean - model.beta_sd * rho * eta
+    if model.beta_dist == 'lognormal':
+        m, s = _lognormal_params(model.beta_mean, model.beta_sd)
+        return np.exp(m - s * rho * eta + s * s * tail * tail / 2)
+    return model.beta_mean + model.beta_sd * (2 * _norm_cdf(-rho * eta / tail) - 1)
+
+
+def mte(model, v):
+    return _beta_given_eta(model, _norm_ppf(np.clip(v, 1e-12, 1 - 1e-12)))
+
+
+# 工具变量的支撑点与概率（连续工具变量只在闭式表达中使用，这里返回 None）
+def _support(model):
+    if model.instrument == 'continuous':
+        return None
+    z = np.arange(model.z_levels, dtype=float)
+    return z, np.full(z.size, 1.0 / z.size)
+
+
+# 给定 v 时 P(P(Z) > v) 与 E[(Z - EZ)·1{P(Z) > v}]；连续 Z 时 P(Z) > v ⇔ π₁·Z > Φ⁻¹(v) - π₀
+def _selection_moments(model, v):
+    c = _norm_ppf(v) - model.pi0
+    support = _support(model)
+    if support is None:
+        if model.pi1 == 0:
+            return (c < 0).astype(float), np.zeros_like(v)
+        t = c / model.pi1
+        if model.pi1 > 0:
+            return 1 - _norm_cdf(t), _norm_pdf(t)
+        return _norm_cdf(t), -_norm_pdf(t)
+    z, w = support
+    above = (model.pi1 * z[None, :] > c[:, None]).astype(float)
+    return above @ w, above @ (w * (z - z @ w))
+
+
+def _late_range(model):
+    if model.instrument == 'continuous':
+        z_lo, z_hi = -1.0, 1.0
+    else:
+        z_lo, z_hi = 0.0, model.z_levels - 1.0
+    p = _norm_cdf(model.pi0 + model.pi1 * np.array([z_lo, z_hi]))
+    return tuple(np.sort(p))
+
+
+def _weights(model, v):
+    above, cov_above = _selection_moments(model, v)
+    p_lo, p_hi = _late_range(model)
+    p_treated = _p_treated(model)
+    cov_zd = _cov_zd(model)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return MTEWeights(
+            ate=np.ones_like(v),
+            att=above / p_treated,
+            atu=(1 - above) / (1 - p_treated),
+            late=((v >= p_lo) & (v <= p_hi)) / (p_hi - p_lo),
+            iv=cov_above / cov_zd,
+        )
+
+
+def _p_treated(model):
+    support = _support(model)
+    if support is None:
+        return _N.cdf(model.pi0 / np.sqrt(1 + model.pi1 ** 2))
+    z, w = support
+    return float(_norm_cdf(model.pi0 + model.pi1 * z) @ w)
+
+
+# Cov(Z, D) = E[(Z - EZ)·Φ(π₀ + π₁Z)]；连续 Z 时由 Stein 引理为 π₁/√(1+π₁²)·φ(π₀/√(1+π₁²))
+def _cov_zd(model):
+    support = _support(model)
+    if support is None:
+        r = np.sqrt(1 + model.pi1 ** 2)
+        return model.pi1 / r * _N.pdf(model.pi0 / r)
+    z, w = support
+    return float((w * (z - z @ w)) @ _norm_cdf(model.pi0 + model.pi1 * z))
+
+
+# E[U·D] = ρ_U·E[η·1{η ≤ c(Z)}] = -ρ_U·E[φ(c(Z))]
+def _u_treated(model):
+    support = _support(model)
+    if support is None:
+        r = np.sqrt(1 + model.pi1 ** 2)
+        return -model.rho_u * _N.pdf(model.pi0 / r) / r
+    z, w = support
+    return float(-model.rho_u * _norm_pdf(model.pi0 + model.pi1 * z) @ w)
+
+
+# grid 为显示用的 MTE 网格点数（区间中点），积分在 INTEGRATION_GRID 个点上进行。
+# contributions 为加权分解：各参数在每个显示区间 [j/grid, (j+1)/grid) 上的 ∫MTE·ω，逐区间求和即为参数值。
+def population_po(model, grid=MTE_GRID, integration_grid=INTEGRATION_GRID):
+    v_fine = (np.arange(integration_grid) + 0.5) / integration_grid
+    m_fine = mte(model, v_fine)
+    w_fine = _weights(model, v_fine)
+    bins = np.minimum((v_fine * grid).astype(np.intp), grid - 1)
+    contributions = MTEWeights(*(np.bincount(bins, weights=m_fine * w, minlength=grid) / integration_grid for w in w_fine))
+    ate, att, atu, late, iv = (float(c.sum()) for c in contributions)
+    p_treated = _p_treated(model)
+    # OLS = E[Y|D=1] - E[Y|D=0] = ATT + E[U|D=1] - E[U|D=0]，且 E[U] = 0
+    u_treated = _u_treated(model)
+    plim_ols = att + u_treated / p_treated + u_treated / (1 - p_treated)
+    v = (np.arange(grid) + 0.5) / grid
+    return POPopulation(v, mte(model, v), _weights(model, v), contributions, ate, att, atu, late, _late_range(model), iv,
+                        plim_ols, p_treated, _cov_zd(model))
+
+
+# ======================== 样本 MTE ========================
+# 按 V = Φ(η) 的等宽区间分组求 β 的均值：区间边界换算到 η 尺度后用 searchsorted 分组、bincount 累加，
+# 逐块进行，内存与 n 无关（与 streaming.MomentAccumulator 相同的用法，可在同一遍中一起更新）。
+class MTEAccumulator:
+    def __init__(self, grid=MTE_GRID):
+        self.grid = grid
+        self.edges = _norm_ppf(np.arange(1, grid) / grid)
+        self.counts = np.zeros(grid)
+        self.sums = np.zeros(grid)
+
+    def update(self, sample):
+        idx = np.searchsorted(self.edges, sample.eta)
+        self.counts += np.bincount(idx, minlength=self.grid)
+        self.sums += np.bincount(idx, weights=sample.betas, minlength=self.grid)
+        return self
+
+    def result(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return EmpiricalMTE((np.arange(self.grid) + 0.5) / self.grid, self.sums / self.counts, self.counts.copy())
+
+
+# 样本 ATE / ATT / ATU：逐块累加 Σβ、Σβ·D 与 ΣD，覆盖全部 n 个观测（而非只保留的前 HEAD_MAX 个）。
+# 没有处理组（或控制组）观测时对应的 ATT（ATU）为 NaN
+class EffectAccumulator:
+    def __init__(self):
+        self.n = 0
+        self.treated = 0
+        self.sum_beta = 0.0
+        self.sum_beta_treated = 0.0
+
+    def update(self, sample):
+        self.n += sample.betas.size
+        self.treated += int(np.count_nonzero(sample.D))
+        self.sum_beta += float(sample.betas.sum())
+        self.sum_beta_treated += float(sample.betas @ sample.D)
+        return self
+
+    def result(self):
+        untreated = self.n - self.treated
+        return SampleEffects(self.sum_beta / self.n if self.n else np.nan,
+                             self.sum_beta_treated / self.treated if self.treated else np.nan,
+                             (self.sum_beta - self.sum_beta_treated) / untreated if untreated else np.nan,
+                             self.n, self.treated)
+
+
+# chunks 为 POSample 的可迭代对象
+def empirical_mte(chunks, grid=MTE_GRID):
+    acc = MTEAccumulator(grid)
+    for sample in chunks:
+        acc.update(sample)
+    return acc.result()
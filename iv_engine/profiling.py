@@ -0,0 +1,163 @@
+import json
+import threading
+import time
+import tracemalloc
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+# ======================== 分阶段计时与内存 ========================
+# 每次运行创建一个 RunProfiler，start() 后在当前线程内激活；引擎中的热点用 stage(name) 标记
+# （未激活时 stage 为空操作，只有一次线程局部变量查找）。阶段可以嵌套，同名阶段可多次出现（如逐块抽样）。
+# 峰值内存由 tracemalloc 给出：每个阶段记录其执行期间相对进入时的已分配内存峰值（含子阶段），
+# tracemalloc 只在分析期间开启（会使 Python 层分配变慢，numpy 大数组的影响很小）。
+# tracemalloc 是进程全局的：多个会话同时分析时按引用计数共享，最后一个 stop() 才关闭；
+# 只有单个分析器在运行时才重置全局峰值，并发分析时各阶段的峰值内存是包含其他会话分配的上界。
+StageRecord = namedtuple('StageRecord', ['name', 'start', 'duration', 'peak_bytes', 'depth'])
+StageSummary = namedtuple('StageSummary', ['name', 'calls', 'total', 'peak_bytes'])
+
+PROFILE_HISTORY = 50
+
+_active = threading.local()
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+def _reset_peak():
+    with _tracing_lock:
+        if _tracing_users == 1 and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+
+class RunProfiler:
+    def __init__(self, label='', track_memory=True):
+        self.label = label
+        self.track_memory = track_memory
+        self.records = []
+        self.started = None
+        self.wall_start = None
+        self.total = None
+        self._stack = []
+        self._tracing = False
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.wall_start = time.time()
+        if self.track_memory:
+            _acquire_tracing()
+            self._tracing = True
+        _active.profiler = self
+        return self
+
+    # 可重复调用：脚本的 finally 中与正常路径上各调用一次
+    def stop(self):
+        if self.total is None:
+            self.total = time.perf_counter() - self.started
+        if getattr(_active, 'profiler', None) is self:
+            _active.profiler = None
+        if self._tracing:
+            self._tracing = False
+            _release_tracing()
+        return self
+
+    def _memory(self):
+        return tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+
+    @contextmanager
+    def stage(self, name):
+        current, peak = self._memory()
+        for frame in self._stack:
+            frame[3] = max(frame[3], peak)
+        _reset_peak()
+        frame = [name, time.perf_counter(), current, current]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            frame[3] = max(frame[3], self._memory()[1])
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][3] = max(self._stack[-1][3], frame[3])
+            self.records.append(StageRecord(name, frame[1] - self.started, end - frame[1], frame[3] - frame[2], len(self._stack)))
+
+    # 按阶段名汇总（按首次出现的顺序）；嵌套阶段的耗时同时计入父阶段
+    def summary(self):
+        out = {}
+        for r in sorted(self.records, key=lambda r: r.start):
+            calls, total, peak = out.get(r.name, (0, 0.0, 0))
+            out[r.name] = (calls + 1, total + r.duration, max(peak, r.peak_bytes))
+        return [StageSummary(name, *v) for name, v in out.items()]
+
+
+def active_profiler():
+    return getattr(_active, 'profiler', None)
+
+
+# 引擎中的阶段标记；也可用作装饰器
+@contextmanager
+def stage(name):
+    profiler = active_profiler()
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+
+# ======================== 滚动历史与 Chrome trace 导出 ========================
+# 最近 max_runs 次运行；导出为 Chrome trace 事件格式（chrome://tracing、Perfetto 可直接打开），
+# 每次运行为一个 "X" 事件，阶段为其内部的嵌套事件，时间单位为微秒。
+class ProfileHistory:
+    def __init__(self, max_runs=PROFILE_HISTORY):
+        self.runs = deque(maxlen=max_runs)
+        self._lock = threading.Lock()
+
+    def add(self, profiler):
+        with self._lock:
+            self.runs.append(profiler)
+
+    def clear(self):
+        with self._lock:
+            self.runs.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.runs)
+
+    def chrome_trace(self):
+        return chrome_trace(self.snapshot())
+
+    def to_json(self):
+        return json.dumps(self.chrome_trace())
+
+
+def chrome_trace(profilers, pid=1):
+    events = []
+    for i, p in enumerate(profilers):
+        ts0 = p.wall_start * 1e6
+        events.append({'name': p.label or f'run {i}', 'cat': 'run', 'ph': 'X', 'pid': pid, 'tid': 1,
+                       'ts': ts0, 'dur': p.total * 1e6, 'args': {'stages': len(p.records)}})
+        for r in p.records:
+            events.append({'name': r.name, 'cat': 'stage', 'ph': 'X', 'pid': pid, 'tid': 1,
+                           'ts': ts0 + r.start * 1e6, 'dur': r.duration * 1e6,
+                           'args': {'peak_mb': r.peak_bytes / 2 ** 20, 'depth': r.depth}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
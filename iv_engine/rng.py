@@ -0,0 +1,35 @@
+import numpy as np
+
+# ======================== 随机数层 ========================
+# 所有新代码使用 np.random.Generator（默认 PCG64，可选 Philox），随机流由
+# SeedSequence(seed, spawn_key=key) 唯一确定，与 SeedSequence.spawn 派生子序列的方式相同。
+# 随机流按“数据块”而不是按“工作进程”编号，因此无论使用多少个进程、如何分配任务，
+# 同一 seed 的结果都完全一致。
+#
+# key 的第一个元素区分用途，避免不同功能之间的随机流重叠：
+SAMPLE_STREAM = 0        # 单次样本（渐进式/流式分块），key = (0, 块号, 变量组)
+MONTE_CARLO_STREAM = 1   # 蒙特卡洛与参数扫描，key = (1, 重复块号, ...)
+BOOTSTRAP_STREAM = 2     # 自助法重抽样，key = (2, 重复块号)
+
+BIT_GENERATORS = {
+    'pcg64': np.random.PCG64,
+    'philox': np.random.Philox,
+}
+DEFAULT_BIT_GENERATOR = 'pcg64'
+
+
+def seed_sequence(seed, *key):
+    return np.random.SeedSequence(seed, spawn_key=tuple(int(k) for k in key))
+
+
+def generator(seed, *key, bit_generator=DEFAULT_BIT_GENERATOR):
+    try:
+        bitgen = BIT_GENERATORS[bit_generator]
+    except KeyError:
+        raise ValueError(f"unknown bit generator {bit_generator!r}, expected one of {sorted(BIT_GENERATORS)}") from None
+    return np.random.Generator(bitgen(seed_sequence(seed, *key)))
+
+
+# 为 count 个工作单元派生独立的 SeedSequence（等价于 seed_sequence(seed, *key, i)）
+def spawn(seed, count, *key):
+    return seed_sequence(seed, *key).spawn(count)
@@ -0,0 +1,250 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from .analytic import population_basic, population_hte
+from .cache import default_cache
+from .dgp import BETA_TRUE
+from .diagnostics import moment_diagnostics
+from .estimators import cross_moments, estimates_from_moments
+from .inference import anderson_rubin, bootstrap, standard_errors
+from .ingest import file_iv
+from .montecarlo import monte_carlo_basic, monte_carlo_hte
+from .potential_outcomes import MTE_GRID, EffectAccumulator, MTEAccumulator, population_po
+from .profiling import stage
+from .streaming import ProgressiveStream
+from .sweep import parameter_sweep
+
+# ======================== 带缓存的模型运行 ========================
+# 键只包含影响数值结果的参数（模型、参数、n、seed），语言等界面状态不进入键，
+# 因此切换界面语言不会触发任何重新计算。
+# 样本来自分块随机数流（见 streaming.py），估计量基于全部 n 个观测的交叉乘积；
+# sample 只保留前 min(n, HEAD_MAX) 个观测，供绘图使用。
+# 传入 stream 可复用同一参数下已计算的块（增大 n 时只追加新块），callback 用于进度显示。
+ScenarioRun = namedtuple('ScenarioRun', ['sample', 'moments', 'estimates'])
+InferenceRun = namedtuple('InferenceRun', ['se', 'ar', 'weak'])
+PORun = namedtuple('PORun', ['sample', 'moments', 'estimates', 'population', 'empirical_mte', 'effects'])
+ScenarioComparison = namedtuple('ScenarioComparison', ['name', 'model', 'params', 'run', 'population', 'pop_ate'])
+
+HEAD_MAX = 200_000
+
+# ======================== 内置场景预设 ========================
+# 与界面中的三个实验场景对应；HTE 比例为百分数，使用前按总和归一化
+HTE_BETAS = (5.0, 2.0, 2.0, 2.0)
+DEFAULT_PROPS = (0.4, 0.3, 0.3, 0.0)
+SCENARIO_PRESETS = {
+    'basic': {'model': 'basic', 'gamma': 1.0, 'delta': 0.5, 'phi': 0.0},
+    'scenario_1': {'model': 'hte', 'props': (40.0, 30.0, 30.0, 0.0), 'betas': HTE_BETAS},
+    'scenario_2': {'model': 'hte', 'props': (30.0, 30.0, 30.0, 10.0), 'betas': HTE_BETAS},
+}
+
+
+# 百分数（或任意非负权重）归一化为比例，总和为 0 时退回默认比例（与界面一致）
+def normalize_props(values):
+    values = [float(v) for v in values]
+    if len(values) != 4 or any(v < 0 for v in values):
+        raise ValueError("expected 4 non-negative type proportions")
+    total = sum(values)
+    if total <= 0:
+        return DEFAULT_PROPS
+    return tuple(v / total for v in values)
+
+
+def _key(*parts):
+    return tuple(tuple(float(v) for v in p) if isinstance(p, (list, tuple)) else p for p in parts)
+
+
+# 缓存键；后台任务（jobs.py）用同样的键去重并把结果写回缓存
+def basic_key(gamma, delta, phi, n, seed):
+    return _key('basic', float(gamma), float(delta), float(phi), int(n), seed)
+
+
+def hte_key(props, betas, n, seed):
+    return _key('hte', props, betas, int(n), seed)
+
+
+def mc_basic_key(gamma, delta, phi, n, reps, seed):
+    return _key('mc_basic', float(gamma), float(delta), float(phi), int(n), int(reps), seed)
+
+
+def mc_hte_key(props, betas, n, reps, seed):
+    return _key('mc_hte', props, betas, int(n), int(reps), seed)
+
+
+def inference_key(model, params, n, seed):
+    return _key('inference', model, *params, int(n), seed)
+
+
+def bootstrap_key(model, params, n, reps, method, seed):
+    return _key('bootstrap', model, *params, int(n), int(reps), method, seed)
+
+
+def sweep_key(n, reps, seed):
+    return _key('sweep', int(n), int(reps), seed)
+
+
+# store_path 只告诉工作进程去哪里打开结果库，不影响结果，不计入键
+def compare_key(specs, n, seed, store_path=None):
+    return ('compare', tuple((spec['name'], *_compare_params(spec)) for spec in specs), int(n), seed)
+
+
+def _run(stream, n, callback):
+    G = stream.moments(n, callback)
+    return ScenarioRun(stream.head(min(n, HEAD_MAX)), G, estimates_from_moments(G))
+
+
+# store 为预计算结果库（store.ResultStore），命中时直接返回查表结果，不在库中时在线计算
+def run_basic(gamma, delta, phi, n, seed=42, cache=default_cache, stream=None, callback=None, store=None):
+    stored = store.basic(gamma, delta, phi, n, seed) if store is not None else None
+    if stored is not None:
+        return stored
+    return cache.get_or_compute(
+        basic_key(gamma, delta, phi, n, seed),
+        lambda: _run(stream or ProgressiveStream.basic(gamma, delta, phi, seed), n, callback))
+
+
+def run_hte(props, betas, n, seed=42, cache=default_cache, stream=None, callback=None, store=None):
+    stored = store.hte(props, betas, n, seed) if store is not None else None
+    if stored is not None:
+        return stored
+    return cache.get_or_compute(
+        hte_key(props, betas, n, seed),
+        lambda: _run(stream or ProgressiveStream.hte(props, betas, seed), n, callback))
+
+
+def run_monte_carlo_basic(gamma, delta, phi, n, reps, seed=42, cache=default_cache):
+    return cache.get_or_compute(
+        mc_basic_key(gamma, delta, phi, n, reps, seed),
+        lambda: monte_carlo_basic(gamma, delta, phi, n, reps, seed))
+
+
+def run_monte_carlo_hte(props, betas, n, reps, seed=42, cache=default_cache):
+    return cache.get_or_compute(
+        mc_hte_key(props, betas, n, reps, seed),
+        lambda: monte_carlo_hte(props, betas, n, reps, seed))
+
+
+def run_parameter_sweep(n, reps, seed=42, workers=None, cache=default_cache):
+    return cache.get_or_compute(sweep_key(n, reps, seed),
+                                lambda: parameter_sweep(n, reps, seed, workers=workers))
+
+
+# ======================== 潜在结果模型（连续效应 / 连续工具变量） ========================
+# model 为 potential_outcomes.po_model 的结果。一次遍历同时累加交叉乘积与按 V 分组的 β 之和（样本 MTE），
+# 总体 MTE、各处理效应参数与权重由闭式给出；样本 ATE / ATT / ATU（effects）在同一遍中按全部 n 个观测累加。
+# callback(n_done, G) 与 ProgressiveStream.moments 相同。
+def _po_run(model, n, seed, grid, callback):
+    stream = ProgressiveStream.potential_outcomes(model, seed)
+    G, mte_acc, effect_acc = np.zeros((4, 4)), MTEAccumulator(grid), EffectAccumulator()
+    for sample in stream.samples(n):
+        with stage('moments'):
+            G = G + cross_moments(sample.D, sample.Y, sample.Z)
+            mte_acc.update(sample)
+            effect_acc.update(sample)
+        if callback is not None:
+            callback(int(G[0, 0]), G)
+    return PORun(stream.head(min(n, HEAD_MAX)), G, estimates_from_moments(G), population_po(model, grid),
+                 mte_acc.result(), effect_acc.result())
+
+
+def run_po(model, n, seed=42, grid=MTE_GRID, cache=default_cache, callback=None):
+    return cache.get_or_compute(_key('po', *model, int(n), seed, int(grid)),
+                                lambda: _po_run(model, n, seed, grid, callback))
+
+
+# ======================== 推断（标准误、AR 置信集、弱工具变量诊断、自助法） ========================
+# model 为 'basic'（params = (γ, δ, φ)）或 'hte'（params = (props, betas)）。
+# 稳健标准误需要逐观测残差：按块重新生成全部 n 个观测再遍历一次（与估计使用同一组数据），
+# 弱工具变量诊断中的稳健统计量复用同一次遍历得到的第一阶段稳健标准误。
+def _stream_for(model, params, seed, stream):
+    if stream is not None:
+        return stream
+    return ProgressiveStream.basic(*params, seed) if model == 'basic' else ProgressiveStream.hte(*params, seed)
+
+
+@stage('inference')
+def _inference(stream, n):
+    G = stream.moments(n)
+    se = standard_errors(G, stream.chunks(n))
+    return InferenceRun(se, anderson_rubin(G), moment_diagnostics(G, se))
+
+
+def run_inference(model, params, n, seed=42, cache=default_cache, stream=None):
+    return cache.get_or_compute(inference_key(model, params, n, seed),
+                                lambda: _inference(_stream_for(model, params, seed, stream), n))
+
+
+# 自助法需要把 n 个观测保存在内存中，调用方应限制 n（界面中为 HEAD_MAX）
+def _bootstrap(stream, n, reps, method, seed, workers):
+    sample = stream.head(n)
+    X = sample.D if hasattr(sample, 'D') else sample.X
+    return bootstrap(X, sample.Y, sample.Z, reps, method, seed, workers)
+
+
+def run_bootstrap(model, params, n, reps, method='pairs', seed=42, workers=1, cache=default_cache, stream=None):
+    return cache.get_or_compute(bootstrap_key(model, params, n, reps, method, seed),
+                                lambda: _bootstrap(_stream_for(model, params, seed, stream), n, reps, method, seed, workers))
+
+
+# ======================== 真实数据 ========================
+# source_key 标识数据内容（路径 + 修改时间 + 大小，或上传文件的 id），与所选列一起构成缓存键
+def run_file_iv(source, source_key, y, X, Z, W=(), fmt=None, robust=False, cache=default_cache, callback=None):
+    key = ('file', tuple(source_key), y, tuple(X), tuple(Z), tuple(W or ()), fmt, bool(robust))
+    return cache.get_or_compute(key, lambda: file_iv(source, y, X, Z, W, fmt, robust=robust, callback=callback))
+
+
+# ======================== 多场景并行比较 ========================
+# specs 为场景字典列表：{'name', 'model': 'basic', 'gamma', 'delta', 'phi'} 或 {'name', 'model': 'hte', 'props', 'betas'}
+# （SCENARIO_PRESETS 的条目加上 name 即可），全部使用同一 n 与 seed。
+# 各场景在线程池中并发计算（抽样与交叉乘积的 NumPy 运算释放 GIL），结果经 run_basic / run_hte 进入同一缓存，
+# 已算过的场景（包括单场景视图中算过的）直接命中；给出 store 时预计算结果库中的场景（固定预设、网格上的基础模型）
+# 直接查表。pop_ate 为总体平均处理效应。callback(done) 在每个场景完成后调用。
+def _compare_params(spec):
+    if spec['model'] == 'basic':
+        return 'basic', tuple(float(spec[f]) for f in ('gamma', 'delta', 'phi'))
+    if spec['model'] == 'hte':
+        return 'hte', (normalize_props(spec['props']), tuple(float(b) for b in spec['betas']))
+    raise ValueError(f"scenario {spec.get('name')!r}: model must be 'basic' or 'hte'")
+
+
+def _comparison(name, model, params, run):
+    if model == 'basic':
+        return ScenarioComparison(name, model, params, run, population_basic(*params), BETA_TRUE)
+    return ScenarioComparison(name, model, params, run, population_hte(*params), float(np.dot(*params)))
+
+
+def _compare_one(spec, n, seed, cache, store):
+    model, params = _compare_params(spec)
+    run = (run_basic if model == 'basic' else run_hte)(*params, n, seed, cache, store=store)
+    return _comparison(spec['name'], model, params, run)
+
+
+def compare_scenarios(specs, n, seed=42, workers=None, cache=default_cache, store=None, callback=None):
+    workers = min(workers or os.cpu_count() or 1, len(specs))
+    if workers <= 1:
+        out = []
+        for spec in specs:
+            out.append(_compare_one(spec, n, seed, cache, store))
+            if callback is not None:
+                callback(len(out))
+        return out
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_compare_one, spec, n, seed, cache, store) for spec in specs]
+        for done, _ in enumerate(as_completed(futures), 1):
+            if callback is not None:
+                callback(done)
+        return [fut.result() for fut in futures]
+
+
+# 只查结果库：全部场景都在库中时返回与 compare_scenarios 相同的结果，否则返回 None
+def compare_from_store(specs, n, seed, store):
+    out = []
+    for spec in specs:
+        model, params = _compare_params(spec)
+        run = store.basic(*params, n, seed) if model == 'basic' else store.hte(*params, n, seed)
+        if run is None:
+            return None
+        out.append(_comparison(spec['name'], model, params, run))
+    return out
@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from .dgp import basic_from_shocks, basic_shocks, hte_from_draws
+from .estimators import estimates_from_moments
+from .rng import SAMPLE_STREAM, generator
+from .scenarios import HEAD_MAX, SCENARIO_PRESETS, ScenarioRun, normalize_props
+from .streaming import CHUNK_SIZE, ProgressiveStream
+from .sweep import DELTA_GRID, GAMMA_GRID, PHI_GRID, _shock_moments, transform
+
+# ======================== 预计算结果库 ========================
+# 基础模型的参数空间就是侧边栏滑块的网格（γ × δ × φ = 20 × 21 × 21），离线算出每个网格点、每个 n 的
+# [1, X, Y, Z] 交叉乘积 G，运行时滑块取值直接查表（数组下标），估计量与诊断由 G 在微秒级算出。
+#   * 基础模型：X、Y 是 (1, U, Z, e1, e2) 的线性组合（见 sweep.py），每个 (n, seed) 只需遍历一次数据
+#     得到基础变量的 5×5 交叉乘积 M，全部网格点的 G = T·M·Tᵀ 一次矩阵乘法给出；与在线计算只差舍入误差。
+#   * HTE：只预计算 SCENARIO_PRESETS 中的预设，交叉乘积来自与在线计算相同的渐进式样本，逐位一致。
+#   * 绘图用的前 HEAD_MAX 个观测：HEAD_MAX ≤ CHUNK_SIZE，任何 n 的前 HEAD_MAX 行都是第 0 块的前缀，
+#     因此每个 seed 只保存一份与参数无关的随机数（基础模型的四个正态冲击、HTE 的两个均匀数与 U），
+#     按列存放，查表时直接在内存映射上用 dgp 中同样的函数还原样本，与在线计算逐位一致。
+# 结果库是一个目录：manifest.json 加若干 .npy 文件，运行时以 np.load(mmap_mode='r') 内存映射打开，
+# 只读取实际访问到的页。不在网格上的取值、不在库中的 n / seed 返回 None，由调用方退回在线计算。
+STORE_VERSION = 1
+# 样本量取值（1e3 ~ 1e7），同时是应用中样本量滑块的选项
+STORE_N_VALUES = tuple(m * 10 ** k for k in range(3, 7) for m in (1, 2, 5)) + (10 ** 7,)
+STORE_PRESETS = ('scenario_1', 'scenario_2')
+STORE_ENV = 'IV_RESULT_STORE'
+GRID_TOL = 1e-9
+
+StoreStats = namedtuple('StoreStats', ['hits', 'misses', 'n_values', 'seeds', 'presets'])
+
+
+def _basic_file(seed, n):
+    return f'seed{seed}_n{n}_basic.npy'
+
+
+def _hte_file(seed, n):
+    return f'seed{seed}_n{n}_hte.npy'
+
+
+def _head_files(seed):
+    return f'seed{seed}_basic_head.npy', f'seed{seed}_hte_head.npy'
+
+
+# 基础变量 5×5 交叉乘积的前缀和，与 ProgressiveStream 相同的分块与随机流
+class _BaseMoments:
+    def __init__(self, seed, chunk_size=CHUNK_SIZE):
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self._prefix = [np.zeros((5, 5))]
+
+    def _chunk(self, k, size):
+        return _shock_moments(basic_shocks(self.seed, (SAMPLE_STREAM, k), size))
+
+    def __call__(self, n):
+        full, tail = divmod(n, self.chunk_size)
+        while len(self._prefix) <= full:
+            k = len(self._prefix) - 1
+            self._prefix.append(self._prefix[-1] + self._chunk(k, self.chunk_size))
+        M = self._prefix[full].copy()
+        if tail:
+            M += self._chunk(full, tail)
+        return M
+
+
+# callback(message) 在每个 (seed, n) 完成后调用
+def build_store(path, n_values=STORE_N_VALUES, seeds=(42,), presets=STORE_PRESETS, callback=None):
+    if HEAD_MAX > CHUNK_SIZE:
+        raise RuntimeError("the shared plotting head requires HEAD_MAX <= CHUNK_SIZE")
+    n_values = sorted({int(n) for n in n_values})
+    seeds = [int(s) for s in seeds]
+    presets = list(presets)
+    for name in presets:
+        if SCENARIO_PRESETS.get(name, {}).get('model') != 'hte':
+            raise ValueError(f"unknown HTE preset {name!r}")
+    os.makedirs(path, exist_ok=True)
+
+    gammas, deltas, phis = np.meshgrid(GAMMA_GRID, DELTA_GRID, PHI_GRID, indexing='ij')
+    T = transform(gammas, deltas, phis)
+    hte_params = [(normalize_props(SCENARIO_PRESETS[name]['props']), tuple(float(b) for b in SCENARIO_PRESETS[name]['betas']))
+                  for name in presets]
+    for seed in seeds:
+        basic_head, hte_head = _head_files(seed)
+        np.save(os.path.join(path, basic_head), np.ascontiguousarray(basic_shocks(seed, (SAMPLE_STREAM, 0), HEAD_MAX).T))
+        u = generator(seed, SAMPLE_STREAM, 0, 0).random((HEAD_MAX, 2))
+        U = generator(seed, SAMPLE_STREAM, 0, 1).standard_normal(HEAD_MAX)
+        np.save(os.path.join(path, hte_head), np.vstack([u.T, U]))
+
+        base = _BaseMoments(seed)
+        streams = [ProgressiveStream.hte(props, betas, seed) for props, betas in hte_params]
+        for n in n_values:
+            np.save(os.path.join(path, _basic_file(seed, n)), T @ base(n) @ T.swapaxes(-1, -2))
+            np.save(os.path.join(path, _hte_file(seed, n)), np.array([s.moments(n) for s in streams]).reshape(len(streams), 4, 4))
+            if callback is not None:
+                callback(f'seed {seed}, n = {n:,}')
+
+    manifest = {
+        'version': STORE_VERSION, 'n_values': n_values, 'seeds': seeds, 'head_max': HEAD_MAX, 'chunk_size': CHUNK_SIZE,
+        'gammas': GAMMA_GRID.tolist(), 'deltas': DELTA_GRID.tolist(), 'phis': PHI_GRID.tolist(),
+        'presets': {name: {'props': list(props), 'betas': list(betas)} for name, (props, betas) in zip(presets, hte_params)},
+    }
+    with open(os.path.join(path, 'manifest.json'), 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2)
+    return ResultStore(path)
+
+
+def _grid_index(grid, value):
+    i = int(np.abs(grid - value).argmin())
+    return i if abs(grid[i] - value) <= GRID_TOL else None
+
+
+class ResultStore:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as fh:
+            manifest = json.load(fh)
+        if manifest.get('version') != STORE_VERSION:
+            raise ValueError(f"result store {path!r} has version {manifest.get('version')}, expected {STORE_VERSION}")
+        if manifest['head_max'] != HEAD_MAX or manifest['chunk_size'] != CHUNK_SIZE:
+            raise ValueError(f"result store {path!r} was built with a different HEAD_MAX / CHUNK_SIZE; rebuild it")
+        self.n_values = frozenset(manifest['n_values'])
+        self.seeds = frozenset(manifest['seeds'])
+        self.grids = tuple(np.array(manifest[k]) for k in ('gammas', 'deltas', 'phis'))
+        self.presets = [(name, np.array(p['props']), tuple(p['betas'])) for name, p in manifest['presets'].items()]
+        self.hits = 0
+        self.misses = 0
+        self._arrays = {}
+        self._lock = threading.Lock()
+
+    def _array(self, name):
+        arr = self._arrays.get(name)
+        if arr is None:
+            arr = np.load(os.path.join(self.path, name), mmap_mode='r')
+            with self._lock:
+                self._arrays[name] = arr
+        return arr
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _covers(self, n, seed):
+        return int(n) in self.n_values and int(seed) in self.seeds
+
+    def basic_index(self, gamma, delta, phi):
+        idx = tuple(_grid_index(g, float(v)) for g, v in zip(self.grids, (gamma, delta, phi)))
+        return None if None in idx else idx
+
+    def preset_index(self, props, betas):
+        props, betas = np.asarray(props, dtype=float), tuple(float(b) for b in betas)
+        for i, (_, p, b) in enumerate(self.presets):
+            if b == betas and np.allclose(p, props, rtol=0, atol=GRID_TOL):
+                return i
+        return None
+
+    # 与 scenarios.run_basic 相同的 ScenarioRun；不在库中时返回 None
+    def basic(self, gamma, delta, phi, n, seed=42):
+        idx = self.basic_index(gamma, delta, phi) if self._covers(n, seed) else None
+        self._count(idx is not None)
+        if idx is None:
+            return None
+        G = np.array(self._array(_basic_file(seed, n))[idx])
+        shocks = self._array(_head_files(seed)[0])[:, :min(n, HEAD_MAX)]
+        return ScenarioRun(basic_from_shocks(gamma, delta, phi, *shocks), G, estimates_from_moments(G))
+
+    def hte(self, props, betas, n, seed=42):
+        i = self.preset_index(props, betas) if self._covers(n, seed) else None
+        self._count(i is not None)
+        if i is None:
+            return None
+        G = np.array(self._array(_hte_file(seed, n))[i])
+        u0, u1, U = self._array(_head_files(seed)[1])[:, :min(n, HEAD_MAX)]
+        _, p, b = self.presets[i]
+        return ScenarioRun(hte_from_draws(tuple(p), b, u0, u1, U), G, estimates_from_moments(G))
+
+    def stats(self):
+        with self._lock:
+            return StoreStats(self.hits, self.misses, len(self.n_values), len(self.seeds), len(self.presets))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+# 打开（并在进程内复用）结果库；path 为空时取环境变量 IV_RESULT_STORE，目录不存在时返回 None
+def open_store(path=None):
+    path = path or os.environ.get(STORE_ENV)
+    if not path or not os.path.isfile(os.path.join(path, 'manifest.json')):
+        return None
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ResultStore(path)
+        return _stores[path]
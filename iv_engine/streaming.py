@@ -0,0 +1,152 @@
+import numpy as np
+
+from .dgp import basic_block, hte_block, _type_cdf
+from .estimators import cross_moments, estimates_from_moments
+from .potential_outcomes import po_chunk
+from .profiling import stage
+from .rng import SAMPLE_STREAM
+
+# ======================== 流式（分块）估计 ========================
+# 数据按固定大小分块生成，每块只把 [1, X, Y, Z] 的 4×4 交叉乘积累加到 G 中后即丢弃，
+# 峰值内存只与块大小有关，与 n 无关。
+#
+# 分块随机数流的约定：
+#   * 第 k 块使用 key = (SAMPLE_STREAM, k) 的 Generator 子流（见 rng.py），与 n 无关；
+#   * 块内按行抽取（见 dgp.basic_block / hte_block），长度为 m 的块恰是更长块的前缀。
+# 因此同一 seed 下 n 个观测恰是 n' > n 个观测的前 n 行，增大 n 只需在末尾追加。
+CHUNK_SIZE = 2 ** 18
+
+
+def chunk_bounds(n, chunk_size=CHUNK_SIZE):
+    return [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+
+# 第 k 块的前 size 行；key 为随机流前缀，蒙特卡洛中每次重复使用各自的前缀
+def basic_chunk(gamma, delta, phi, seed, k, size, key=(SAMPLE_STREAM,)):
+    return basic_block(gamma, delta, phi, seed, tuple(key) + (k,), size)
+
+
+def hte_chunk(props, betas, seed, k, size, key=(SAMPLE_STREAM,)):
+    return hte_block(props, betas, seed, tuple(key) + (k,), size)
+
+
+def _xyz(sample):
+    return (sample.D if hasattr(sample, 'D') else sample.X), sample.Y, sample.Z
+
+
+class MomentAccumulator:
+    def __init__(self):
+        self.moments = np.zeros((4, 4))
+
+    @property
+    def n(self):
+        return int(self.moments[0, 0])
+
+    def update(self, X, Y, Z):
+        self.moments += cross_moments(X, Y, Z)
+        return self
+
+    def merge(self, other):
+        self.moments += other.moments
+        return self
+
+    def estimates(self):
+        return estimates_from_moments(self.moments.copy())
+
+
+# ======================== 渐进式样本 ========================
+# 保存前 k 个完整块交叉乘积的前缀和 prefix[k]（按块顺序依次相加），任意 n 的交叉乘积为
+# prefix[n // c] + (末尾不完整块的交叉乘积)。增大 n 只计算新增的块；减小 n 不需重新生成。
+# 一次性运行与渐进式运行的加法顺序完全相同，结果逐位一致。
+class ProgressiveStream:
+    def __init__(self, chunk_fn, chunk_size=CHUNK_SIZE):
+        self.chunk_fn = chunk_fn
+        self.chunk_size = chunk_size
+        self._prefix = [np.zeros((4, 4))]
+
+    @classmethod
+    def basic(cls, gamma, delta, phi, seed=42, chunk_size=CHUNK_SIZE, key=(SAMPLE_STREAM,)):
+        return cls(lambda k, size: basic_chunk(gamma, delta, phi, seed, k, size, key), chunk_size)
+
+    @classmethod
+    def hte(cls, props, betas, seed=42, chunk_size=CHUNK_SIZE, key=(SAMPLE_STREAM,)):
+        _type_cdf(props)
+        return cls(lambda k, size: hte_chunk(props, betas, seed, k, size, key), chunk_size)
+
+    @classmethod
+    def potential_outcomes(cls, model, seed=42, chunk_size=CHUNK_SIZE, key=(SAMPLE_STREAM,)):
+        return cls(lambda k, size: po_chunk(model, seed, k, size, key), chunk_size)
+
+    @property
+    def n_cached(self):
+        return (len(self._prefix) - 1) * self.chunk_size
+
+    # callback(n_done, G) 在每个新块累加后调用，用于进度显示与中间结果
+    def moments(self, n, callback=None):
+        c = self.chunk_size
+        full, tail = divmod(n, c)
+        while len(self._prefix) <= full:
+            k = len(self._prefix) - 1
+            sample = self.chunk_fn(k, c)
+            with stage('moments'):
+                G = self._prefix[-1] + cross_moments(*_xyz(sample))
+            self._prefix.append(G)
+            if callback is not None and (k + 1) * c < n:
+                callback((k + 1) * c, G)
+        G = self._prefix[full].copy()
+        if tail:
+            sample = self.chunk_fn(full, tail)
+            with stage('moments'):
+                G += cross_moments(*_xyz(sample))
+        if callback is not None:
+            callback(n, G)
+        return G
+
+    def estimates(self, n, callback=None):
+        return estimates_from_moments(self.moments(n, callback))
+
+    # 按块重新生成前 n 个观测的 (X, Y, Z)，用于需要逐观测计算的第二遍（如稳健标准误）
+    def chunks(self, n):
+        for sample in self.samples(n):
+            yield _xyz(sample)
+
+    # 按块重新生成前 n 个观测的完整样本（含潜在结果等中间变量）
+    def samples(self, n):
+        for k, (start, stop) in enumerate(chunk_bounds(n, self.chunk_size)):
+            yield self.chunk_fn(k, stop - start)
+
+    # 前 n 个观测（用于绘图等只需子样本的场合）
+    def head(self, n):
+        c = self.chunk_size
+        parts = [self.chunk_fn(k, min(c, n - start)) for k, (start, _) in enumerate(chunk_bounds(n, c))]
+        if len(parts) == 1:
+            return parts[0]
+        return type(parts[0])(*(np.concatenate(cols) for cols in zip(*parts)))
+
+
+def iter_basic_chunks(gamma, delta, phi, n, seed=42, chunk_size=CHUNK_SIZE):
+    for k, (start, stop) in enumerate(chunk_bounds(n, chunk_size)):
+        yield _xyz(basic_chunk(gamma, delta, phi, seed, k, stop - start))
+
+
+def iter_hte_chunks(props, betas, n, seed=42, chunk_size=CHUNK_SIZE):
+    for k, (start, stop) in enumerate(chunk_bounds(n, chunk_size)):
+        yield _xyz(hte_chunk(props, betas, seed, k, stop - start))
+
+
+# callback(acc) 在每块累加后调用
+def accumulate(chunks, callback=None):
+    acc = MomentAccumulator()
+    for X, Y, Z in chunks:
+        acc.update(X, Y, Z)
+        if callback is not None:
+            callback(acc)
+    return acc
+
+
+def stream_basic(gamma, delta, phi, n, seed=42, chunk_size=CHUNK_SIZE, callback=None):
+    return accumulate(iter_basic_chunks(gamma, delta, phi, n, seed, chunk_size), callback).estimates()
+
+
+def stream_hte(props, betas, n, seed=42, chunk_size=CHUNK_SIZE, callback=None):
+    return accumulate(iter_hte_chunks(props, betas, n, seed, chunk_size), callback).estimates()
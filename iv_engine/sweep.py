@@ -0,0 +1,149 @@
+import os
+from collections import namedtuple
+from concurrent.futures import as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .dgp import ALPHA, BETA_TRUE, basic_shocks
+from .estimators import ols, tsls, first_stage_f
+from .montecarlo import REP_BLOCK, block_size, n_blocks
+from .rng import MONTE_CARLO_STREAM
+from .streaming import CHUNK_SIZE, chunk_bounds
+from .workers import process_pool
+
+# ======================== 参数网格扫描 ========================
+# 与侧边栏滑块一致的网格：γ ∈ 0.1..2.0，δ、φ ∈ 0.0..2.0，步长 0.1（20×21×21）
+GAMMA_GRID = np.round(np.arange(1, 21) * 0.1, 1)
+DELTA_GRID = np.round(np.arange(0, 21) * 0.1, 1)
+PHI_GRID = np.round(np.arange(0, 21) * 0.1, 1)
+
+SWEEP_METRICS = ('bias_ols', 'bias_2sls', 'median_bias_2sls', 'rmse_ols', 'rmse_2sls', 'weak_rate')
+SweepResult = namedtuple('SweepResult', ['gammas', 'deltas', 'phis', 'n', 'reps'] + list(SWEEP_METRICS))
+
+# 基础模型中 X、Y 都是 (1, U, Z, e1, e2) 的线性组合，因此每次重复只需保存
+# 基础变量的 5×5 交叉乘积矩阵 M；任一网格点的 [1, X, Y, Z] 交叉乘积为 G = T·M·Tᵀ。
+# 所有网格点共用同一组随机数（公共随机数），偏差曲面平滑，且与同 seed 的
+# monte_carlo_basic 在该网格点上的结果一致。
+_BASE = 5
+# 网格部分每次重复的计算量（8820 个网格点，单核约 7 ms），折算为模拟的观测数；
+# 整个扫描的规模约为 reps × (n + SWEEP_REP_COST)，与蒙特卡洛的 R × n 可比
+SWEEP_REP_COST = 65_000
+
+
+# 随机数与 monte_carlo_basic 完全相同（同一重复块、同一随机流）
+def _shock_moments(shocks):
+    A = np.empty(shocks.shape[:-1] + (_BASE,))
+    A[..., 0] = 1.0
+    A[..., 1:] = shocks
+    return A.swapaxes(-1, -2) @ A
+
+
+def base_moments(n, reps, seed=42):
+    M = np.empty((reps, _BASE, _BASE))
+    B = block_size(n)
+    for b in range(n_blocks(n, reps)):
+        size = min(B, reps - b * B)
+        if n <= CHUNK_SIZE:
+            M[b * B:b * B + size] = _shock_moments(basic_shocks(seed, (MONTE_CARLO_STREAM, b), (size, n)))
+        else:
+            M[b] = sum(_shock_moments(basic_shocks(seed, (MONTE_CARLO_STREAM, b, k), stop - start))
+                       for k, (start, stop) in enumerate(chunk_bounds(n, CHUNK_SIZE)))
+    return M
+
+
+# 行依次为 [1, X, Y, Z] 在 (1, U, Z, e1, e2) 上的系数；返回形状 (..., 4, 5)
+def transform(gamma, delta, phi):
+    gamma, delta, phi = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (gamma, delta, phi)))
+    T = np.zeros(gamma.shape + (4, _BASE))
+    T[..., 0, 0] = 1.0
+    T[..., 1, 1], T[..., 1, 2], T[..., 1, 3] = delta, gamma, 1.0
+    T[..., 2, 1] = BETA_TRUE * delta + ALPHA
+    T[..., 2, 2] = BETA_TRUE * gamma + phi
+    T[..., 2, 3], T[..., 2, 4] = BETA_TRUE, 1.0
+    T[..., 3, 2] = 1.0
+    return T
+
+
+# 固定 γ 时对 (δ, φ) 平面上的全部网格点求指标，返回形状 (len(SWEEP_METRICS), len(deltas), len(phis))。
+# G[p, r] = T_p M_r T_pᵀ 按每 REP_BLOCK 个重复分块计算，中间数组的大小与 reps 无关
+# （一次算完全部重复时，reps = 5000 的单个 γ 切片需要约 600 MB，每个工作进程各一份）
+def sweep_gamma_slice(M, gamma, deltas, phis):
+    d, p = np.meshgrid(deltas, phis, indexing='ij')
+    T = transform(gamma, d, p).reshape(-1, 4, _BASE)[:, None]
+    Tt = T.swapaxes(-1, -2)
+    reps = M.shape[0]
+    b_ols, b_2sls, f = (np.empty((T.shape[0], reps)) for _ in range(3))
+    for start in range(0, reps, REP_BLOCK):
+        stop = min(start + REP_BLOCK, reps)
+        G = np.matmul(np.matmul(T, M[None, start:stop]), Tt)
+        b_ols[:, start:stop] = ols(G).slope
+        b_2sls[:, start:stop] = tsls(G).slope
+        f[:, start:stop] = first_stage_f(G)
+    err_2sls = np.where(np.isfinite(b_2sls), b_2sls - BETA_TRUE, np.nan)
+    err_ols = b_ols - BETA_TRUE
+    out = np.stack([
+        err_ols.mean(axis=1),
+        np.nanmean(err_2sls, axis=1),
+        np.nanmedian(err_2sls, axis=1),
+        np.sqrt(np.mean(err_ols ** 2, axis=1)),
+        np.sqrt(np.nanmean(err_2sls ** 2, axis=1)),
+        np.mean(f < 10, axis=1),
+    ])
+    return out.reshape(len(SWEEP_METRICS), len(deltas), len(phis))
+
+
+# ======================== 进程池与共享内存 ========================
+def _attach(name, shape):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+
+def _sweep_worker(m_name, m_shape, out_name, out_shape, gamma_indices, gammas, deltas, phis):
+    m_shm, M = _attach(m_name, m_shape)
+    out_shm, out = _attach(out_name, out_shape)
+    try:
+        for gi in gamma_indices:
+            out[:, gi] = sweep_gamma_slice(M, gammas[gi], deltas, phis)
+    finally:
+        del M, out
+        m_shm.close()
+        out_shm.close()
+
+
+# callback(done) 在每完成若干个 γ 切片后调用，done 为已完成的切片数
+def parameter_sweep(n=1000, reps=200, seed=42, gammas=GAMMA_GRID, deltas=DELTA_GRID, phis=PHI_GRID, workers=None,
+                    callback=None):
+    gammas, deltas, phis = (np.asarray(v, dtype=float) for v in (gammas, deltas, phis))
+    M = base_moments(n, reps, seed)
+    out_shape = (len(SWEEP_METRICS), len(gammas), len(deltas), len(phis))
+    workers = min(workers or os.cpu_count() or 1, len(gammas))
+
+    if workers <= 1:
+        out = np.empty(out_shape)
+        for gi, g in enumerate(gammas):
+            out[:, gi] = sweep_gamma_slice(M, g, deltas, phis)
+            if callback is not None:
+                callback(gi + 1)
+    else:
+        m_shm = shared_memory.SharedMemory(create=True, size=M.nbytes)
+        out_shm = shared_memory.SharedMemory(create=True, size=int(np.prod(out_shape)) * 8)
+        try:
+            np.ndarray(M.shape, dtype=np.float64, buffer=m_shm.buf)[:] = M
+            with process_pool(workers) as pool:
+                futures = {pool.submit(_sweep_worker, m_shm.name, M.shape, out_shm.name, out_shape,
+                                       list(range(len(gammas)))[w::workers], gammas, deltas, phis): len(gammas[w::workers])
+                           for w in range(workers)}
+                done = 0
+                for fut in as_completed(futures):
+                    fut.result()
+                    done += futures[fut]
+                    if callback is not None:
+                        callback(done)
+            out = np.ndarray(out_shape, dtype=np.float64, buffer=out_shm.buf).copy()
+        finally:
+            m_shm.close()
+            m_shm.unlink()
+            out_shm.close()
+            out_shm.unlink()
+    return SweepResult(gammas, deltas, phis, n, reps, *out)
@@ -0,0 +1,41 @@
+import importlib
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+# ======================== 进程池 ========================
+# 引擎中的进程池（蒙特卡洛、参数扫描、自助法、批处理、后台任务）都由 process_pool 创建，启动方式固定，
+# 不随平台默认值变化（Python 3.14 起 Linux 默认改为 forkserver，macOS / Windows 默认为 spawn）：
+#   * 有 fork 时一律使用 fork：工作进程直接继承已导入的引擎；
+#   * 只有 spawn 时（Windows）：spawn 启动的工作进程会先重新执行父进程的 __main__，而 Streamlit 把应用脚本登记为
+#     __main__，每个工作进程都会重跑整个应用（包括 st.* 调用与嵌套的任务提交）。ProcessPoolExecutor 在 submit
+#     时于调用线程中启动工作进程，因此 submit 期间把 __main__ 临时换成空模块 _worker_main，工作进程只导入 iv_engine。
+POOL_START_METHOD = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_main_lock = threading.Lock()
+
+
+@contextmanager
+def _engine_main():
+    with _main_lock:
+        main = sys.modules.get('__main__')
+        sys.modules['__main__'] = importlib.import_module('._worker_main', __package__)
+        try:
+            yield
+        finally:
+            sys.modules['__main__'] = main
+
+
+class _EngineMainPool(ProcessPoolExecutor):
+    def submit(self, fn, /, *args, **kwargs):
+        with _engine_main():
+            return super().submit(fn, *args, **kwargs)
+
+
+# start_method 为 None 时使用 POOL_START_METHOD
+def process_pool(max_workers=None, start_method=None):
+    context = multiprocessing.get_context(start_method or POOL_START_METHOD)
+    pool_class = ProcessPoolExecutor if context.get_start_method() == 'fork' else _EngineMainPool
+    return pool_class(max_workers=max_workers, mp_context=context)
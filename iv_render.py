@@ -0,0 +1,101 @@
+from collections import namedtuple
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from iv_engine import box_stats, density_2d, stage
+
+# ======================== 绘图层 ========================
+# 根据样本量选择渲染方式，保证发送到浏览器的 plotly JSON 大小与 n 无关：
+#   n ≤ SVG_MAX_POINTS        → go.Scatter（SVG）
+#   n ≤ WEBGL_MAX_POINTS      → go.Scattergl（WebGL）
+#   其他                      → 服务端二维分箱的密度热图
+# 箱线图只传递预先计算的四分位数与须线端点，不传原始样本。
+SVG_MAX_POINTS = 5_000
+WEBGL_MAX_POINTS = 20_000
+DENSITY_BINS = 150
+
+
+# 数据点散点（或密度）+ 回归直线；fits 为 [(名称, 截距, 斜率, 颜色), ...]
+@stage('figures')
+def scatter_with_fits(X, Y, fits, points_name, title, height=500):
+    n = len(X)
+    fig = go.Figure()
+    if n <= WEBGL_MAX_POINTS:
+        trace = go.Scatter if n <= SVG_MAX_POINTS else go.Scattergl
+        fig.add_trace(trace(x=X, y=Y, mode='markers', name=points_name, marker=dict(color='rgba(0, 100, 200, 0.5)', size=4)))
+        x_line = np.array([np.min(X), np.max(X)])
+    else:
+        dens = density_2d(X, Y, bins=DENSITY_BINS)
+        x_mid = (dens.x_edges[:-1] + dens.x_edges[1:]) / 2
+        y_mid = (dens.y_edges[:-1] + dens.y_edges[1:]) / 2
+        # 计数取对数显示，空单元格留白
+        z = np.where(dens.counts.T > 0, np.log10(np.maximum(dens.counts.T, 1)), np.nan)
+        fig.add_trace(go.Heatmap(x=np.round(x_mid, 4), y=np.round(y_mid, 4), z=np.round(z, 3), colorscale='Blues', name=points_name,
+                                 showscale=False, hovertemplate='X=%{x}<br>Y=%{y}<br>log10(count)=%{z}<extra></extra>'))
+        x_line = dens.x_edges[[0, -1]]
+    for name, intercept, slope, color in fits:
+        fig.add_trace(go.Scatter(x=x_line, y=intercept + slope * x_line, mode='lines', name=name, line=dict(color=color, width=2)))
+    fig.update_layout(title=title, xaxis_title='X', yaxis_title='Y', hovermode='closest', height=height)
+    return fig
+
+
+# groups 为 [(名称, 样本, 颜色, 透明度), ...]，每组一个由摘要构造的箱线
+@stage('figures')
+def box_from_stats(groups, title, xaxis_title, height=500):
+    return box_from_summaries([(name, box_stats(y), color, opacity) for name, y, color, opacity in groups], title, xaxis_title, height)
+
+
+# groups 为 [(名称, BoxStats, 颜色, 透明度), ...]，摘要可由 grouped_box_stats 一次算出；空组不画
+@stage('figures')
+def box_from_summaries(groups, title, xaxis_title, height=500):
+    fig = go.Figure()
+    for name, s, color, opacity in groups:
+        if s.count == 0:
+            continue
+        fig.add_trace(go.Box(x=[name], q1=[s.q1], median=[s.median], q3=[s.q3], lowerfence=[s.lowerfence], upperfence=[s.upperfence],
+                             mean=[s.mean], name=name, marker_color=color, opacity=opacity, boxpoints=False))
+    fig.update_layout(title=title, yaxis_title='Y', xaxis_title=xaxis_title, boxmode='group', height=height)
+    return fig
+
+
+# 边际处理效应曲线：总体 MTE（实线）、样本分组均值（点）与所选参数的权重 ω(v)（次坐标轴）；
+# weights 为 [(名称, 权重数组, 颜色), ...]，只传递网格上的点，与 n 无关
+@stage('figures')
+def mte_figure(grid, mte, empirical, weights, names, title, height=500):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=grid, y=mte, mode='lines', name=names[0], line=dict(color='black', width=2)))
+    if empirical is not None:
+        fig.add_trace(go.Scatter(x=grid, y=empirical, mode='markers', name=names[1], marker=dict(color='rgba(0, 100, 200, 0.6)', size=5)))
+    for name, w, color in weights:
+        fig.add_trace(go.Scatter(x=grid, y=w, mode='lines', name=name, yaxis='y2', line=dict(color=color, width=1.5, dash='dot')))
+    fig.update_layout(title=title, xaxis_title='V', yaxis_title=names[0], hovermode='x unified', height=height,
+                      yaxis2=dict(title=names[2], overlaying='y', side='right', showgrid=False, rangemode='tozero'))
+    return fig
+
+
+def payload_bytes(fig):
+    return len(fig.to_json())
+
+
+# ======================== 图形缓存 ========================
+# 图形与结果放在同一个 ResultCache 中，键为 ('figure', 图形名称, 语言, *结果的缓存键, ...)，参数相同的会话共享同一个图形。
+# 条目同时保存 Figure 对象与预先序列化的 JSON：内存中直接复用 Figure（st.plotly_chart 每次都会自行序列化，
+# 由 JSON 还原 Figure 比重新绘图还慢），JSON 用于计算占用的内存并写入磁盘后端，pickle 时只保存 JSON。
+# 缓存中的 Figure 由多个会话共用，调用方不能再修改它。
+class FigureEntry(namedtuple('FigureEntry', ['figure', 'json'])):
+    def __reduce__(self):
+        return figure_entry_from_json, (self.json,)
+
+
+def figure_entry_from_json(json):
+    return FigureEntry(pio.from_json(json), json)
+
+
+def cached_figure(cache, key, build):
+    return cache.get_or_compute(('figure', *key), lambda: _figure_entry(build())).figure
+
+
+def _figure_entry(fig):
+    return FigureEntry(fig, fig.to_json())